@@ -0,0 +1,178 @@
+import os
+import json
+import math
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+# Admission control in front of /ai-task
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1").lower() in ("1", "true", "yes")
+ADMISSION_INITIAL_LIMIT = float(os.getenv("ADMISSION_INITIAL_LIMIT", "16"))
+ADMISSION_MIN_LIMIT = float(os.getenv("ADMISSION_MIN_LIMIT", "2"))
+ADMISSION_MAX_LIMIT = float(os.getenv("ADMISSION_MAX_LIMIT", "256"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+# Latency inflation (short-term vs long-term average) treated as overload
+ADMISSION_LATENCY_TOLERANCE = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "1.5"))
+ADMISSION_BACKOFF = float(os.getenv("ADMISSION_BACKOFF", "0.9"))
+# Per-task max limit overrides as JSON, e.g. {"qa": 32}
+ADMISSION_MAX_LIMITS: Dict[str, float] = json.loads(os.getenv("ADMISSION_MAX_LIMITS", "{}"))
+
+# Cheap lookups are always admitted so expensive work can never starve them
+ADMISSION_EXEMPT_TASKS = {"fetch_latest", "fetch_image", "cancel_image"}
+# generate_image only enqueues a job, so its latency says nothing about load; it is bounded by
+# the image job queue depth instead (429 while ImageJobQueue.saturated)
+ADMISSION_LIMITED_TASKS = {"qa", "history", "generate_content"}
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; carries the HTTP status and a Retry-After hint"""
+
+    def __init__(self, status_code: int, retry_after: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit driven by observed latency, with a bounded FIFO wait queue
+
+    The limit grows by 1/limit per completed request while it is being fully
+    used, and shrinks multiplicatively (at most once per typical request
+    time) when short-term latency rises above the long-term average by
+    more than the tolerance.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: float = ADMISSION_INITIAL_LIMIT,
+        min_limit: float = ADMISSION_MIN_LIMIT,
+        max_limit: float = ADMISSION_MAX_LIMIT,
+        max_queue: int = ADMISSION_QUEUE_SIZE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT
+    ):
+        self.name = name
+        self.min_limit = max(1.0, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial_limit, self.min_limit), self.max_limit)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._short_latency: Optional[float] = None
+        self._long_latency: Optional[float] = None
+        self._last_decrease = 0.0
+
+        # Metrics
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead is likely to have drained"""
+        per_request = self._long_latency or 1.0
+        return max(1, min(60, math.ceil(per_request * (len(self._waiters) + 1) / int(self.limit))))
+
+    async def acquire(self):
+        """Wait for a slot; raises AdmissionRejected when the queue is full or the wait times out"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(429, self.retry_after(), f"Too many pending {self.name} requests")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()  # granted just as we gave up
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected_timeout += 1
+                raise AdmissionRejected(503, self.retry_after(), f"Timed out waiting for a {self.name} slot")
+            raise
+        self.admitted += 1
+
+    def release(self, latency: float):
+        """Free a slot and adapt the limit from the request's latency"""
+        self._update_limit(latency)
+        self._release_slot()
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _update_limit(self, latency: float):
+        if self._long_latency is None:
+            self._short_latency = self._long_latency = latency
+            return
+        self._short_latency += 0.1 * (latency - self._short_latency)
+        self._long_latency += 0.01 * (latency - self._long_latency)
+
+        if self._short_latency > self._long_latency * ADMISSION_LATENCY_TOLERANCE:
+            now = time.monotonic()
+            if now - self._last_decrease >= self._short_latency:
+                self.limit = max(self.min_limit, self.limit * ADMISSION_BACKOFF)
+                self._last_decrease = now
+        elif self.in_flight >= int(self.limit) or self._waiters:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued_now": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "latency_short_ms": round((self._short_latency or 0) * 1000, 1),
+            "latency_long_ms": round((self._long_latency or 0) * 1000, 1)
+        }
+
+class AdmissionController:
+    """One adaptive limiter per expensive task type; cheap tasks bypass admission"""
+
+    def __init__(self, enabled: bool = ADMISSION_CONTROL):
+        self.enabled = enabled
+        self.limiters: Dict[str, AdaptiveLimiter] = {
+            task: AdaptiveLimiter(task, max_limit=ADMISSION_MAX_LIMITS.get(task, ADMISSION_MAX_LIMIT))
+            for task in ADMISSION_LIMITED_TASKS
+        }
+
+    @asynccontextmanager
+    async def admit(self, task: str):
+        """Hold a slot for task for the duration of the block"""
+        limiter = self.limiters.get(task) if self.enabled else None
+        if limiter is None:
+            yield
+            return
+        await limiter.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            limiter.release(time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "exempt_tasks": sorted(ADMISSION_EXEMPT_TASKS),
+            "limiters": {task: limiter.stats() for task, limiter in self.limiters.items()}
+        }
+
+# Global admission controller for /ai-task
+admission = AdmissionController()
@@ -0,0 +1,104 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+import tempfile
+from typing import Dict, Any, Optional, Tuple
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", "./artifacts")
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def sniff_media_type(head: bytes) -> str:
+    """Guess an image media type from its leading bytes"""
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"GIF8"):
+        return "image/gif"
+    return "application/octet-stream"
+
+class ArtifactStore:
+    """Content-addressed on-disk store for generated images"""
+
+    def __init__(self, root: str = ARTIFACT_DIR):
+        self.root = root
+
+        # Metrics
+        self.hits = 0
+        self.writes = 0
+        self.bytes_written = 0
+
+    @staticmethod
+    def key(prompt: str, model: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Content address for a generation request (prompt + model + params)"""
+        payload = json.dumps({"prompt": prompt, "model": model, "params": params or {}}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def valid_key(key: str) -> bool:
+        return bool(_KEY_PATTERN.match(key))
+
+    @staticmethod
+    def url(key: str) -> str:
+        return f"/artifacts/{key}"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Existing artifact for a key, counted as a store hit"""
+        if not self.exists(key):
+            return None
+        self.hits += 1
+        return {"artifact_id": key, "image_url": self.url(key)}
+
+    def _write(self, key: str, data: bytes):
+        """Write atomically so readers never see a partial file"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    async def put(self, key: str, data: bytes) -> Dict[str, Any]:
+        """Store image bytes under a key (written once)"""
+        if not self.exists(key):
+            await asyncio.to_thread(self._write, key, data)
+            self.writes += 1
+            self.bytes_written += len(data)
+        return {"artifact_id": key, "image_url": self.url(key)}
+
+    def open_info(self, key: str) -> Optional[Tuple[str, int, str]]:
+        """(path, size, media type) of a stored artifact"""
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            head = f.read(16)
+        return path, os.path.getsize(path), sniff_media_type(head)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit and write counters"""
+        return {
+            "root": self.root,
+            "hits": self.hits,
+            "writes": self.writes,
+            "bytes_written": self.bytes_written
+        }
+
+# Global artifact store
+artifact_store = ArtifactStore()
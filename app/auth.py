@@ -1,16 +1,114 @@
 import os
+import logging
+import time
+import hashlib
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Any, Iterable, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+logger = logging.getLogger(__name__)
+
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-this-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = 365  # Valid indefinitely as requested
+JWT_BACKEND = os.getenv("JWT_BACKEND", "jose")  # jose or pyjwt
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+class JoseBackend:
+    """JWT encode/decode with python-jose"""
+    name = "jose"
+
+    def encode(self, claims: dict) -> str:
+        return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+    def decode(self, token: str) -> dict:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+class PyJWTBackend:
+    """JWT encode/decode with PyJWT (faster HMAC path), errors mapped to JWTError"""
+    name = "pyjwt"
+
+    def __init__(self):
+        import jwt as pyjwt
+        self._jwt = pyjwt
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return self._jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except self._jwt.PyJWTError as e:
+            raise JWTError(str(e))
+
+def _load_backend(name: str):
+    """Pick the configured JWT backend, falling back to python-jose"""
+    if name == "pyjwt":
+        try:
+            return PyJWTBackend()
+        except ImportError:
+            logger.warning("PyJWT not installed, using python-jose")
+    return JoseBackend()
+
+jwt_backend = _load_backend(JWT_BACKEND)
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+class TokenCache:
+    """Bounded LRU of verified token payloads, keyed by token hash and honoring exp"""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        payload, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def put(self, key: str, payload: dict):
+        exp = payload.get("exp")
+        expires_at = float(exp) if exp is not None else float("inf")
+        self._entries[key] = (payload, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: str):
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+token_cache = TokenCache()
+# Hashes of revoked tokens -> when the token would have expired anyway (epoch seconds).
+# Persisted in the database and loaded at startup, so revocations survive restarts.
+revoked_tokens: Dict[str, float] = {}
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -22,20 +120,57 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt_backend.encode(to_encode)
     return encoded_jwt
 
 def verify_token(token: str):
-    """Verify JWT token"""
+    """Verify JWT token (revocation check, then cached payload, then full decode)"""
+    key = _token_hash(token)
+    if key in revoked_tokens:
+        raise JWTError("Token revoked")
+
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt_backend.decode(token)
         username: str = payload.get("sub")
         if username is None:
             raise JWTError("Token invalid")
-        return payload
     except JWTError:
         raise JWTError("Token invalid")
 
+    token_cache.put(key, payload)
+    return payload
+
+def revoke_token_hash(key: str, expires_at: float):
+    """Revoke a token by its hash (the form stored and shared between worker processes)"""
+    revoked_tokens[key] = expires_at
+    token_cache.discard(key)
+
+def load_revoked_tokens(entries: Iterable[Tuple[str, float]]):
+    """Apply stored revocations, dropping those whose tokens have expired"""
+    now = time.time()
+    for key, expires_at in entries:
+        if expires_at > now:
+            revoke_token_hash(key, expires_at)
+    for key in [key for key, expires_at in revoked_tokens.items() if expires_at <= now]:
+        del revoked_tokens[key]
+
+def revoke_token(token: str) -> Tuple[str, float]:
+    """Revoke a valid token; later verify_token calls for it fail. Returns the token hash and its expiry
+
+    Raises JWTError for tokens that do not verify, so only real tokens are ever stored.
+    """
+    payload = verify_token(token)
+    if "exp" not in payload:
+        raise JWTError("Token has no expiry")
+    key = _token_hash(token)
+    expires_at = float(payload["exp"])
+    revoke_token_hash(key, expires_at)
+    return key, expires_at
+
 def verify_password(plain_password: str, hashed_password: str):
     """Verify password against hash"""
     return pwd_context.verify(plain_password, hashed_password)
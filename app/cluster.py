@@ -0,0 +1,472 @@
+import os
+import logging
+import json
+import time
+import asyncio
+import secrets
+import itertools
+import aiosqlite
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Set
+from .database import DB_PATH, QA_WRITE_BEHIND, Database, database, write_behind
+
+try:
+    import fcntl
+except ImportError:  # Windows: multi-worker mode is unavailable
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Multi-worker mode: uvicorn reads WEB_CONCURRENCY as its default --workers
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+MULTI_WORKER = WEB_CONCURRENCY > 1 or os.getenv("MULTI_WORKER", "").lower() in ("1", "true", "yes")
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", f"{DB_PATH}.shared")
+SHARED_STATE_INTERVAL = float(os.getenv("SHARED_STATE_INTERVAL", "1"))
+SHARED_STATE_STALE_AFTER = float(os.getenv("SHARED_STATE_STALE_AFTER", "30"))
+SHARED_EVENT_RETENTION = float(os.getenv("SHARED_EVENT_RETENTION", "86400"))
+WRITER_SOCKET = os.getenv("WRITER_SOCKET", f"{DB_PATH}.writer.sock")
+WRITER_TIMEOUT = float(os.getenv("WRITER_TIMEOUT", "30"))
+WRITER_CONNECT_TIMEOUT = float(os.getenv("WRITER_CONNECT_TIMEOUT", "15"))
+
+# Database methods the designated writer executes on behalf of the other workers
+WRITE_METHODS = {"write_rows", "create_job", "update_job", "fail_unfinished_jobs", "save_revoked_token"}
+
+# Write batches carry full answers; allow lines well beyond asyncio's 64 KB default
+STREAM_LIMIT = 16 * 1024 * 1024
+
+class FileLock:
+    """Exclusive advisory lock on a file; the OS releases it if the process dies"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if fcntl is None:
+            raise RuntimeError("Multi-worker mode needs fcntl (not available on this platform)")
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+class WriterServer:
+    """Runs database writes sent by the other workers over a unix socket (newline-delimited JSON)"""
+
+    def __init__(self, path: str, database: Database):
+        self.path = path
+        self.database = database
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks = set()
+        self._connections: Set[asyncio.StreamWriter] = set()
+
+        # Metrics
+        self.requests = 0
+        self.errors = 0
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left behind by a writer that died
+        self._server = await asyncio.start_unix_server(self._handle, self.path, limit=STREAM_LIMIT)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Followers see the disconnect and elect a new writer (wait_closed also waits for these on 3.12+)
+            for connection in list(self._connections):
+                connection.close()
+            await self._server.wait_closed()
+            self._server = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                # Requests on one connection run concurrently; replies are matched by id
+                task = asyncio.create_task(self._dispatch(json.loads(line), writer))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, message: Dict[str, Any], writer: asyncio.StreamWriter):
+        self.requests += 1
+        method = message.get("method")
+        try:
+            if method not in WRITE_METHODS:
+                raise ValueError(f"Unknown write method: {method}")
+            reply = {"id": message["id"], "result": await getattr(self.database, method)(*message.get("params", []))}
+        except Exception as e:
+            self.errors += 1
+            reply = {"id": message["id"], "error": str(e)}
+        if not writer.is_closing():
+            writer.write((json.dumps(reply, default=str) + "\n").encode("utf-8"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "errors": self.errors}
+
+class WriterClient:
+    """One multiplexed connection from a worker to the designated writer"""
+
+    def __init__(
+        self,
+        path: str,
+        promote: Callable[[], Awaitable[bool]],
+        local: Callable[..., Awaitable[Any]]
+    ):
+        self.path = path
+        self.promote = promote  # returns True once this worker has taken over as writer
+        self.local = local      # runs a write in this process after a takeover
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
+        self.promoted = False
+
+        # Metrics
+        self.calls = 0
+        self.reconnects = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _connect(self) -> bool:
+        """Connect, waiting for the writer to come up; False if this worker became the writer instead"""
+        async with self._connect_lock:
+            if self.promoted:
+                return False
+            deadline = time.monotonic() + WRITER_CONNECT_TIMEOUT
+            while not self.connected:
+                try:
+                    self._reader, self._writer = await asyncio.open_unix_connection(self.path, limit=STREAM_LIMIT)
+                except OSError:
+                    if await self.promote():
+                        self.promoted = True
+                        return False
+                    if time.monotonic() > deadline:
+                        raise ConnectionError("Designated database writer is not reachable")
+                    await asyncio.sleep(0.1)
+                    continue
+                if self._reader_task is not None:
+                    self.reconnects += 1
+                self._reader_task = asyncio.create_task(self._read_loop(self._reader, self._writer))
+            return True
+
+    async def _read_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                future = self._pending.pop(message.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    future.set_exception(RuntimeError(message["error"]))
+                else:
+                    future.set_result(message.get("result"))
+        finally:
+            writer.close()
+            if self._writer is writer:
+                self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Lost connection to the database writer"))
+            self._pending.clear()
+
+    async def call(self, method: str, *params) -> Any:
+        """Run a Database write method in the writer process and return its result"""
+        self.calls += 1
+        if not self.connected and not await self._connect():
+            return await self.local(method, *params)
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._writer.write((json.dumps({"id": request_id, "method": method, "params": params}, default=str) + "\n").encode("utf-8"))
+        try:
+            return await asyncio.wait_for(future, WRITER_TIMEOUT)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"connected": self.connected, "calls": self.calls, "pending": len(self._pending), "reconnects": self.reconnects}
+
+class SharedState:
+    """State every worker sees, in a small SQLite WAL file next to the database
+
+    Holds an append-only event log (workers poll it and dispatch events to
+    subscribers) and the latest metrics/stats snapshot of each worker, so
+    any worker can answer /metrics for the whole deployment.
+    """
+
+    def __init__(self, path: str = SHARED_STATE_PATH, interval: float = SHARED_STATE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.pid = os.getpid()
+        # Unlike the pid, never reused by a later process (owns this worker's image jobs)
+        self.instance = f"{self.pid}-{secrets.token_hex(4)}"
+        self.role = "single"
+        self._db: Optional[aiosqlite.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._snapshot: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None
+        self._subscribers: Dict[str, List[Callable[[Any], Any]]] = {}
+        self._replay: set = set()
+        self._start_seq = 0
+        self._last_seq = 0
+        self._peers: List[Dict[str, Any]] = []
+
+        # Metrics
+        self.published = 0
+        self.received = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    async def open(self, snapshot: Callable[[], Awaitable[Dict[str, Any]]]):
+        """Open the shared file and start publishing this worker's snapshot"""
+        self._db = await aiosqlite.connect(self.path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.execute("PRAGMA busy_timeout=5000")
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS workers (
+                pid INTEGER PRIMARY KEY,
+                role TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                snapshot TEXT NOT NULL
+            )
+        """)
+        await self._db.commit()
+        cursor = await self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM events")
+        self._start_seq = (await cursor.fetchone())[0]
+        self._snapshot = snapshot
+        await self._sync()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._db is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await self._db.execute("DELETE FROM workers WHERE pid = ?", (self.pid,))
+        await self._db.commit()
+        await self._db.close()
+        self._db = None
+
+    def subscribe(self, kind: str, callback: Callable[[Any], Any], replay: bool = False):
+        """Call callback(payload) for events of this kind published by any worker
+
+        With replay, events retained from before this worker started are
+        delivered too (for state such as revocations, not notifications).
+        """
+        self._subscribers.setdefault(kind, []).append(callback)
+        if replay:
+            self._replay.add(kind)
+
+    async def publish(self, kind: str, payload: Any):
+        """Append an event; every worker (including this one) receives it on its next poll"""
+        if self._db is None:
+            return
+        await self._db.execute(
+            "INSERT INTO events (kind, payload, created_at) VALUES (?, ?, ?)",
+            (kind, json.dumps(payload), time.time())
+        )
+        await self._db.commit()
+        self.published += 1
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self._sync()
+            except Exception as e:
+                logger.warning("Shared state sync error: %s", e)
+
+    async def _sync(self):
+        """Publish our snapshot, read the peers', deliver new events and prune old rows"""
+        now = time.time()
+        snapshot = json.dumps({**await self._snapshot(), "instance": self.instance}, default=str)
+        await self._db.execute(
+            "INSERT OR REPLACE INTO workers (pid, role, updated_at, snapshot) VALUES (?, ?, ?, ?)",
+            (self.pid, self.role, now, snapshot)
+        )
+        await self._db.execute("DELETE FROM workers WHERE updated_at < ?", (now - SHARED_STATE_STALE_AFTER,))
+        await self._db.execute("DELETE FROM events WHERE created_at < ?", (now - SHARED_EVENT_RETENTION,))
+        await self._db.commit()
+
+        cursor = await self._db.execute("SELECT pid, role, updated_at, snapshot FROM workers WHERE pid != ?", (self.pid,))
+        self._peers = [
+            {"pid": pid, "role": role, "updated_at": updated_at, **json.loads(data)}
+            for pid, role, updated_at, data in await cursor.fetchall()
+        ]
+
+        cursor = await self._db.execute(
+            "SELECT seq, kind, payload FROM events WHERE seq > ? ORDER BY seq", (self._last_seq,)
+        )
+        for seq, kind, payload in await cursor.fetchall():
+            self._last_seq = seq
+            if seq <= self._start_seq and kind not in self._replay:
+                continue
+            self.received += 1
+            for callback in self._subscribers.get(kind, ()):
+                try:
+                    result = callback(json.loads(payload))
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception as e:
+                    logger.warning("Shared event handler error (%s): %s", kind, e)
+
+    def peers(self) -> List[Dict[str, Any]]:
+        """Latest snapshots published by the other live workers"""
+        return list(self._peers)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "pid": self.pid,
+            "role": self.role,
+            "published": self.published,
+            "received": self.received,
+            "peers": {str(p["pid"]): {"role": p["role"], "age_s": round(now - p["updated_at"], 1)} for p in self._peers}
+        }
+
+class Cluster:
+    """Coordinates the worker processes of a multi-worker deployment
+
+    Migrations run under a file lock so only one worker applies them. One
+    worker holds the writer lock and owns every database write (including
+    the write-behind queue); the others forward writes to it over a unix
+    socket. If the writer dies, the next worker to need it takes over.
+    """
+
+    def __init__(self, database: Database, enabled: bool = MULTI_WORKER, db_path: str = DB_PATH):
+        self.enabled = enabled
+        self.database = database
+        self.shared = SharedState()
+        self._migrate_lock = FileLock(f"{db_path}.migrate.lock")
+        self._writer_lock = FileLock(f"{db_path}.writer.lock")
+        self.server: Optional[WriterServer] = None
+        self.client: Optional[WriterClient] = None
+        self.promotions = 0
+
+    @property
+    def workers(self) -> int:
+        """Workers in the deployment: this one plus the live peers, never fewer than WEB_CONCURRENCY"""
+        if not self.enabled:
+            return 1
+        return max(WEB_CONCURRENCY, 1 + len(self.shared._peers))
+
+    @property
+    def is_writer(self) -> bool:
+        return self.shared.role in ("single", "writer")
+
+    def live_instances(self) -> List[str]:
+        """This worker and its live peers; once we hold the writer lock, a peer still listed as writer is dead"""
+        live = [self.shared.instance]
+        for peer in self.shared.peers():
+            if peer.get("instance") and not (self.is_writer and peer["role"] == "writer"):
+                live.append(peer["instance"])
+        return live
+
+    async def migrate(self, create_tables: Callable[[], Awaitable[None]]):
+        """Apply schema migrations, one worker at a time"""
+        if not self.enabled:
+            await create_tables()
+            return
+        await asyncio.to_thread(self._migrate_lock.acquire)
+        try:
+            await create_tables()
+        finally:
+            self._migrate_lock.release()
+
+    async def elect(self) -> bool:
+        """Try to become the designated writer; otherwise route writes to it"""
+        if not self.enabled:
+            return True
+        if await asyncio.to_thread(self._writer_lock.acquire, False):
+            self.shared.role = "writer"
+            return True
+        self.shared.role = "follower"
+        self.client = WriterClient(WRITER_SOCKET, self._try_promote, self._call_local)
+        self.database.remote = self.client
+        return False
+
+    async def serve(self):
+        """Start accepting forwarded writes (the writer calls this once its startup is done)"""
+        if self.enabled and self.server is None:
+            self.server = WriterServer(WRITER_SOCKET, self.database)
+            await self.server.start()
+
+    async def _try_promote(self) -> bool:
+        """Take over as writer if the previous one has died (its lock is released with it)"""
+        if not await asyncio.to_thread(self._writer_lock.acquire, False):
+            return False
+        logger.warning("Worker %s took over as database writer", self.shared.pid)
+        self.promotions += 1
+        self.shared.role = "writer"
+        self.database.remote = None
+        if QA_WRITE_BEHIND and not write_behind.running:
+            write_behind.start(self.database.insert_rows)
+        await self.serve()
+        # The previous writer's jobs will never finish; the live workers' jobs are left alone
+        await self.database.fail_unfinished_jobs("Interrupted: its worker stopped", self.live_instances())
+        return True
+
+    async def _call_local(self, method: str, *params) -> Any:
+        return await getattr(self.database, method)(*params)
+
+    async def close(self):
+        if self.server is not None:
+            await self.server.stop()
+            self.server = None
+        if self.client is not None:
+            await self.client.close()
+        await self.shared.close()
+        self._writer_lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"enabled": self.enabled, "workers": self.workers, "promotions": self.promotions}
+        if self.enabled:
+            stats["shared_state"] = self.shared.stats()
+            if self.server is not None:
+                stats["writer_server"] = self.server.stats()
+            if self.client is not None and self.database.remote is not None:
+                stats["writer_client"] = self.client.stats()
+        return stats
+
+# Global cluster coordinator (inactive unless WEB_CONCURRENCY > 1 or MULTI_WORKER is set)
+cluster = Cluster(database)
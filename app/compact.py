@@ -0,0 +1,299 @@
+"""
+Compact storage for qa_entries.
+
+In compact format, answers live once each in qa_answers (deduplicated by
+SHA-256, compressed with zstd when installed or zlib otherwise, using a
+dictionary trained on stored answers), and qa_entries rows hold an
+answer_id plus an integer epoch-millisecond timestamp. Database read
+methods decode both formats transparently.
+
+    python -m app.compact migrate   # convert an existing database (offline)
+    python -m app.compact train     # train a new dictionary from stored answers
+    python -m app.compact stats     # storage and deduplication figures
+"""
+import os
+import re
+import sys
+import zlib
+import asyncio
+import hashlib
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Set, Tuple
+import aiosqlite
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+# New databases start in compact format when set (existing ones need `migrate`)
+QA_COMPACT_STORAGE = os.getenv("QA_COMPACT_STORAGE", "").lower() in ("1", "true", "yes")
+QA_DICT_SIZE = int(os.getenv("QA_DICT_SIZE", "32768"))
+QA_DICT_SAMPLES = int(os.getenv("QA_DICT_SAMPLES", "5000"))
+QA_COMPRESSION_LEVEL = int(os.getenv("QA_COMPRESSION_LEVEL", "9"))
+
+# Codec ids stored with each answer blob
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+# zlib preset dictionaries are limited to the 32 KiB window
+ZLIB_MAX_DICT = 32768
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?:\n])\s+")
+
+def to_epoch_ms(value: Any) -> int:
+    """Epoch milliseconds for a datetime or a stored DATETIME string"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return int(value.timestamp() * 1000)
+
+def from_epoch_ms(value: int) -> str:
+    """Stored epoch milliseconds rendered like the plain-format DATETIME text"""
+    return str(datetime.fromtimestamp(value / 1000))
+
+def answer_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+def train_dictionary(samples: List[str], size: int = QA_DICT_SIZE) -> Optional[Tuple[str, bytes]]:
+    """Train a shared dictionary from sample answers: (codec name, data), or None without samples"""
+    if not samples:
+        return None
+    if zstandard is not None:
+        try:
+            trained = zstandard.train_dictionary(size, [s.encode("utf-8") for s in samples])
+            return "zstd", trained.as_bytes()
+        except zstandard.ZstdError:
+            pass  # too few samples for zstd training; fall back to a zlib preset dictionary
+
+    # zlib: the most frequently repeated sentences, most frequent last (nearest the data)
+    size = min(size, ZLIB_MAX_DICT)
+    sentences = Counter(
+        sentence for sample in samples for sentence in _SENTENCE_SPLIT.split(sample) if len(sentence) >= 8
+    )
+    chosen: List[bytes] = []
+    total = 0
+    for sentence, count in sentences.most_common():
+        if count < 2:
+            break
+        data = sentence.encode("utf-8") + b" "
+        if total + len(data) <= size:
+            chosen.append(data)
+            total += len(data)
+
+    # Fill what is left with common words
+    words = Counter(word for sample in samples for word in sample.split() if len(word) > 3)
+    filler: List[bytes] = []
+    for word, _ in words.most_common():
+        data = word.encode("utf-8") + b" "
+        if total + len(data) > size:
+            break
+        filler.append(data)
+        total += len(data)
+    return "zlib", b"".join(reversed(filler)) + b"".join(reversed(chosen))
+
+class AnswerCodec:
+    """Encodes and decodes answer blobs, caching dictionaries loaded from qa_dicts"""
+
+    def __init__(self, level: int = QA_COMPRESSION_LEVEL):
+        self.level = level
+        self.dicts: Dict[int, Tuple[str, bytes]] = {}
+        self.current_dict_id: Optional[int] = None
+        self._zstd_compressors: Dict[Optional[int], Any] = {}
+        self._zstd_decompressors: Dict[Optional[int], Any] = {}
+
+    async def load(self, db: aiosqlite.Connection):
+        """Load every stored dictionary; the newest is used for new answers"""
+        cursor = await db.execute("SELECT id, codec, data FROM qa_dicts ORDER BY id")
+        for dict_id, codec, data in await cursor.fetchall():
+            self.dicts[dict_id] = (codec, bytes(data))
+            self.current_dict_id = dict_id
+        self._zstd_compressors.clear()
+        self._zstd_decompressors.clear()
+
+    def _zstd_dict(self, dict_id: Optional[int]):
+        if dict_id is None:
+            return None
+        return zstandard.ZstdCompressionDict(self.dicts[dict_id][1])
+
+    def encode(self, text: str) -> Tuple[int, Optional[int], bytes]:
+        """(codec, dict_id, body) for an answer; raw when compression does not help"""
+        raw = text.encode("utf-8")
+        dict_id = self.current_dict_id
+        codec_name = self.dicts[dict_id][0] if dict_id is not None else ("zstd" if zstandard is not None else "zlib")
+
+        if codec_name == "zstd" and zstandard is not None:
+            compressor = self._zstd_compressors.get(dict_id)
+            if compressor is None:
+                compressor = self._zstd_compressors[dict_id] = zstandard.ZstdCompressor(
+                    level=self.level, dict_data=self._zstd_dict(dict_id)
+                )
+            codec, body = CODEC_ZSTD, compressor.compress(raw)
+        else:
+            if codec_name != "zlib":
+                dict_id = None  # zstd dictionary but zstandard is not installed
+            if dict_id is not None:
+                compressor = zlib.compressobj(self.level, zdict=self.dicts[dict_id][1])
+            else:
+                compressor = zlib.compressobj(self.level)
+            codec, body = CODEC_ZLIB, compressor.compress(raw) + compressor.flush()
+
+        if len(body) >= len(raw):
+            return CODEC_RAW, None, raw
+        return codec, dict_id, body
+
+    def decode(self, codec: int, dict_id: Optional[int], body: bytes) -> str:
+        """Inverse of encode; raises KeyError for a dictionary that is not loaded yet"""
+        if codec == CODEC_RAW:
+            return bytes(body).decode("utf-8")
+        if codec == CODEC_ZLIB:
+            if dict_id is not None:
+                decompressor = zlib.decompressobj(zdict=self.dicts[dict_id][1])
+            else:
+                decompressor = zlib.decompressobj()
+            return (decompressor.decompress(body) + decompressor.flush()).decode("utf-8")
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("Answer is zstd-compressed; install the zstandard package")
+            decompressor = self._zstd_decompressors.get(dict_id)
+            if decompressor is None:
+                decompressor = self._zstd_decompressors[dict_id] = zstandard.ZstdDecompressor(
+                    dict_data=self._zstd_dict(dict_id)
+                )
+            return decompressor.decompress(body).decode("utf-8")
+        raise ValueError(f"Unknown answer codec {codec}")
+
+async def is_compact(db: aiosqlite.Connection) -> bool:
+    """Whether this database stores qa_entries in compact format"""
+    cursor = await db.execute("SELECT value FROM qa_storage WHERE key = 'format'")
+    row = await cursor.fetchone()
+    return row is not None and row[0] == "compact"
+
+async def mark_compact(db: aiosqlite.Connection):
+    """Switch the database to compact format
+
+    The FTS sync triggers read answer text from qa_entries, which is empty in
+    compact rows, so they are dropped; the app indexes new rows itself.
+    """
+    for trigger in ("qa_entries_fts_insert", "qa_entries_fts_delete", "qa_entries_fts_update"):
+        await db.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    await db.execute("INSERT OR REPLACE INTO qa_storage (key, value) VALUES ('format', 'compact')")
+
+async def store_dictionary(db: aiosqlite.Connection, samples: List[str]) -> Optional[int]:
+    """Train and store a dictionary from sample answers; returns its id"""
+    trained = train_dictionary(samples)
+    if trained is None:
+        return None
+    codec, data = trained
+    cursor = await db.execute(
+        "INSERT INTO qa_dicts (codec, data, created_at) VALUES (?, ?, ?)",
+        (codec, data, to_epoch_ms(datetime.now()))
+    )
+    return cursor.lastrowid
+
+async def _sample_answers(db: aiosqlite.Connection, codec: AnswerCodec, limit: int = QA_DICT_SAMPLES) -> List[str]:
+    """Recent distinct answers from both plain and compact rows"""
+    cursor = await db.execute(
+        "SELECT answer FROM qa_entries WHERE answer_id IS NULL AND answer != '' ORDER BY id DESC LIMIT ?",
+        (limit,)
+    )
+    samples = [row[0] for row in await cursor.fetchall()]
+    cursor = await db.execute(
+        "SELECT codec, dict_id, body FROM qa_answers ORDER BY id DESC LIMIT ?",
+        (max(0, limit - len(samples)),)
+    )
+    samples.extend(codec.decode(c, d, b) for c, d, b in await cursor.fetchall())
+    return list(dict.fromkeys(samples))
+
+async def migrate(db_path: str, batch_size: int = 1000) -> Dict[str, Any]:
+    """Convert plain qa_entries rows to compact format in place, then VACUUM"""
+    from .database import Database, create_tables
+
+    await create_tables(db_path)
+    size_before = os.path.getsize(db_path)
+    # Answers are stored through the same code path as compact saves
+    store = Database(db_path)
+    async with aiosqlite.connect(db_path) as db:
+        codec = store.codec
+        await codec.load(db)
+        if codec.current_dict_id is None:
+            await store_dictionary(db, await _sample_answers(db, codec))
+            await codec.load(db)
+        await mark_compact(db)
+        await db.commit()  # also when there are no rows to convert
+
+        answer_ids: Set[int] = set()
+        converted = 0
+        last_id = 0
+        while True:
+            cursor = await db.execute(
+                "SELECT id, answer, timestamp FROM qa_entries WHERE id > ? AND answer_id IS NULL ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            )
+            rows = await cursor.fetchall()
+            if not rows:
+                break
+            updates = []
+            for row_id, answer, timestamp in rows:
+                answer_id = await store._answer_id(db, answer)
+                answer_ids.add(answer_id)
+                updates.append((answer_id, to_epoch_ms(timestamp) if timestamp is not None else None, row_id))
+            await db.executemany(
+                "UPDATE qa_entries SET answer = '', answer_id = ?, timestamp = ? WHERE id = ?",
+                updates
+            )
+            await db.commit()
+            converted += len(rows)
+            last_id = rows[-1][0]
+
+    async with aiosqlite.connect(db_path) as db:
+        await db.execute("VACUUM")
+    return {
+        "converted_rows": converted,
+        "distinct_answers": len(answer_ids),
+        "bytes_before": size_before,
+        "bytes_after": os.path.getsize(db_path)
+    }
+
+async def train(db_path: str) -> Optional[int]:
+    """Train a new dictionary from stored answers; later answers are encoded with it"""
+    async with aiosqlite.connect(db_path) as db:
+        codec = AnswerCodec()
+        await codec.load(db)
+        dict_id = await store_dictionary(db, await _sample_answers(db, codec))
+        await db.commit()
+        return dict_id
+
+async def stats(db_path: str) -> Dict[str, Any]:
+    """Storage figures for qa_entries and the answer store"""
+    async with aiosqlite.connect(db_path) as db:
+        async def scalar(query: str):
+            return (await (await db.execute(query)).fetchone())[0]
+
+        return {
+            "format": "compact" if await is_compact(db) else "plain",
+            "entries": await scalar("SELECT COUNT(*) FROM qa_entries"),
+            "plain_answer_bytes": await scalar("SELECT COALESCE(SUM(LENGTH(CAST(answer AS BLOB))), 0) FROM qa_entries"),
+            "distinct_answers": await scalar("SELECT COUNT(*) FROM qa_answers"),
+            "compressed_answer_bytes": await scalar("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM qa_answers"),
+            "dictionaries": await scalar("SELECT COUNT(*) FROM qa_dicts"),
+            "file_bytes": os.path.getsize(db_path)
+        }
+
+if __name__ == "__main__":
+    from .database import DB_PATH
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    path = sys.argv[2] if len(sys.argv) > 2 else DB_PATH
+    if command == "migrate":
+        print(asyncio.run(migrate(path)))
+    elif command == "train":
+        print({"dict_id": asyncio.run(train(path))})
+    elif command == "stats":
+        print(asyncio.run(stats(path)))
+    else:
+        print(f"Unknown command {command}; use migrate, train or stats")
+        sys.exit(2)
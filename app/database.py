@@ -1,79 +1,870 @@
 import os
+import re
+import json
+import base64
+import logging
+import time
+import asyncio
+import secrets
 import sqlite3
 import aiosqlite
-from datetime import datetime
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional, Dict, Any, List, Tuple, Union
+from .metrics import timed
+from .compact import QA_COMPACT_STORAGE, AnswerCodec, answer_hash, from_epoch_ms, is_compact, mark_compact, to_epoch_ms
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
 DB_PATH = DATABASE_URL.replace("sqlite:///", "")
 
-async def create_tables():
-    """Create database tables if they don't exist"""
-    async with aiosqlite.connect(DB_PATH) as db:
+# Connection pool configuration
+DB_POOL_READERS = int(os.getenv("DB_POOL_READERS", "4"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(64 * 1024 * 1024)))
+
+# Write-behind persistence for Q&A saves
+QA_WRITE_BEHIND = os.getenv("QA_WRITE_BEHIND", "").lower() in ("1", "true", "yes")
+QA_WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("QA_WRITE_BEHIND_QUEUE_SIZE", "10000"))
+QA_WRITE_BEHIND_BATCH_SIZE = int(os.getenv("QA_WRITE_BEHIND_BATCH_SIZE", "200"))
+QA_WRITE_BEHIND_FLUSH_MS = int(os.getenv("QA_WRITE_BEHIND_FLUSH_MS", "50"))
+# A failed batch is retried with exponential backoff, then written row by row
+QA_WRITE_BEHIND_RETRIES = int(os.getenv("QA_WRITE_BEHIND_RETRIES", "3"))
+QA_WRITE_BEHIND_RETRY_MS = int(os.getenv("QA_WRITE_BEHIND_RETRY_MS", "100"))
+
+logger = logging.getLogger(__name__)
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}",
+    f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}",
+    f"PRAGMA mmap_size={DB_MMAP_SIZE}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for exact-match lookups (case, punctuation, spacing)"""
+    return _NON_WORD.sub(" ", question.lower()).strip()
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+def new_ulid() -> str:
+    """Time-ordered unique id (ULID): 48-bit millisecond timestamp + 80 random bits"""
+    value = (int(time.time() * 1000) << 80) | secrets.randbits(80)
+    chars = []
+    for _ in range(26):
+        chars.append(_CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+async def _migration_create_qa_entries(db: aiosqlite.Connection):
+    """v1: the original qa_entries table"""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS qa_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+async def _migration_question_norm(db: aiosqlite.Connection):
+    """v2: normalized-question column and index for the answer cache"""
+    cursor = await db.execute("PRAGMA table_info(qa_entries)")
+    columns = [row[1] for row in await cursor.fetchall()]
+    if "question_norm" not in columns:
+        await db.execute("ALTER TABLE qa_entries ADD COLUMN question_norm TEXT")
+        cursor = await db.execute("SELECT id, question FROM qa_entries")
+        rows = await cursor.fetchall()
+        await db.executemany(
+            "UPDATE qa_entries SET question_norm = ? WHERE id = ?",
+            [(normalize_question(question), row_id) for row_id, question in rows]
+        )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_qa_entries_question_norm ON qa_entries (question_norm)"
+    )
+
+async def _migration_image_jobs(db: aiosqlite.Connection):
+    """v3: image job table"""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS image_jobs (
+            id TEXT PRIMARY KEY,
+            prompt TEXT NOT NULL,
+            status TEXT NOT NULL,
+            progress INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+async def _migration_timestamp_index(db: aiosqlite.Connection):
+    """v4: index for newest-first history queries"""
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_qa_entries_timestamp ON qa_entries (timestamp, id)"
+    )
+
+async def _migration_fts(db: aiosqlite.Connection):
+    """v5: FTS5 index over question/answer, kept in sync by triggers"""
+    try:
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS qa_entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                question TEXT NOT NULL,
-                answer TEXT NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
+            CREATE VIRTUAL TABLE IF NOT EXISTS qa_entries_fts
+            USING fts5(question, answer, content='qa_entries', content_rowid='id')
         """)
-        await db.commit()
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5: history search falls back to LIKE
+        logger.warning("FTS5 unavailable: %s", e)
+        return
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS qa_entries_fts_insert AFTER INSERT ON qa_entries BEGIN
+            INSERT INTO qa_entries_fts (rowid, question, answer) VALUES (new.id, new.question, new.answer);
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS qa_entries_fts_delete AFTER DELETE ON qa_entries BEGIN
+            INSERT INTO qa_entries_fts (qa_entries_fts, rowid, question, answer) VALUES ('delete', old.id, old.question, old.answer);
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS qa_entries_fts_update AFTER UPDATE OF question, answer ON qa_entries BEGIN
+            INSERT INTO qa_entries_fts (qa_entries_fts, rowid, question, answer) VALUES ('delete', old.id, old.question, old.answer);
+            INSERT INTO qa_entries_fts (rowid, question, answer) VALUES (new.id, new.question, new.answer);
+        END
+    """)
+    await db.execute("INSERT INTO qa_entries_fts (qa_entries_fts) VALUES ('rebuild')")
+
+async def _migration_uid(db: aiosqlite.Connection):
+    """v6: client-generated ULID per Q&A entry, stable before the row is written"""
+    cursor = await db.execute("PRAGMA table_info(qa_entries)")
+    columns = [row[1] for row in await cursor.fetchall()]
+    if "uid" not in columns:
+        await db.execute("ALTER TABLE qa_entries ADD COLUMN uid TEXT")
+    await db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_qa_entries_uid ON qa_entries (uid)")
+
+async def _migration_compact_storage(db: aiosqlite.Connection):
+    """v7: tables for the optional compact format (deduplicated, compressed answers)"""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS qa_answers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash BLOB NOT NULL UNIQUE,
+            codec INTEGER NOT NULL,
+            dict_id INTEGER,
+            body BLOB NOT NULL
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS qa_dicts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codec TEXT NOT NULL,
+            data BLOB NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+    """)
+    await db.execute("CREATE TABLE IF NOT EXISTS qa_storage (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    cursor = await db.execute("PRAGMA table_info(qa_entries)")
+    columns = [row[1] for row in await cursor.fetchall()]
+    if "answer_id" not in columns:
+        await db.execute("ALTER TABLE qa_entries ADD COLUMN answer_id INTEGER")
+
+async def _migration_revoked_tokens(db: aiosqlite.Connection):
+    """v8: revoked access tokens (by hash), kept until the token would have expired"""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            token_hash TEXT PRIMARY KEY,
+            expires_at REAL NOT NULL
+        )
+    """)
+
+async def _migration_job_owner(db: aiosqlite.Connection):
+    """v9: the worker instance that owns each image job, so recovery only fails jobs of dead workers"""
+    cursor = await db.execute("PRAGMA table_info(image_jobs)")
+    columns = [row[1] for row in await cursor.fetchall()]
+    if "owner" not in columns:
+        await db.execute("ALTER TABLE image_jobs ADD COLUMN owner TEXT")
+
+# Schema migrations, applied in order; PRAGMA user_version records the last applied.
+# Each step is idempotent so databases created by older create_tables() versions
+# (which never set user_version) upgrade cleanly.
+MIGRATIONS = [
+    _migration_create_qa_entries,
+    _migration_question_norm,
+    _migration_image_jobs,
+    _migration_timestamp_index,
+    _migration_fts,
+    _migration_uid,
+    _migration_compact_storage,
+    _migration_revoked_tokens,
+    _migration_job_owner,
+]
+
+async def create_tables(db_path: str = DB_PATH):
+    """Create database tables if they don't exist and apply pending migrations"""
+    async with aiosqlite.connect(db_path) as db:
+        cursor = await db.execute("PRAGMA user_version")
+        version = (await cursor.fetchone())[0]
+
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            await migration(db)
+            await db.execute(f"PRAGMA user_version = {number}")
+            await db.commit()
+
+        # QA_COMPACT_STORAGE only switches empty databases; existing ones are converted offline
+        if QA_COMPACT_STORAGE and not await is_compact(db):
+            if (await (await db.execute("SELECT COUNT(*) FROM qa_entries")).fetchone())[0] == 0:
+                await mark_compact(db)
+                await db.commit()
+            else:
+                logger.warning("QA_COMPACT_STORAGE is set but the database has plain entries; run python -m app.compact migrate")
+
+class ConnectionPool:
+    """Long-lived SQLite connections: one serialized writer and N readers"""
+
+    def __init__(self, db_path: str = DB_PATH, readers: int = DB_POOL_READERS):
+        self.db_path = db_path
+        self.size = max(1, readers)
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._readers: "asyncio.Queue[aiosqlite.Connection]" = asyncio.Queue()
+        self._all_readers = []
+        self._closed = True
+
+        # Metrics
+        self.read_acquires = 0
+        self.write_acquires = 0
+        self.read_wait_total = 0.0
+        self.write_wait_total = 0.0
+        self.read_wait_max = 0.0
+        self.write_wait_max = 0.0
+        self.waiting = 0
+
+    async def _connect(self) -> aiosqlite.Connection:
+        """Open a connection with the tuned pragmas applied"""
+        conn = await aiosqlite.connect(self.db_path)
+        conn.row_factory = aiosqlite.Row
+        for pragma in PRAGMAS:
+            await conn.execute(pragma)
+        return conn
+
+    async def open(self):
+        """Open the writer and reader connections"""
+        if not self._closed:
+            return
+        self._writer = await self._connect()
+        for _ in range(self.size):
+            conn = await self._connect()
+            self._all_readers.append(conn)
+            self._readers.put_nowait(conn)
+        self._closed = False
+
+    async def close(self):
+        """Close all pooled connections, waiting for in-flight writes"""
+        if self._closed:
+            return
+        self._closed = True
+        async with self._write_lock:
+            if self._writer is not None:
+                await self._writer.close()
+                self._writer = None
+        for conn in self._all_readers:
+            await conn.close()
+        self._all_readers = []
+        self._readers = asyncio.Queue()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @asynccontextmanager
+    async def reader(self):
+        """Borrow a reader connection from the pool"""
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            conn = await self._readers.get()
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - start
+        self.read_acquires += 1
+        self.read_wait_total += waited
+        self.read_wait_max = max(self.read_wait_max, waited)
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def writer(self):
+        """Take exclusive use of the writer connection"""
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._write_lock.acquire()
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - start
+        self.write_acquires += 1
+        self.write_wait_total += waited
+        self.write_wait_max = max(self.write_wait_max, waited)
+        try:
+            yield self._writer
+        except BaseException:
+            # Never leave a failed caller's statements for the next user of the connection to commit
+            await self._writer.rollback()
+            raise
+        finally:
+            self._write_lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size and wait-time metrics"""
+        return {
+            "readers": self.size,
+            "readers_idle": self._readers.qsize(),
+            "waiting": self.waiting,
+            "read_acquires": self.read_acquires,
+            "write_acquires": self.write_acquires,
+            "read_wait_avg_ms": round(1000 * self.read_wait_total / self.read_acquires, 3) if self.read_acquires else 0.0,
+            "write_wait_avg_ms": round(1000 * self.write_wait_total / self.write_acquires, 3) if self.write_acquires else 0.0,
+            "read_wait_max_ms": round(1000 * self.read_wait_max, 3),
+            "write_wait_max_ms": round(1000 * self.write_wait_max, 3),
+            "closed": self._closed
+        }
+
+QA_INSERT = "INSERT INTO qa_entries (uid, question, answer, timestamp, question_norm) VALUES (?, ?, ?, ?, ?)"
+QA_INSERT_COMPACT = (
+    "INSERT INTO qa_entries (uid, question, answer, answer_id, timestamp, question_norm) VALUES (?, ?, '', ?, ?, ?)"
+)
+
+# Columns read for a Q&A entry in either storage format
+QA_COLUMNS = "e.id, e.uid, e.question, e.answer, e.timestamp, a.codec, a.dict_id, a.body"
+QA_SOURCE = "qa_entries e LEFT JOIN qa_answers a ON a.id = e.answer_id"
+
+class WriteBehindWriter:
+    """Queue Q&A saves in memory and insert them in batches from a background task"""
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        max_pending: int = QA_WRITE_BEHIND_QUEUE_SIZE,
+        batch_size: int = QA_WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = QA_WRITE_BEHIND_FLUSH_MS / 1000,
+        retries: int = QA_WRITE_BEHIND_RETRIES,
+        retry_delay: float = QA_WRITE_BEHIND_RETRY_MS / 1000
+    ):
+        self.pool = pool
+        self.max_pending = max_pending
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retries = max(0, retries)
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._insert_rows = None
+        self.latest_pending: Optional[Dict[str, Any]] = None
+
+        # Metrics
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self, insert_rows):
+        """Start the background drain task; insert_rows(db, rows) writes a batch"""
+        self._insert_rows = insert_rows
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._drain())
+
+    async def stop(self):
+        """Flush everything still queued, then stop"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def enqueue(self, row: Tuple) -> None:
+        """Queue one qa_entries row (waits when the queue is full)"""
+        await self._queue.put(row)
+        self.enqueued += 1
+        uid, question, answer, timestamp, _ = row
+        self.latest_pending = {"id": uid, "uid": uid, "question": question, "answer": answer, "timestamp": str(timestamp)}
+
+    async def _drain(self):
+        """Insert queued rows in one transaction per batch, on a size or time trigger"""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, rows: List[Tuple]):
+        """Insert rows in one transaction (the pool's writer rolls back if it fails)"""
+        async with self.pool.writer() as db:
+            await self._insert_rows(db, rows, return_ids=False)
+            await db.commit()
+        self.written += len(rows)
+        if self.latest_pending and self.latest_pending["id"] == rows[-1][0] and self._queue.empty():
+            self.latest_pending = None
+
+    async def _flush(self, batch: List[Tuple]):
+        """Write a batch, retrying with backoff; if it keeps failing, insert row by row so a bad row only loses itself"""
+        for attempt in range(self.retries + 1):
+            try:
+                await self._write(batch)
+                self.batches += 1
+                return
+            except Exception as e:
+                self.errors += 1
+                logger.warning("Write-behind batch of %d rows failed (attempt %d): %s", len(batch), attempt + 1, e)
+                if attempt < self.retries:
+                    await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+        for row in batch:
+            try:
+                await self._write([row])
+            except Exception:
+                # Already acknowledged to the client: record what was lost
+                self.dropped += 1
+                logger.exception("Write-behind dropped Q&A %s (question: %r)", row[0], row[1])
+                if self.latest_pending and self.latest_pending["id"] == row[0]:
+                    self.latest_pending = None  # fall back to the newest row on disk
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and flush counters"""
+        return {
+            "enabled": self.running,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "errors": self.errors,
+            "dropped": self.dropped
+        }
+
+# Global pool, opened in the application startup hook
+pool = ConnectionPool()
+write_behind = WriteBehindWriter(pool)
+
+async def init_pool(writer: bool = True):
+    """Open the global connection pool (and the write-behind writer, if enabled and this process writes)"""
+    await pool.open()
+    if QA_WRITE_BEHIND and writer:
+        write_behind.start(database.insert_rows)
+
+async def close_pool():
+    """Flush pending writes and close the global connection pool"""
+    await write_behind.stop()
+    await pool.close()
 
 class Database:
     """Database operations class"""
-    
-    def __init__(self, db_path: str = DB_PATH):
+
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        pool: Optional[ConnectionPool] = None,
+        write_behind: Optional[WriteBehindWriter] = None
+    ):
         self.db_path = db_path
-    
-    async def save_qa(self, question: str, answer: str) -> int:
-        """Save Q&A entry to database"""
-        async with aiosqlite.connect(self.db_path) as db:
+        self.pool = pool
+        self.write_behind = write_behind
+        self._fts: Optional[bool] = None
+        self._compact: Optional[bool] = None
+        self.codec = AnswerCodec()
+        self._answer_ids: "OrderedDict[bytes, int]" = OrderedDict()
+        # In multi-worker mode, non-writer workers forward writes to the designated writer
+        self.remote = None
+        # Called with the new entries after every Q&A save (e.g. the latest-entry feed)
+        self.listeners: List[Callable[[List[Dict[str, Any]]], Optional[Awaitable[None]]]] = []
+
+    @asynccontextmanager
+    async def _reader(self):
+        """Pooled reader connection, or a one-off connection without a pool"""
+        if self.pool is not None and not self.pool.closed:
+            async with self.pool.reader() as db:
+                yield db
+        else:
+            async with aiosqlite.connect(self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                yield db
+
+    @asynccontextmanager
+    async def _writer(self):
+        """Pooled writer connection, or a one-off connection without a pool"""
+        if self.pool is not None and not self.pool.closed:
+            async with self.pool.writer() as db:
+                yield db
+        else:
+            async with aiosqlite.connect(self.db_path) as db:
+                yield db
+
+    async def _is_compact(self, db: aiosqlite.Connection) -> bool:
+        """Whether qa_entries uses the compact format (checked once; loads the answer dictionaries)"""
+        if self._compact is None:
+            self._compact = await is_compact(db)
+            if self._compact:
+                await self.codec.load(db)
+        return self._compact
+
+    async def _answer_id(self, db: aiosqlite.Connection, answer: str) -> int:
+        """Id of a stored compact answer, inserting it once per distinct text"""
+        key = answer_hash(answer)
+        answer_id = self._answer_ids.get(key)
+        if answer_id is not None:
+            self._answer_ids.move_to_end(key)
+            return answer_id
+
+        cursor = await db.execute("SELECT id FROM qa_answers WHERE hash = ?", (key,))
+        row = await cursor.fetchone()
+        if row is not None:
+            answer_id = row[0]
+        else:
+            codec, dict_id, body = self.codec.encode(answer)
             cursor = await db.execute(
-                "INSERT INTO qa_entries (question, answer, timestamp) VALUES (?, ?, ?)",
-                (question, answer, datetime.now())
+                "INSERT INTO qa_answers (hash, codec, dict_id, body) VALUES (?, ?, ?, ?)",
+                (key, codec, dict_id, body)
             )
+            answer_id = cursor.lastrowid
+
+        self._answer_ids[key] = answer_id
+        if len(self._answer_ids) > 1024:
+            self._answer_ids.popitem(last=False)
+        return answer_id
+
+    async def insert_rows(self, db: aiosqlite.Connection, rows: List[Tuple], return_ids: bool = True) -> List[int]:
+        """Insert (uid, question, answer, timestamp, question_norm) rows in the database's storage format"""
+        if not await self._is_compact(db):
+            if not return_ids:
+                await db.executemany(QA_INSERT, rows)
+                return []
+            ids = []
+            for row in rows:
+                cursor = await db.execute(QA_INSERT, row)
+                ids.append(cursor.lastrowid)
+            return ids
+
+        compact_rows = []
+        for uid, question, answer, timestamp, question_norm in rows:
+            compact_rows.append((uid, question, await self._answer_id(db, answer), to_epoch_ms(timestamp), question_norm))
+        await db.executemany(QA_INSERT_COMPACT, compact_rows)
+
+        # The FTS triggers are dropped in compact format; index the plain text here
+        if await self._has_fts(db):
+            await db.executemany(
+                "INSERT INTO qa_entries_fts (rowid, question, answer) SELECT id, question, ? FROM qa_entries WHERE uid = ?",
+                [(row[2], row[0]) for row in rows]
+            )
+        if not return_ids:
+            return []
+        ids = []
+        for row in rows:
+            cursor = await db.execute("SELECT id FROM qa_entries WHERE uid = ?", (row[0],))
+            ids.append((await cursor.fetchone())[0])
+        return ids
+
+    async def _entries(self, db: aiosqlite.Connection, rows) -> List[Dict[str, Any]]:
+        """Q&A dicts from QA_COLUMNS rows, decoding compact answers and timestamps"""
+        entries = []
+        for row in rows:
+            answer = row["answer"]
+            if row["body"] is not None:
+                try:
+                    answer = self.codec.decode(row["codec"], row["dict_id"], row["body"])
+                except KeyError:
+                    await self.codec.load(db)  # dictionary trained after startup
+                    answer = self.codec.decode(row["codec"], row["dict_id"], row["body"])
+            timestamp = row["timestamp"]
+            entries.append({
+                "id": row["id"],
+                "uid": row["uid"],
+                "question": row["question"],
+                "answer": answer,
+                "timestamp": from_epoch_ms(timestamp) if isinstance(timestamp, int) else timestamp
+            })
+        return entries
+
+    async def write_rows(self, rows: List[Tuple], defer: bool = False) -> List[Union[int, str]]:
+        """Insert Q&A rows in one transaction, or queue them for write-behind when defer is set
+
+        Rows are built by the caller, so a worker forwarding them to the
+        designated writer already knows each entry's uid and timestamp.
+        """
+        if self.remote is not None:
+            return await self.remote.call("write_rows", rows, defer)
+        if defer and self.write_behind is not None and self.write_behind.running:
+            for row in rows:
+                await self.write_behind.enqueue(row)
+            return [row[0] for row in rows]
+
+        async with self._writer() as db:
+            ids = await self.insert_rows(db, rows)
             await db.commit()
-            return cursor.lastrowid
-    
+        return ids
+
+    async def _saved(self, rows: List[Tuple], ids: List[Union[int, str]]):
+        """Hand the entries just saved to the listeners"""
+        if not self.listeners:
+            return
+        entries = [
+            {"id": qa_id, "uid": uid, "question": question, "answer": answer, "timestamp": str(timestamp)}
+            for (uid, question, answer, timestamp, _), qa_id in zip(rows, ids)
+        ]
+        for listener in self.listeners:
+            try:
+                result = listener(entries)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.warning("Q&A save listener error: %s", e)
+
+    @timed("save_qa")
+    async def save_qa(self, question: str, answer: str) -> Union[int, str]:
+        """Save Q&A entry to database; in write-behind mode returns its ULID once queued"""
+        rows = [(new_ulid(), question, answer, datetime.now(), normalize_question(question))]
+        ids = await self.write_rows(rows, defer=True)
+        await self._saved(rows, ids)
+        return ids[0]
+
+    @timed("save_qa_many")
+    async def save_qa_many(self, entries: List[Tuple[str, str]]) -> List[int]:
+        """Save several Q&A entries in a single transaction"""
+        now = datetime.now()
+        rows = [(new_ulid(), question, answer, now, normalize_question(question)) for question, answer in entries]
+        ids = await self.write_rows(rows)
+        await self._saved(rows, ids)
+        return ids
+
+    @timed("get_latest_qa")
     async def get_latest_qa(self) -> Optional[Dict[str, Any]]:
         """Get the latest Q&A entry from database"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        # A queued write-behind save is newer than anything on disk
+        if self.write_behind is not None and self.write_behind.latest_pending:
+            return dict(self.write_behind.latest_pending)
+
+        async with self._reader() as db:
+            await self._is_compact(db)
+            cursor = await db.execute(
+                f"SELECT {QA_COLUMNS} FROM {QA_SOURCE} ORDER BY e.timestamp DESC, e.id DESC LIMIT 1"
+            )
+            entries = await self._entries(db, await cursor.fetchall())
+            return entries[0] if entries else None
+
+    async def get_all_qa(self, limit: int = 10, max_age: Optional[timedelta] = None) -> list:
+        """Get all Q&A entries with limit, optionally only those newer than max_age"""
+        async with self._reader() as db:
+            compact = await self._is_compact(db)
+            query = f"SELECT {QA_COLUMNS} FROM {QA_SOURCE}"
+            params: list = []
+            if max_age is not None:
+                query += " WHERE e.timestamp >= ?"
+                since = datetime.now() - max_age
+                params.append(to_epoch_ms(since) if compact else since)
+            query += " ORDER BY e.timestamp DESC, e.id DESC LIMIT ?"
+            params.append(limit)
+
+            cursor = await db.execute(query, params)
+            return await self._entries(db, await cursor.fetchall())
+
+    @timed("find_answers")
+    async def find_answers(self, question_norm: str, max_age: Optional[timedelta] = None, limit: int = 5) -> List[str]:
+        """Most recent answers stored for a normalized question"""
+        async with self._reader() as db:
+            compact = await self._is_compact(db)
+            query = f"SELECT {QA_COLUMNS} FROM {QA_SOURCE} WHERE e.question_norm = ?"
+            params: list = [question_norm]
+            if max_age is not None:
+                query += " AND e.timestamp >= ?"
+                since = datetime.now() - max_age
+                params.append(to_epoch_ms(since) if compact else since)
+            query += " ORDER BY e.id DESC LIMIT ?"
+            params.append(limit)
+
+            cursor = await db.execute(query, params)
+            return [entry["answer"] for entry in await self._entries(db, await cursor.fetchall())]
+
+    async def create_job(self, job_id: str, prompt: str, owner: Optional[str] = None) -> Dict[str, Any]:
+        """Record a newly submitted image job, owned by the worker instance that will render it"""
+        if self.remote is not None:
+            return await self.remote.call("create_job", job_id, prompt, owner)
+        now = datetime.now()
+        async with self._writer() as db:
+            await db.execute(
+                "INSERT INTO image_jobs (id, prompt, status, progress, owner, created_at, updated_at) VALUES (?, ?, 'queued', 0, ?, ?, ?)",
+                (job_id, prompt, owner, now, now)
+            )
+            await db.commit()
+        return {"job_id": job_id, "prompt": prompt, "status": "queued", "progress": 0}
+
+    async def update_job(
+        self,
+        job_id: str,
+        status: str,
+        progress: int,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> bool:
+        """Update an image job's status, progress and outcome; False if it was cancelled meanwhile"""
+        if self.remote is not None:
+            return await self.remote.call("update_job", job_id, status, progress, result, error)
+        async with self._writer() as db:
             cursor = await db.execute(
-                "SELECT * FROM qa_entries ORDER BY timestamp DESC LIMIT 1"
+                "UPDATE image_jobs SET status = ?, progress = ?, result = ?, error = ?, updated_at = ? "
+                "WHERE id = ? AND status != 'cancelled'",
+                (status, progress, json.dumps(result) if result is not None else None, error, datetime.now(), job_id)
             )
+            await db.commit()
+            return cursor.rowcount > 0
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get an image job by id"""
+        async with self._reader() as db:
+            cursor = await db.execute("SELECT * FROM image_jobs WHERE id = ?", (job_id,))
             row = await cursor.fetchone()
-            
+
             if row:
                 return {
-                    "id": row["id"],
-                    "question": row["question"],
-                    "answer": row["answer"],
-                    "timestamp": row["timestamp"]
+                    "job_id": row["id"],
+                    "prompt": row["prompt"],
+                    "status": row["status"],
+                    "progress": row["progress"],
+                    "result": json.loads(row["result"]) if row["result"] else None,
+                    "error": row["error"],
+                    "created_at": row["created_at"],
+                    "updated_at": row["updated_at"]
                 }
             return None
-    
-    async def get_all_qa(self, limit: int = 10) -> list:
-        """Get all Q&A entries with limit"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+
+    async def fail_unfinished_jobs(self, reason: str, keep: Optional[List[str]] = None) -> int:
+        """Mark jobs left queued or running by a previous process as failed, except those owned by keep"""
+        if self.remote is not None:
+            return await self.remote.call("fail_unfinished_jobs", reason, keep)
+        query = "UPDATE image_jobs SET status = 'failed', error = ?, updated_at = ? WHERE status IN ('queued', 'running')"
+        params: List[Any] = [reason, datetime.now()]
+        if keep:
+            query += f" AND (owner IS NULL OR owner NOT IN ({', '.join('?' for _ in keep)}))"
+            params.extend(keep)
+        async with self._writer() as db:
+            cursor = await db.execute(query, params)
+            await db.commit()
+            return cursor.rowcount
+
+    async def save_revoked_token(self, token_hash: str, expires_at: float) -> bool:
+        """Persist a token revocation, pruning revocations of tokens that have since expired"""
+        if self.remote is not None:
+            return await self.remote.call("save_revoked_token", token_hash, expires_at)
+        async with self._writer() as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO revoked_tokens (token_hash, expires_at) VALUES (?, ?)",
+                (token_hash, expires_at)
+            )
+            await db.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (time.time(),))
+            await db.commit()
+        return True
+
+    async def get_revoked_tokens(self) -> List[Tuple[str, float]]:
+        """Revocations of tokens that have not expired yet"""
+        async with self._reader() as db:
             cursor = await db.execute(
-                "SELECT * FROM qa_entries ORDER BY timestamp DESC LIMIT ?",
-                (limit,)
+                "SELECT token_hash, expires_at FROM revoked_tokens WHERE expires_at > ?", (time.time(),)
             )
-            rows = await cursor.fetchall()
-            
-            return [
-                {
-                    "id": row["id"],
-                    "question": row["question"],
-                    "answer": row["answer"],
-                    "timestamp": row["timestamp"]
-                }
-                for row in rows
-            ]
+            return [(row[0], row[1]) for row in await cursor.fetchall()]
+
+    async def _has_fts(self, db: aiosqlite.Connection) -> bool:
+        """Whether the FTS5 index exists (checked once per Database)"""
+        if self._fts is None:
+            cursor = await db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'qa_entries_fts'"
+            )
+            self._fts = await cursor.fetchone() is not None
+        return self._fts
+
+    @timed("get_history")
+    async def get_history(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        query: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Newest-first Q&A page using keyset pagination, optionally full-text filtered"""
+        conditions = []
+        params: list = []
+
+        if cursor:
+            after_timestamp, after_id = decode_cursor(cursor)
+            conditions.append("(e.timestamp, e.id) < (?, ?)")
+            params.extend([after_timestamp, after_id])
+
+        async with self._reader() as db:
+            await self._is_compact(db)
+            source = QA_SOURCE
+            if query:
+                if await self._has_fts(db):
+                    # Quote each term so user input cannot break FTS query syntax
+                    match = " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+                    source = f"{QA_SOURCE} JOIN qa_entries_fts f ON f.rowid = e.id"
+                    conditions.append("qa_entries_fts MATCH ?")
+                    params.append(match)
+                else:
+                    # Compact answers are compressed, so only plain rows match on answer text
+                    conditions.append("(e.question LIKE ? OR e.answer LIKE ?)")
+                    params.extend([f"%{query}%", f"%{query}%"])
+
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            rows = await (await db.execute(
+                f"SELECT {QA_COLUMNS} FROM {source} {where} "
+                "ORDER BY e.timestamp DESC, e.id DESC LIMIT ?",
+                params + [limit + 1]
+            )).fetchall()
+            items = await self._entries(db, rows[:limit])
+
+        next_cursor = None
+        if len(rows) > limit:
+            # The cursor keeps the stored timestamp (text or epoch ms) so it compares like the column
+            next_cursor = encode_cursor(rows[limit - 1]["timestamp"], items[-1]["id"])
+        return {"items": items, "next_cursor": next_cursor}
+
+def encode_cursor(timestamp: Any, row_id: int) -> str:
+    """Opaque pagination cursor for a (timestamp, id) position"""
+    raw = json.dumps([timestamp if isinstance(timestamp, int) else str(timestamp), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[Union[str, int], int]:
+    """Inverse of encode_cursor"""
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return timestamp if isinstance(timestamp, int) else str(timestamp), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid history cursor")
+
+# Shared handle bound to the global pool
+database = Database(pool=pool, write_behind=write_behind)
 
 async def get_db():
     """Dependency to get database instance"""
-    return Database()
\ No newline at end of file
+    return database
+
+if __name__ == "__main__":
+    # Apply schema migrations without starting the API: python -m app.database
+    asyncio.run(create_tables())
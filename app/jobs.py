@@ -0,0 +1,158 @@
+import os
+import math
+import time
+import uuid
+import asyncio
+from typing import Dict, Any, List, Optional, Set
+from .database import Database
+from .loop_monitor import loop_monitor
+
+# Image job queue configuration
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", "2"))
+IMAGE_JOB_QUEUE_SIZE = int(os.getenv("IMAGE_JOB_QUEUE_SIZE", "100"))
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+class ImageJobQueue:
+    """In-process worker pool that renders images as background jobs"""
+
+    def __init__(self, image_service, workers: int = IMAGE_JOB_WORKERS, max_pending: int = IMAGE_JOB_QUEUE_SIZE):
+        self.image_service = image_service
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.db: Optional[Database] = None
+        self.owner: Optional[str] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: Set[str] = set()
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.avg_job_seconds: Optional[float] = None
+
+    @property
+    def saturated(self) -> bool:
+        """Whether a new job would be refused because the queue is full"""
+        return self._queue is not None and self._queue.full()
+
+    def retry_after(self) -> int:
+        """Seconds until the queue has likely drained enough to accept a job"""
+        per_job = self.avg_job_seconds or 10.0
+        pending = self._queue.qsize() if self._queue is not None else 0
+        return max(1, min(300, math.ceil(per_job * pending / self.workers)))
+
+    async def start(self, db: Database, owner: Optional[str] = None):
+        """Start the workers; jobs submitted here are recorded as owned by this worker instance"""
+        self.db = db
+        self.owner = owner
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def recover(self, live: Optional[List[str]] = None) -> int:
+        """Mark failed the jobs interrupted by a restart: all of them, or those whose owner is not in live"""
+        return await self.db.fail_unfinished_jobs("Interrupted by server restart", live)
+
+    async def stop(self):
+        """Stop the workers, cancelling any job in progress"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def submit(self, prompt: str) -> Dict[str, Any]:
+        """Queue an image generation job and return its record"""
+        if self._queue is None:
+            raise RuntimeError("Image job queue is not running")
+        if self._queue.full():
+            raise RuntimeError("Image job queue is full, try again later")
+
+        job_id = uuid.uuid4().hex
+        job = await self.db.create_job(job_id, prompt, self.owner)
+        self._queue.put_nowait((job_id, prompt))
+        self.submitted += 1
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's status, progress and result"""
+        return await self.db.get_job(job_id)
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued or running job"""
+        job = await self.db.get_job(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return job
+
+        # A queued job is skipped by the worker; a running one is interrupted
+        self._cancel_requested.add(job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        await self.db.update_job(job_id, "cancelled", job["progress"])
+        self.cancelled += 1
+        return await self.db.get_job(job_id)
+
+    async def _worker(self):
+        """Take jobs off the queue and render them one at a time"""
+        while True:
+            job_id, prompt = await self._queue.get()
+            try:
+                if job_id in self._cancel_requested:
+                    self._cancel_requested.discard(job_id)
+                    continue
+                await self._run(job_id, prompt)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, prompt: str):
+        """Render one job, recording progress and outcome"""
+        loop_monitor.tag("image_job")
+        if not await self.db.update_job(job_id, "running", 10):
+            return  # cancelled through another worker while queued
+
+        async def report(progress: int):
+            if job_id not in self._cancel_requested and not await self.db.update_job(job_id, "running", progress):
+                # Cancelled through another worker: stop rendering
+                self._cancel_requested.add(job_id)
+                task.cancel()
+
+        task = asyncio.create_task(self.image_service.generate_image(prompt, progress=report))
+        self._running[job_id] = task
+        started = time.monotonic()
+        try:
+            result = await task
+            elapsed = time.monotonic() - started
+            self.avg_job_seconds = elapsed if self.avg_job_seconds is None else self.avg_job_seconds + 0.1 * (elapsed - self.avg_job_seconds)
+        except asyncio.CancelledError:
+            if job_id not in self._cancel_requested:
+                raise
+            self._cancel_requested.discard(job_id)
+            return
+        except Exception as e:
+            await self.db.update_job(job_id, "failed", 100, error=str(e))
+            self.failed += 1
+            return
+        finally:
+            self._running.pop(job_id, None)
+
+        if result.get("success"):
+            await self.db.update_job(job_id, "completed", 100, result=result)
+            self.completed += 1
+        else:
+            await self.db.update_job(job_id, "failed", 100, result=result, error=result.get("error"))
+            self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and job outcome counters"""
+        return {
+            "workers": self.workers,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "running": len(self._running),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled
+        }
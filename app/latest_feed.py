@@ -0,0 +1,109 @@
+import os
+import json
+import hashlib
+import asyncio
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Set
+
+# Push feed of new Q&A entries (GET /latest and GET /latest/stream)
+LATEST_FEED_QUEUE_SIZE = int(os.getenv("LATEST_FEED_QUEUE_SIZE", "100"))
+LATEST_FEED_KEEPALIVE = float(os.getenv("LATEST_FEED_KEEPALIVE", "15"))
+LATEST_FEED_MAX_SUBSCRIBERS = int(os.getenv("LATEST_FEED_MAX_SUBSCRIBERS", "1000"))
+# Streams end after this many seconds and clients reconnect, so an open feed
+# never holds up a graceful shutdown for long and clients rebalance across workers
+LATEST_FEED_MAX_AGE = float(os.getenv("LATEST_FEED_MAX_AGE", "300"))
+
+class LatestFeed:
+    """In-memory snapshot of the latest Q&A entry plus a fan-out of new entries to subscribers
+
+    The snapshot is loaded once at startup and then replaced on every save,
+    so reads never touch the database. Each subscriber owns a bounded queue;
+    a subscriber that falls behind loses its oldest undelivered entries
+    rather than slowing down the save path or the other subscribers.
+    """
+
+    def __init__(self, max_queue: int = LATEST_FEED_QUEUE_SIZE, max_subscribers: int = LATEST_FEED_MAX_SUBSCRIBERS):
+        self.max_queue = max(1, max_queue)
+        self.max_subscribers = max_subscribers
+        self.entry: Optional[Dict[str, Any]] = None
+        self.etag = self._etag(None)
+        self.loaded = False
+        self._subscribers: Set[asyncio.Queue] = set()
+        # Recently published uids: the same entry can arrive locally and from the shared event log
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+
+        # Metrics
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _etag(entry: Optional[Dict[str, Any]]) -> str:
+        body = json.dumps(entry, sort_keys=True, default=str).encode("utf-8")
+        return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+    async def load(self, db):
+        """Seed the snapshot from the database"""
+        self.entry = await db.get_latest_qa()
+        self.etag = self._etag(self.entry)
+        self.loaded = True
+
+    def publish(self, entries: List[Dict[str, Any]]):
+        """Take newly saved entries: update the snapshot and push each one to every subscriber"""
+        for entry in entries:
+            uid = entry.get("uid")
+            if uid in self._seen:
+                continue
+            self._seen[uid] = None
+            if len(self._seen) > 1024:
+                self._seen.popitem(last=False)
+
+            # ULIDs sort by creation time, so a late delivery from another worker never rolls the snapshot back
+            if self.entry is None or not self.entry.get("uid") or uid >= self.entry["uid"]:
+                self.entry = entry
+                self.etag = self._etag(entry)
+            self.published += 1
+
+            for queue in self._subscribers:
+                if queue.full():
+                    queue.get_nowait()
+                    self.dropped += 1
+                queue.put_nowait(entry)
+                self.delivered += 1
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    @contextmanager
+    def subscribe(self):
+        """Queue receiving every entry published while the block is open"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+    def result(self) -> Dict[str, Any]:
+        """The snapshot in the fetch_latest response format"""
+        if self.entry:
+            return {"found": True, "qa": self.entry}
+        return {"found": False, "message": "No Q&A entries found in database"}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "etag": self.etag,
+            "latest_uid": self.entry.get("uid") if self.entry else None,
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "rejected": self.rejected
+        }
+
+# Global latest-entry feed, loaded in the application startup hook
+latest_feed = LatestFeed()
@@ -0,0 +1,272 @@
+import os
+import logging
+import asyncio
+import random
+from typing import AsyncIterator, Dict, Any, List, Optional
+from .provider_router import ProviderRouter
+from .readiness import import_provider
+from .llm_scheduler import (
+    LLM_FALLBACK_RPM, LLM_FALLBACK_TPM, LLM_RPM, LLM_TPM,
+    LLMScheduler, estimate_prompt_tokens, request_user, token_usage
+)
+
+logger = logging.getLogger(__name__)
+
+# Shared LLM client configuration
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", "10"))
+
+# Optional second OpenAI-compatible endpoint; when set, chat() is routed between the two.
+# It needs its own key: the primary OPENAI_API_KEY is never sent to another endpoint.
+LLM_FALLBACK_BASE_URL = os.getenv("LLM_FALLBACK_BASE_URL")
+LLM_FALLBACK_API_KEY = os.getenv("LLM_FALLBACK_API_KEY")
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL")
+LLM_HEDGE = os.getenv("LLM_HEDGE", "").lower() in ("1", "true", "yes")
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "5"))
+
+# Filled from the openai SDK when the first client is built (the SDK is imported lazily)
+RETRYABLE_ERRORS: tuple = ()
+
+class LLMClient:
+    """Shared async chat-completion client with pooling, limits and retries"""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        fallback: Optional["LLMClient"] = None,
+        name: str = "primary",
+        rpm: float = LLM_RPM,
+        tpm: float = LLM_TPM
+    ):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.model = model or LLM_MODEL
+        self.fallback = fallback
+        self.max_retries = LLM_MAX_RETRIES
+        self._client = None  # openai.AsyncOpenAI, built on first use
+        self._semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        # Calls wait here (by priority) before taking a concurrency slot
+        self.scheduler = LLMScheduler(f"llm {name}", rpm=rpm, tpm=tpm)
+
+        # Metrics
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.in_flight = 0
+
+        # With a fallback endpoint, chat() goes through a router with circuit breakers
+        self.router: Optional[ProviderRouter] = None
+        if fallback is not None:
+            self.router = ProviderRouter("llm", hedge=LLM_HEDGE, hedge_delay=LLM_HEDGE_DELAY)
+            self.router.add("primary", self._chat)
+            self.router.add("fallback", lambda messages, max_tokens, temperature, model: fallback._chat(messages, max_tokens, temperature))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    async def _get_client(self):
+        """Build the AsyncOpenAI client once, on first use (importing the SDK off the event loop)"""
+        if self._client is None:
+            global RETRYABLE_ERRORS
+            httpx = await import_provider("httpx")
+            openai = await import_provider("openai")
+            RETRYABLE_ERRORS = (
+                openai.RateLimitError,
+                openai.APITimeoutError,
+                openai.APIConnectionError,
+                openai.InternalServerError,
+            )
+            http_client = httpx.AsyncClient(
+                timeout=LLM_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_KEEPALIVE_CONNECTIONS
+                )
+            )
+            self._client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=LLM_TIMEOUT,
+                max_retries=0,  # retries are handled below with backoff
+                http_client=http_client
+            )
+        return self._client
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+    async def _retry(self, attempt: int, reserved: int, error: Exception):
+        """Wait before retrying a failed call, or re-raise once retries are used up"""
+        # Retry-After pauses the scheduler, so the next acquire does the waiting
+        retry_after = self.scheduler.rejected(reserved, error)
+        if attempt >= self.max_retries:
+            self.failures += 1
+            raise error
+        self.retries += 1
+        if retry_after is None:
+            await asyncio.sleep(self._backoff(attempt))
+
+    def _failed(self, reserved: int, error: Exception):
+        """Account for a call that will not be retried; a request the upstream rejected (4xx) was never counted"""
+        self.failures += 1
+        status = getattr(error, "status_code", None)
+        if status is not None and 400 <= status < 500:
+            self.scheduler.refund(reserved)
+
+    def _record(self, reserved: int, used: int):
+        """Settle the scheduler reservation and charge the tokens to the requesting user"""
+        self.scheduler.settle(reserved, used)
+        token_usage.record(request_user.get(), used)
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        model: Optional[str] = None
+    ) -> str:
+        """Run a chat completion and return the stripped message content"""
+        if self.router is not None:
+            return await self.router.call(messages, max_tokens, temperature, model)
+        return await self._chat(messages, max_tokens, temperature, model)
+
+    async def _chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        model: Optional[str] = None
+    ) -> str:
+        """Chat completion against this client's endpoint, with rate scheduling and retries"""
+        client = await self._get_client()
+        reserved = estimate_prompt_tokens(messages) + max_tokens
+
+        for attempt in range(self.max_retries + 1):
+            await self.scheduler.acquire(reserved)
+            async with self._semaphore:
+                self.in_flight += 1
+                self.requests += 1
+                try:
+                    response = await client.chat.completions.create(
+                        model=model or self.model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature
+                    )
+                    usage = getattr(response, "usage", None)
+                    self._record(reserved, usage.total_tokens if usage else reserved)
+                    return response.choices[0].message.content.strip()
+                except RETRYABLE_ERRORS as e:
+                    error = e
+                except Exception as e:
+                    self._failed(reserved, e)
+                    raise
+                finally:
+                    self.in_flight -= 1
+            await self._retry(attempt, reserved, error)
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        model: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Run a streaming chat completion, yielding content deltas as they arrive"""
+        client = await self._get_client()
+        prompt_tokens = estimate_prompt_tokens(messages)
+        reserved = prompt_tokens + max_tokens
+
+        # Retries are only possible before the stream has started
+        for attempt in range(self.max_retries + 1):
+            await self.scheduler.acquire(reserved)
+            async with self._semaphore:
+                self.in_flight += 1
+                self.requests += 1
+                try:
+                    try:
+                        stream = await client.chat.completions.create(
+                            model=model or self.model,
+                            messages=messages,
+                            max_tokens=max_tokens,
+                            temperature=temperature,
+                            stream=True
+                        )
+                    except RETRYABLE_ERRORS as e:
+                        error = e
+                    except Exception as e:
+                        self._failed(reserved, e)
+                        raise
+                    else:
+                        # Streams carry no usage block; charge the estimated size of what was sent back
+                        chars = 0
+                        try:
+                            async for chunk in stream:
+                                if chunk.choices and chunk.choices[0].delta.content:
+                                    chars += len(chunk.choices[0].delta.content)
+                                    yield chunk.choices[0].delta.content
+                        except Exception:
+                            self.failures += 1
+                            raise
+                        finally:
+                            self._record(reserved, prompt_tokens + chars // 4)
+                        return
+                finally:
+                    self.in_flight -= 1
+            await self._retry(attempt, reserved, error)
+
+    async def warm(self):
+        """Import the SDK and build the pooled client ahead of the first request"""
+        if self.enabled:
+            await self._get_client()
+        if self.fallback is not None:
+            await self.fallback.warm()
+
+    async def close(self):
+        """Close the underlying HTTP connection pool"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        if self.fallback is not None:
+            await self.fallback.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Request, retry and concurrency metrics"""
+        stats = {
+            "enabled": self.enabled,
+            "max_concurrency": LLM_MAX_CONCURRENCY,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "scheduler": self.scheduler.stats()
+        }
+        if self.router is not None:
+            stats["fallback"] = self.fallback.stats()
+            stats["router"] = self.router.stats()
+        return stats
+
+if LLM_FALLBACK_BASE_URL and not LLM_FALLBACK_API_KEY:
+    logger.warning("LLM_FALLBACK_BASE_URL is set without LLM_FALLBACK_API_KEY; the fallback endpoint is disabled")
+
+# Global LLM client shared by the text services
+llm_client = LLMClient(
+    fallback=LLMClient(
+        api_key=LLM_FALLBACK_API_KEY,
+        base_url=LLM_FALLBACK_BASE_URL,
+        model=LLM_FALLBACK_MODEL,
+        name="fallback",
+        rpm=LLM_FALLBACK_RPM,
+        tpm=LLM_FALLBACK_TPM
+    ) if LLM_FALLBACK_BASE_URL and LLM_FALLBACK_API_KEY else None
+)
@@ -0,0 +1,320 @@
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Iterable, List, Optional
+from .cluster import SHARED_STATE_INTERVAL, cluster
+
+# Client-side upstream rate limits per endpoint (0 = no limit). In multi-worker
+# mode every live worker gets an equal share, so the deployment stays under the limit.
+LLM_RPM = float(os.getenv("LLM_RPM", "0"))
+LLM_TPM = float(os.getenv("LLM_TPM", "0"))
+LLM_FALLBACK_RPM = float(os.getenv("LLM_FALLBACK_RPM", "0"))
+LLM_FALLBACK_TPM = float(os.getenv("LLM_FALLBACK_TPM", "0"))
+# Longest a request waits in the scheduler queue before giving up
+LLM_SCHEDULER_MAX_WAIT = float(os.getenv("LLM_SCHEDULER_MAX_WAIT", "30"))
+# Per-user token quota per window (0 = unlimited); anonymous requests are recorded but not limited
+LLM_USER_TOKEN_QUOTA = int(os.getenv("LLM_USER_TOKEN_QUOTA", "0"))
+LLM_USER_QUOTA_WINDOW = int(os.getenv("LLM_USER_QUOTA_WINDOW", "86400"))
+
+# Scheduling priorities: lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BATCH = 2
+
+# Set per request by the API handlers; read by the LLM client
+request_user: ContextVar[Optional[str]] = ContextVar("request_user", default=None)
+request_priority: ContextVar[int] = ContextVar("request_priority", default=PRIORITY_NORMAL)
+
+class SchedulerTimeout(Exception):
+    """Raised when a request could not be scheduled before its deadline"""
+
+class QuotaExceeded(Exception):
+    """Raised when a user has used up their token quota; carries a Retry-After hint"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    """Rough prompt size: about 4 characters per token plus per-message overhead"""
+    return sum(len(message.get("content") or "") // 4 + 4 for message in messages)
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Retry-After (or retry-after-ms) from an upstream error response, in seconds"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+class TokenBucket:
+    """Continuously refilling bucket holding up to one minute's allowance"""
+
+    def __init__(self, per_minute: float, level: Optional[float] = None):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute if level is None else level
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken; oversized amounts wait for a full bucket"""
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount: float, now: float):
+        """Remove amount (the level may go negative, repaid by later refills)"""
+        if self.enabled:
+            self._refill(now)
+            self.level -= amount
+
+    def give(self, amount: float):
+        if self.enabled:
+            self.level = min(self.capacity, self.level + amount)
+
+    def resize(self, per_minute: float, now: float):
+        """Change the allowance, keeping no more than the new capacity on hand"""
+        self._refill(now)
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = min(self.level, per_minute)
+
+class LLMScheduler:
+    """Queues upstream calls so they stay under the endpoint's RPM/TPM limits
+
+    Each call reserves one request and its estimated tokens (prompt plus
+    max_tokens), which is also how OpenAI counts a request against its TPM
+    limit; only usage beyond the estimate is charged afterwards. Waiting calls are granted by priority, then earliest deadline,
+    and give up with SchedulerTimeout once their deadline passes. A
+    Retry-After from the upstream pauses every grant until it has elapsed.
+
+    In multi-worker mode the limits are split between the live workers
+    the cluster sees, and re-split as workers come and go.
+    """
+
+    def __init__(self, name: str, rpm: float = 0, tpm: float = 0, max_wait: float = LLM_SCHEDULER_MAX_WAIT):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.workers = cluster.workers
+        # A worker that has not seen its peers yet starts with one sync interval's allowance, not a minute's
+        start = SHARED_STATE_INTERVAL / 60 if cluster.enabled and self.workers == 1 else 1.0
+        self.requests = TokenBucket(rpm / self.workers, rpm / self.workers * start)
+        self.tokens = TokenBucket(tpm / self.workers, tpm / self.workers * start)
+        self.max_wait = max_wait
+        self._waiters: List[list] = []  # heap of [priority, deadline, seq, future, cost]
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._paused_until = 0.0
+
+        # Metrics
+        self.granted = 0
+        self.queued = 0
+        self.timed_out = 0
+        self.throttled = 0
+        self.paused = 0
+        self.wait_total = 0.0
+
+    def _rescale(self, now: float):
+        """Re-split the limits when the number of live workers changes"""
+        workers = cluster.workers
+        if workers != self.workers:
+            self.workers = workers
+            self.requests.resize(self.rpm / workers, now)
+            self.tokens.resize(self.tpm / workers, now)
+
+    def _wait_time(self, cost: int, now: float) -> float:
+        return max(self._paused_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(cost, now))
+
+    def _take(self, cost: int, now: float):
+        self.requests.take(1, now)
+        self.tokens.take(cost, now)
+        self.granted += 1
+
+    async def acquire(self, cost: int, priority: Optional[int] = None, deadline: Optional[float] = None):
+        """Wait until one request of cost estimated tokens may be sent"""
+        now = time.monotonic()
+        self._rescale(now)
+        if not self._waiters and self._wait_time(cost, now) <= 0:
+            self._take(cost, now)
+            return
+
+        priority = request_priority.get() if priority is None else priority
+        deadline = now + self.max_wait if deadline is None else deadline
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, deadline, next(self._seq), future, cost])
+        self.queued += 1
+        self._schedule()
+        try:
+            await asyncio.wait_for(future, max(0.0, deadline - now))
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                self.refund(cost)  # granted just as we gave up
+            self._schedule()
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise SchedulerTimeout(f"No {self.name} capacity within {self.max_wait:.0f}s")
+            raise
+        finally:
+            self.wait_total += time.monotonic() - now
+
+    def _schedule(self):
+        """Grant waiters in order while capacity lasts, then wake up when the head can go"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        while self._waiters:
+            _, _, _, future, cost = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)  # timed out or cancelled
+                continue
+            wait = self._wait_time(cost, now)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._schedule)
+                return
+            heapq.heappop(self._waiters)
+            self._take(cost, now)
+            future.set_result(None)
+
+    def settle(self, reserved: int, used: int):
+        """Charge tokens used beyond the reservation (the upstream keeps the rest of it too)"""
+        if used > reserved:
+            self.tokens.take(used - reserved, time.monotonic())
+
+    def refund(self, reserved: int):
+        """Return a reservation the upstream never counted"""
+        self.requests.give(1)
+        self.tokens.give(reserved)
+        if self._waiters:
+            self._schedule()
+
+    def rejected(self, reserved: int, error: Exception) -> Optional[float]:
+        """Account for a failed call; returns the upstream's Retry-After, if any
+
+        A 429 was not counted upstream, so its reservation is returned.
+        Retry-After pauses the whole endpoint, not just this call.
+        """
+        if getattr(error, "status_code", None) == 429:
+            self.throttled += 1
+            self.refund(reserved)
+        delay = retry_after_seconds(error)
+        if delay is not None and delay > 0:
+            self.pause(delay)
+        return delay
+
+    def pause(self, seconds: float):
+        """Hold all grants for seconds"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.paused += 1
+        if self._waiters:
+            self._schedule()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self._rescale(now)
+        return {
+            "workers": self.workers,
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "requests_available": round(self.requests.level, 1) if self.requests.enabled else None,
+            "tokens_available": round(self.tokens.level) if self.tokens.enabled else None,
+            "waiting": sum(1 for waiter in self._waiters if not waiter[3].done()),
+            "paused_for_s": round(max(0.0, self._paused_until - now), 1),
+            "granted": self.granted,
+            "queued": self.queued,
+            "timed_out": self.timed_out,
+            "throttled": self.throttled,
+            "retry_after_pauses": self.paused,
+            "wait_avg_ms": round(self.wait_total / self.queued * 1000, 1) if self.queued else 0.0
+        }
+
+class TokenUsage:
+    """Tokens used per user in fixed windows aligned to the epoch, so workers agree on the window"""
+
+    def __init__(self, quota: int = LLM_USER_TOKEN_QUOTA, window: int = LLM_USER_QUOTA_WINDOW):
+        self.quota = quota
+        self.window = max(1, window)
+        self.window_start = 0
+        self._used: Dict[str, int] = {}
+
+        # Metrics
+        self.rejected = 0
+
+    def _roll(self):
+        start = int(time.time() // self.window * self.window)
+        if start != self.window_start:
+            self.window_start = start
+            self._used = {}
+
+    def record(self, user: Optional[str], tokens: int):
+        self._roll()
+        key = user or "anonymous"
+        self._used[key] = self._used.get(key, 0) + tokens
+
+    def used(self, user: Optional[str], peers: Iterable[Optional[Dict[str, Any]]] = ()) -> int:
+        """Tokens user has used this window, including the other workers' published usage"""
+        self._roll()
+        key = user or "anonymous"
+        total = self._used.get(key, 0)
+        for peer in peers:
+            if peer and peer.get("window_start") == self.window_start:
+                total += peer["users"].get(key, 0)
+        return total
+
+    def check(self, user: Optional[str], peers: Iterable[Optional[Dict[str, Any]]] = ()):
+        """Raise QuotaExceeded when an authenticated user has no quota left this window"""
+        if not self.quota or not user:
+            return
+        if self.used(user, peers) >= self.quota:
+            self.rejected += 1
+            retry_after = max(1, math.ceil(self.window_start + self.window - time.time()))
+            raise QuotaExceeded(f"Token quota of {self.quota} per {self.window}s used up", retry_after)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-user usage this window, published to the other workers"""
+        self._roll()
+        return {"window_start": self.window_start, "users": dict(self._used)}
+
+    def stats(self) -> Dict[str, Any]:
+        self._roll()
+        return {
+            "quota": self.quota,
+            "window_s": self.window,
+            "users": len(self._used),
+            "tokens": sum(self._used.values()),
+            "rejected": self.rejected
+        }
+
+# Global per-user token usage, recorded by the LLM client
+token_usage = TokenUsage()
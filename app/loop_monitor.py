@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+import weakref
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+# Opt-in diagnostic mode for catching code that blocks the event loop
+LOOP_MONITOR = os.getenv("LOOP_MONITOR", "").lower() in ("1", "true", "yes")
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.05"))
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+LOOP_MONITOR_STACK_DEPTH = int(os.getenv("LOOP_MONITOR_STACK_DEPTH", "12"))
+
+class LoopMonitor:
+    """Measures event-loop lag and samples the stack of callbacks that block it
+
+    A heartbeat task records how late each periodic wake-up is. A watchdog
+    thread notices when the heartbeat stops and grabs the loop thread's stack
+    while the blocking call is still on it. Blocks are attributed to the
+    /ai-task type tagged on the running asyncio task (inherited by tasks it
+    spawns).
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_MONITOR_INTERVAL,
+        threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS,
+        stack_depth: int = LOOP_MONITOR_STACK_DEPTH
+    ):
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        self.stack_depth = stack_depth
+        self.enabled = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_beat = 0.0
+        self._stall_beat: Optional[float] = None
+        self._stall_sample: Optional[Tuple[str, Tuple[str, ...]]] = None
+        self._task_types: "weakref.WeakKeyDictionary[asyncio.Task, str]" = weakref.WeakKeyDictionary()
+        self._previous_factory = None
+
+        # Metrics
+        self.lags = deque(maxlen=2048)
+        self.max_lag = 0.0
+        self.blocks = 0
+        self.unsampled_blocks = 0
+        self.offenders: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]] = {}
+
+    def start(self):
+        """Start the heartbeat and watchdog on the running loop"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._previous_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._task_factory)
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+        self.enabled = True
+
+    async def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        self._heartbeat_task.cancel()
+        await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+        self._watchdog.join(timeout=1)
+        self._loop.set_task_factory(self._previous_factory)
+
+    def tag(self, task_type: str):
+        """Attribute the current asyncio task (and tasks it spawns) to a task type"""
+        if self.enabled:
+            task = asyncio.current_task()
+            if task is not None:
+                self._task_types[task] = task_type
+
+    def _task_factory(self, loop, coro, context=None):
+        """Create tasks as usual, inheriting the creating task's tag"""
+        if self._previous_factory is not None:
+            if context is None:
+                task = self._previous_factory(loop, coro)
+            else:
+                task = self._previous_factory(loop, coro, context=context)
+        else:
+            task = asyncio.Task(coro, loop=loop, context=context)
+        parent = asyncio.current_task(loop)
+        if parent is not None:
+            task_type = self._task_types.get(parent)
+            if task_type is not None:
+                self._task_types[task] = task_type
+        return task
+
+    async def _heartbeat(self):
+        """Record how late each wake-up is; long gaps are blocked callbacks"""
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self._record_block(lag)
+            else:
+                self._stall_sample = None
+            self._last_beat = now
+
+    def _record_block(self, lag: float):
+        self.blocks += 1
+        sample, self._stall_sample = self._stall_sample, None
+        if sample is None:
+            self.unsampled_blocks += 1
+            return
+        offender = self.offenders.get(sample)
+        if offender is None:
+            offender = self.offenders[sample] = {
+                "task_type": sample[0],
+                "stack": list(sample[1]),
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0
+            }
+        offender["count"] += 1
+        offender["total_ms"] += lag * 1000
+        offender["max_ms"] = max(offender["max_ms"], lag * 1000)
+        offender["last_seen"] = time.time()
+
+    def _watch(self):
+        """Watchdog thread: sample the loop thread's stack once per stall"""
+        period = min(self.interval, self.threshold / 2)
+        while not self._stop.wait(period):
+            beat = self._last_beat
+            if time.monotonic() - beat - self.interval < self.threshold or self._stall_beat == beat:
+                continue
+            self._stall_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = tuple(
+                f"{entry.filename}:{entry.lineno} {entry.name}"
+                for entry in traceback.extract_stack(frame, limit=self.stack_depth)
+            )
+            task = asyncio.current_task(self._loop)
+            task_type = self._task_types.get(task, "background") if task is not None else "callback"
+            self._stall_sample = (task_type, stack)
+
+    def _lag_percentile(self, pct: float) -> float:
+        if not self.lags:
+            return 0.0
+        ordered = sorted(self.lags)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def top_offenders(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Blocking call sites ordered by total time they held the loop"""
+        ranked = sorted(self.offenders.values(), key=lambda o: o["total_ms"], reverse=True)
+        return [{**o, "total_ms": round(o["total_ms"], 1), "max_ms": round(o["max_ms"], 1)} for o in ranked[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold * 1000,
+            "lag_p50_ms": round(self._lag_percentile(50) * 1000, 2),
+            "lag_p99_ms": round(self._lag_percentile(99) * 1000, 2),
+            "lag_max_ms": round(self.max_lag * 1000, 2),
+            "blocks": self.blocks,
+            "unsampled_blocks": self.unsampled_blocks
+        }
+
+# Global loop monitor (started on startup when LOOP_MONITOR is set)
+loop_monitor = LoopMonitor()
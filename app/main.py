@@ -1,12 +1,30 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 import os
+import json
+import time
+import asyncio
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
+from jose import JWTError
 
-from .models import AITaskRequest, AITaskResponse, TokenRequest
-from .database import create_tables, get_db
-from .auth import create_access_token, verify_token
+from .models import AITaskRequest, AITaskResponse, BatchTaskRequest, BatchTaskResponse, TokenRequest
+from .database import create_tables, database, get_db, init_pool, close_pool, pool, write_behind
+from .auth import create_access_token, verify_token, revoke_token, revoke_token_hash, load_revoked_tokens, token_cache, jwt_backend
+from .llm_client import llm_client
+from .llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, QuotaExceeded, request_priority, request_user, token_usage
+from .jobs import ImageJobQueue
+from .artifacts import artifact_store
+from .singleflight import single_flight
+from .mcp_client import mcp_client
+from .metrics import render_metrics, snapshot_instruments, task_duration, task_requests
+from .loop_monitor import LOOP_MONITOR, loop_monitor
+from .admission import AdmissionRejected, admission
+from .readiness import STARTUP_PREWARM, readiness
+from .cluster import cluster
+from .latest_feed import LATEST_FEED_KEEPALIVE, LATEST_FEED_MAX_AGE, latest_feed
 from .services.qa_service import QAService
 from .services.image_service import ImageService
 from .services.content_service import ContentService
@@ -23,18 +41,80 @@ app = FastAPI(
 # Security scheme
 security = HTTPBearer(auto_error=False)
 
-# Create database tables on startup
+# Create database tables and open the connection pool on startup
 @app.on_event("startup")
 async def startup():
-    await create_tables()
+    global prewarm_task
+    if LOOP_MONITOR:
+        loop_monitor.start()
+    readiness.expect("database", "answer_cache", "latest_feed", "image_jobs")
+    if cluster.enabled:
+        readiness.expect("cluster")
+    if STARTUP_PREWARM:
+        readiness.expect("llm_client", "image_providers", "mcp")
+    # With several workers, one applies migrations and one becomes the designated writer
+    await cluster.migrate(create_tables)
+    writer = await cluster.elect()
+    await init_pool(writer=writer)
+    readiness.mark("database")
+    await qa_service.answer_cache.warm(await get_db())
+    readiness.mark("answer_cache", entries=qa_service.answer_cache.stats()["size"])
+    await latest_feed.load(await get_db())
+    database.listeners.append(publish_saved_qa)
+    readiness.mark("latest_feed")
+    await image_jobs.start(await get_db(), owner=cluster.shared.instance)
+    if cluster.enabled:
+        cluster.shared.subscribe("token_revoked", apply_revocation)
+        cluster.shared.subscribe("qa_saved", latest_feed.publish)
+        await cluster.shared.open(worker_snapshot)
+        if writer:
+            await cluster.serve()
+        readiness.mark("cluster", role=cluster.shared.role)
+    if writer:
+        # Once the peers are known: a writer re-elected among healthy workers only fails the dead workers' jobs
+        await image_jobs.recover(cluster.live_instances())
+    readiness.mark("image_jobs")
+    # Loaded after the shared event log is open, so a revocation is either in the table or delivered as an event
+    load_revoked_tokens(await database.get_revoked_tokens())
+    if STARTUP_PREWARM:
+        # Warm in the background so the server starts accepting /health straight away
+        prewarm_task = asyncio.create_task(prewarm())
+
+async def prewarm():
+    """Load provider SDKs and open upstream connections before traffic arrives"""
+    await asyncio.gather(
+        readiness.run("llm_client", llm_client.warm),
+        readiness.run("image_providers", image_service.warm),
+        readiness.run("mcp", mcp_client.warm, required=False)  # tools fall back to in-process
+    )
+
+def apply_revocation(payload: Dict):
+    """Apply a token revocation made by another worker"""
+    revoke_token_hash(payload["token_hash"], payload["expires_at"])
+
+async def publish_saved_qa(entries: List[Dict]):
+    """Push entries saved by this worker to its feed, and to the other workers' feeds"""
+    latest_feed.publish(entries)
+    await cluster.shared.publish("qa_saved", entries)
+
+@app.on_event("shutdown")
+async def shutdown():
+    if prewarm_task is not None:
+        prewarm_task.cancel()
+    await image_jobs.stop()
+    await llm_client.close()
+    await mcp_client.close()
+    database.listeners.remove(publish_saved_qa)
+    await cluster.close()
+    await close_pool()
+    await loop_monitor.stop()
 
 # Initialize services
+prewarm_task: Optional[asyncio.Task] = None
 qa_service = QAService()
 image_service = ImageService()
 content_service = ContentService()
-
-# Serve frontend files at root with html support
-app.mount("/", StaticFiles(directory="frontend", html=True), name="static")
+image_jobs = ImageJobQueue(image_service)
 
 @app.post("/token")
 async def login(token_request: TokenRequest):
@@ -63,6 +143,48 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             detail="Invalid authentication credentials"
         )
 
+@app.post("/token/revoke")
+async def revoke(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Revoke the bearer token used for this request"""
+    if not credentials:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Bearer token required"
+        )
+    try:
+        token_hash, expires_at = revoke_token(credentials.credentials)
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials"
+        )
+    # Stored so it survives restarts; running workers pick it up from the shared event log
+    await database.save_revoked_token(token_hash, expires_at)
+    await cluster.shared.publish("token_revoked", {"token_hash": token_hash, "expires_at": expires_at})
+    return {"revoked": True}
+
+# Tasks that call the LLM and count against the per-user token quota
+LLM_TASKS = {"qa", "generate_content"}
+
+def check_token_quota(user: Optional[str]):
+    """429 once the user has used up their LLM token quota on any worker"""
+    try:
+        token_usage.check(user, peers=[peer.get("llm_usage") for peer in cluster.shared.peers()])
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+@app.get("/usage")
+async def usage_handler(current_user: str = Depends(get_current_user)):
+    """LLM tokens used by the caller in the current quota window"""
+    used = token_usage.used(current_user, peers=[peer.get("llm_usage") for peer in cluster.shared.peers()])
+    return {
+        "user": current_user,
+        "tokens_used": used,
+        "quota": token_usage.quota if current_user else None,
+        "window_start": token_usage.window_start,
+        "window_s": token_usage.window
+    }
+
 @app.post("/ai-task", response_model=AITaskResponse)
 async def ai_task_handler(
     request: AITaskRequest,
@@ -73,16 +195,53 @@ async def ai_task_handler(
     Single route to handle all AI tasks:
     - qa: Question & Answer with agent
     - fetch_latest: Get latest Q&A from database
-    - generate_image: Generate image from prompt
+    - history: Page through Q&A history (limit, cursor, optional full-text query)
+    - generate_image: Submit an image generation job for prompt
+    - fetch_image: Get status, progress and result of an image job
+    - cancel_image: Cancel a queued or running image job
     - generate_content: Generate platform-specific content
-    """
     
+    Expensive tasks pass adaptive admission control first; when saturated the
+    request is rejected with 429 (queue full) or 503 (wait timed out) and a
+    Retry-After header. LLM tasks return 429 once the user's token quota is used up.
+    """
+    request_user.set(current_user)
+    # A user is waiting on the response, so its LLM calls go ahead of batch and background work
+    request_priority.set(PRIORITY_INTERACTIVE)
+    if request.task in LLM_TASKS:
+        check_token_quota(current_user)
+    if request.task == "generate_image" and image_jobs.saturated:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Image job queue is full, try again later",
+            headers={"Retry-After": str(image_jobs.retry_after())}
+        )
+    try:
+        async with admission.admit(request.task):
+            return await run_task(request, db)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+# Task names used as metric labels; anything else is recorded as "unknown"
+METRIC_TASKS = {"qa", "fetch_latest", "history", "generate_image", "fetch_image", "cancel_image", "generate_content"}
+
+async def run_task(request: AITaskRequest, db, save: bool = True) -> AITaskResponse:
+    """Execute one AI task; with save=False Q&A rows are left for the caller to write"""
+    task = request.task if request.task in METRIC_TASKS else "unknown"
+    loop_monitor.tag(task)
+    start = time.perf_counter()
+    response = await _run_task(request, db, save)
+    task_duration.observe(time.perf_counter() - start, task=task)
+    task_requests.inc(task=task, success=str(response.success).lower())
+    return response
+
+async def _run_task(request: AITaskRequest, db, save: bool = True) -> AITaskResponse:
     try:
         if request.task == "qa":
             if not request.question:
                 raise HTTPException(status_code=400, detail="Question is required for Q&A task")
             
-            result = await qa_service.process_question(request.question, db)
+            result = await qa_service.process_question(request.question, db, bypass_cache=request.bypass_cache, save=save)
             return AITaskResponse(
                 task=request.task,
                 success=True,
@@ -91,7 +250,8 @@ async def ai_task_handler(
             )
         
         elif request.task == "fetch_latest":
-            result = await qa_service.get_latest_qa(db)
+            # Served from the in-memory snapshot kept current by every save
+            result = latest_feed.result() if latest_feed.loaded else await qa_service.get_latest_qa(db)
             return AITaskResponse(
                 task=request.task,
                 success=True,
@@ -99,22 +259,57 @@ async def ai_task_handler(
                 message="Latest Q&A retrieved successfully"
             )
         
+        elif request.task == "history":
+            result = await qa_service.get_history(db, limit=request.limit, cursor=request.cursor, query=request.query)
+            return AITaskResponse(
+                task=request.task,
+                success=True,
+                data=result,
+                message="Q&A history retrieved successfully"
+            )
+        
         elif request.task == "generate_image":
             if not request.prompt:
                 raise HTTPException(status_code=400, detail="Prompt is required for image generation")
             
-            result = await image_service.generate_image(request.prompt)
+            result = await image_jobs.submit(request.prompt)
             return AITaskResponse(
                 task=request.task,
                 success=True,
                 data=result,
-                message="Image generated successfully"
+                message="Image generation job submitted"
+            )
+        
+        elif request.task in ("fetch_image", "cancel_image"):
+            if not request.job_id:
+                raise HTTPException(status_code=400, detail="Job ID is required for image job tasks")
+            
+            if request.task == "fetch_image":
+                result = await image_jobs.get(request.job_id)
+            else:
+                result = await image_jobs.cancel(request.job_id)
+            if result is None:
+                raise HTTPException(status_code=404, detail=f"Image job {request.job_id} not found")
+            return AITaskResponse(
+                task=request.task,
+                success=True,
+                data=result,
+                message=f"Image job {result['status']}"
             )
         
         elif request.task == "generate_content":
             if not request.prompt:
                 raise HTTPException(status_code=400, detail="Prompt is required for content generation")
             
+            if request.platforms:
+                result = await content_service.generate_multi_content(request.prompt, request.platforms)
+                return AITaskResponse(
+                    task=request.task,
+                    success=True,
+                    data=result,
+                    message=f"Content generated for {', '.join(result['platforms'])} successfully"
+                )
+            
             platform = request.platform or "general"
             result = await content_service.generate_content(request.prompt, platform)
             return AITaskResponse(
@@ -135,11 +330,312 @@ async def ai_task_handler(
             message=f"Error: {str(e)}"
         )
 
+@app.get("/history")
+async def history_handler(
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
+    current_user: str = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    """Page through Q&A history newest first; pass next_cursor back to continue"""
+    try:
+        return await qa_service.get_history(db, limit=limit, cursor=cursor, query=q)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Per-task-type concurrency limits for batch execution
+BATCH_CONCURRENCY = {
+    "qa": int(os.getenv("BATCH_QA_CONCURRENCY", "8")),
+    "generate_content": int(os.getenv("BATCH_CONTENT_CONCURRENCY", "8")),
+    "generate_image": int(os.getenv("BATCH_IMAGE_CONCURRENCY", "4")),
+}
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv("BATCH_DEFAULT_CONCURRENCY", "16"))
+_batch_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+async def _run_batch_item(item: AITaskRequest, db) -> AITaskResponse:
+    """Run one batch item under its task type's semaphore"""
+    semaphore = _batch_semaphores.get(item.task)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY.get(item.task, BATCH_DEFAULT_CONCURRENCY))
+        _batch_semaphores[item.task] = semaphore
+    async with semaphore:
+        return await run_task(item, db, save=False)
+
+async def _save_batch_qa(responses: Dict[str, AITaskResponse], db) -> Dict[str, int]:
+    """Write all Q&A results of a batch in one transaction, filling in their ids"""
+    pending = [
+        (key, response) for key, response in responses.items()
+        if response.task == "qa" and response.success and response.data
+    ]
+    if not pending:
+        return {}
+    ids = await db.save_qa_many([(r.data["question"], r.data["answer"]) for _, r in pending])
+    for (_, response), qa_id in zip(pending, ids):
+        response.data["id"] = qa_id
+    return {key: qa_id for (key, _), qa_id in zip(pending, ids)}
+
+@app.post("/ai-task/batch")
+async def ai_task_batch_handler(
+    batch: BatchTaskRequest,
+    current_user: str = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    """
+    Run many AI tasks concurrently. Identical items are executed once, Q&A rows
+    are written in a single transaction, and results come back in request order.
+    With stream=true results are sent as NDJSON lines as items complete, followed
+    by a final line with the saved Q&A ids. Batch LLM calls yield to interactive
+    requests when the upstream rate limit is the bottleneck.
+    """
+    request_user.set(current_user)
+    request_priority.set(PRIORITY_BATCH)
+    if any(item.task in LLM_TASKS for item in batch.items):
+        check_token_quota(current_user)
+    # Coalesce identical items
+    keys = [item.model_dump_json() for item in batch.items]
+    unique: Dict[str, AITaskRequest] = {}
+    for key, item in zip(keys, batch.items):
+        unique.setdefault(key, item)
+    positions: Dict[str, List[int]] = {}
+    for index, key in enumerate(keys):
+        positions.setdefault(key, []).append(index)
+
+    async def run_keyed(key: str):
+        return key, await _run_batch_item(unique[key], db)
+
+    if not batch.stream:
+        responses = dict(await asyncio.gather(*(run_keyed(key) for key in unique)))
+        await _save_batch_qa(responses, db)
+        results = [responses[key] for key in keys]
+        return BatchTaskResponse(
+            success=all(r.success for r in results),
+            results=results,
+            message=f"Processed {len(results)} tasks ({len(unique)} unique)"
+        )
+
+    async def ndjson_stream():
+        responses: Dict[str, AITaskResponse] = {}
+        for next_done in asyncio.as_completed([run_keyed(key) for key in unique]):
+            key, response = await next_done
+            responses[key] = response
+            for index in positions[key]:
+                yield json.dumps({"index": index, "result": response.model_dump()}) + "\n"
+
+        qa_ids = await _save_batch_qa(responses, db)
+        saved = {index: qa_id for key, qa_id in qa_ids.items() for index in positions[key]}
+        yield json.dumps({"done": True, "count": len(keys), "qa_ids": saved}) + "\n"
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/ai-task/stream")
+async def ai_task_stream_handler(
+    request: AITaskRequest,
+    current_user: str = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    """
+    Streaming variant of /ai-task (Server-Sent Events) for:
+    - qa: answer tokens, then the saved Q&A entry
+    - generate_content: content tokens, then the full result
+    Emits `token` events with {"text": ...} and a final `done` event with an AITaskResponse.
+    """
+    loop_monitor.tag(f"stream:{request.task}")
+    request_user.set(current_user)
+    request_priority.set(PRIORITY_INTERACTIVE)
+    if request.task in LLM_TASKS:
+        check_token_quota(current_user)
+    if request.task == "qa":
+        if not request.question:
+            raise HTTPException(status_code=400, detail="Question is required for Q&A task")
+        events = qa_service.stream_answer(request.question, db, bypass_cache=request.bypass_cache)
+        message = "Q&A processed successfully"
+    elif request.task == "generate_content":
+        if not request.prompt:
+            raise HTTPException(status_code=400, detail="Prompt is required for content generation")
+        platform = request.platform or "general"
+        events = content_service.stream_content(request.prompt, platform)
+        message = f"Content generated for {platform} successfully"
+    else:
+        raise HTTPException(status_code=400, detail=f"Streaming is not supported for task: {request.task}")
+
+    async def event_stream():
+        try:
+            async for event in events:
+                if event["event"] == "token":
+                    yield _sse("token", {"text": event["text"]})
+                else:
+                    response = AITaskResponse(task=request.task, success=True, data=event["data"], message=message)
+                    yield _sse("done", response.model_dump())
+        except Exception as e:
+            response = AITaskResponse(task=request.task, success=False, data=None, message=f"Error: {str(e)}")
+            yield _sse("error", response.model_dump())
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/latest")
+async def latest_handler(request: Request, current_user: str = Depends(get_current_user)):
+    """Latest Q&A entry from the in-memory snapshot; 304 when If-None-Match matches its ETag"""
+    headers = {"ETag": latest_feed.etag, "Cache-Control": "no-cache"}
+    if latest_feed.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=latest_feed.result(), headers=headers)
+
+@app.get("/latest/stream")
+async def latest_stream_handler(current_user: str = Depends(get_current_user)):
+    """
+    Server-Sent Events feed of new Q&A entries, pushed as they are saved.
+    Starts with a `latest` event holding the current snapshot, then one `qa`
+    event per new entry; comment lines keep idle connections open. The
+    stream ends after LATEST_FEED_MAX_AGE seconds and EventSource clients
+    reconnect on their own.
+    """
+    if latest_feed.full:
+        latest_feed.rejected += 1
+        raise HTTPException(status_code=503, detail="Too many latest-feed subscribers", headers={"Retry-After": "30"})
+
+    async def event_stream():
+        deadline = time.monotonic() + LATEST_FEED_MAX_AGE
+        with latest_feed.subscribe() as queue:
+            yield "retry: 1000\n" + _sse("latest", latest_feed.result())
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    entry = await asyncio.wait_for(queue.get(), min(LATEST_FEED_KEEPALIVE, remaining))
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse("qa", entry)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/artifacts/{artifact_id}")
+async def get_artifact(artifact_id: str, request: Request):
+    """Serve a generated image by content address, with ETag and Range support"""
+    if not artifact_store.valid_key(artifact_id):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    info = artifact_store.open_info(artifact_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    path, size, media_type = info
+
+    # Content-addressed artifacts never change, so the key is a strong ETag
+    etag = f'"{artifact_id}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=31536000, immutable"
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if range_header and range_header.startswith("bytes=") and "," not in range_header:
+        start_text, _, end_text = range_header[6:].partition("-")
+        try:
+            if start_text:
+                start = int(start_text)
+                end = min(int(end_text), size - 1) if end_text else size - 1
+            else:
+                start = max(size - int(end_text), 0)
+                end = size - 1
+        except ValueError:
+            start, end = 0, -1
+        if start > end or start >= size:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            body = f.read(end - start + 1)
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return Response(content=body, status_code=206, media_type=media_type, headers=headers)
+
+    return FileResponse(path, media_type=media_type, headers=headers)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "AI Trader Task API is running"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the pools and caches (and pre-warm, if enabled) are warm"""
+    return JSONResponse(status_code=200 if readiness.ready else 503, content=readiness.stats())
+
+# /stats, /metrics and /debug/loop expose internals: they need a bearer token unless made public
+OPS_ENDPOINTS_PUBLIC = os.getenv("OPS_ENDPOINTS_PUBLIC", "").lower() in ("1", "true", "yes")
+
+async def require_operator(current_user: Optional[str] = Depends(get_current_user)):
+    """401 for the operational endpoints without a valid token (unless OPS_ENDPOINTS_PUBLIC=1)"""
+    if not OPS_ENDPOINTS_PUBLIC and current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Bearer token required",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+@app.get("/stats", dependencies=[Depends(require_operator)])
+async def stats_handler():
+    """Runtime metrics for pools and caches"""
+    return await stats()
+
+async def stats():
+    """Runtime metrics for pools and caches"""
+    return {
+        "database_pool": pool.stats(),
+        "token_cache": {**token_cache.stats(), "backend": jwt_backend.name},
+        "write_behind": write_behind.stats(),
+        "llm_client": llm_client.stats(),
+        "llm_usage": token_usage.stats(),
+        "answer_cache": qa_service.answer_cache.stats(),
+        "image_jobs": image_jobs.stats(),
+        "artifacts": artifact_store.stats(),
+        "image_router": image_service.router.stats(),
+        "admission": admission.stats(),
+        "single_flight": single_flight.stats(),
+        "mcp": mcp_client.stats(),
+        "loop_monitor": loop_monitor.stats(),
+        "readiness": readiness.stats(),
+        "latest_feed": latest_feed.stats(),
+        "cluster": cluster.stats()
+    }
+
+async def worker_snapshot():
+    """This worker's instruments and stats, published to the other workers"""
+    return {"instruments": snapshot_instruments(), "stats": await stats(), "llm_usage": token_usage.snapshot()}
+
+@app.get("/metrics", dependencies=[Depends(require_operator)])
+async def metrics():
+    """Prometheus metrics: per-task and per-stage latency, fallbacks, and component gauges"""
+    # In multi-worker mode any worker reports for the whole deployment
+    worker = str(cluster.shared.pid) if cluster.enabled else None
+    return Response(
+        content=render_metrics(await stats(), peers=cluster.shared.peers(), worker=worker),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+@app.get("/debug/loop", dependencies=[Depends(require_operator)])
+async def debug_loop(limit: int = Query(10, ge=1, le=100)):
+    """Event-loop lag and the call sites that blocked the loop longest (LOOP_MONITOR=1)"""
+    if not loop_monitor.enabled:
+        raise HTTPException(status_code=404, detail="Loop monitor is disabled; set LOOP_MONITOR=1")
+    return {**loop_monitor.stats(), "top_offenders": loop_monitor.top_offenders(limit)}
+
+# Serve frontend files at root with html support (mounted last so it
+# does not shadow the API routes above)
+app.mount("/", StaticFiles(directory="frontend", html=True), name="static")
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
@@ -0,0 +1,445 @@
+"""
+Local OHLCV cache and vectorized market indicators.
+
+Daily bars live in MARKET_DATA_DIR as one memory-mapped .npy file per field
+(open, high, low, close, volume), each shaped (capacity, tickers) with one
+row per trading day, plus dates.npy (days since the epoch) and meta.json.
+New days are written into spare rows in place. Indicators are computed for
+every requested ticker at once with NumPy; the recursive ones (EMA, RSI,
+MACD) keep their per-ticker state and only advance over appended rows.
+
+    python -m app.market_data load data/*.csv   # merge CSV files (one per ticker) into the cache
+    python -m app.market_data stats
+"""
+import os
+import sys
+import csv
+import json
+import math
+import time
+import warnings
+import threading
+from datetime import date
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import numpy as np
+from .market_tickers import MARKET_DATA_DIR, find_tickers, read_meta
+
+MARKET_MAX_TICKERS = int(os.getenv("MARKET_MAX_TICKERS", "100"))
+
+FIELDS = ("open", "high", "low", "close", "volume")
+TRADING_DAYS = 252
+
+_EPOCH = date(1970, 1, 1).toordinal()
+
+def _ffill(block: np.ndarray) -> np.ndarray:
+    """Forward-fill NaN gaps down each column (leading NaNs stay NaN)"""
+    valid = ~np.isnan(block)
+    index = np.where(valid, np.arange(block.shape[0])[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    return block[index, np.arange(block.shape[1])]
+
+def _day(days: int) -> str:
+    return str(date.fromordinal(_EPOCH + int(days)))
+
+def _number(value) -> Optional[float]:
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else round(value, 4)
+
+def _ticker_list(value: Any) -> List[str]:
+    """A list of tickers, or a string holding one ticker or a comma-separated list"""
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(t).strip().upper() for t in value or () if str(t).strip()]
+
+def read_csv(path: str, ticker: Optional[str] = None) -> Tuple[str, Dict[int, Tuple[float, ...]]]:
+    """Bars from a CSV with date, open, high, low, close and volume columns; the ticker defaults to the file name"""
+    ticker = (ticker or os.path.splitext(os.path.basename(path))[0]).upper()
+    bars = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            row = {key.strip().lower(): value for key, value in row.items() if key}
+            day = date.fromisoformat(row["date"][:10]).toordinal() - _EPOCH
+            bars[day] = tuple(float(row[field]) if row.get(field) not in (None, "") else math.nan for field in FIELDS)
+    return ticker, bars
+
+class OHLCVCache:
+    """Memory-mapped columnar store of daily bars, one column per ticker
+
+    meta.json records the tickers, the number of rows in use and an epoch
+    that changes whenever existing rows are rewritten (corrections, new
+    tickers, back-filled history); plain appends leave it unchanged.
+    """
+
+    def __init__(self, root: str = MARKET_DATA_DIR):
+        self.root = root
+        self.tickers: List[str] = []
+        self.length = 0
+        self.epoch = 0
+        self._index: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._meta_mtime: Optional[int] = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def refresh(self) -> bool:
+        """Re-map the files if another process has written since the last look; returns whether data exists"""
+        try:
+            mtime = os.stat(self._path("meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime != self._meta_mtime:
+            meta = read_meta(self.root)
+            self._columns = {
+                name: np.load(self._path(f"{name}.npy"), mmap_mode="r")
+                for name in FIELDS + ("dates",)
+            }
+            self.tickers = meta["tickers"]
+            self.length = meta["length"]
+            self.epoch = meta["epoch"]
+            self._index = {ticker: i for i, ticker in enumerate(self.tickers)}
+            self._meta_mtime = mtime
+        return self.length > 0
+
+    def column(self, field: str) -> np.ndarray:
+        """Rows in use of one field, shaped (days, tickers)"""
+        return self._columns[field][:self.length]
+
+    def ticker_columns(self, tickers: Iterable[str]) -> List[int]:
+        return [self._index[ticker] for ticker in tickers if ticker in self._index]
+
+    def find_tickers(self, text: str) -> List[str]:
+        """Cached tickers mentioned in free text"""
+        return find_tickers(text, self._index)
+
+    def append(self, bars: Dict[str, Dict[int, Tuple[float, ...]]]) -> Dict[str, int]:
+        """Merge bars {ticker: {day: (open, high, low, close, volume)}} into the cache
+
+        Days after the last cached day are written into spare rows (the
+        files double in size when full). New tickers and days before the
+        end of the cache rewrite the files; they and corrected bars bump
+        the epoch so indicator state is rebuilt.
+        """
+        self.refresh()
+        os.makedirs(self.root, exist_ok=True)
+        old_dates = self.column("dates") if self.length else np.zeros(0, dtype=np.int64)
+        new_days = sorted({day for ticker_bars in bars.values() for day in ticker_bars} - set(old_dates.tolist()))
+        new_tickers = sorted(set(bars) - set(self.tickers))
+        backfill = bool(new_days) and self.length > 0 and new_days[0] < old_dates[-1]
+        tickers = self.tickers + new_tickers
+        length = self.length + len(new_days)
+        capacity = self._columns["close"].shape[0] if self._columns else 0
+
+        rewrite = backfill or bool(new_tickers) or length > capacity
+        if rewrite:
+            dates = np.array(sorted(old_dates.tolist() + new_days), dtype=np.int64)
+            capacity = max(256, 1 << (length - 1).bit_length())
+            rows = np.searchsorted(dates, old_dates)
+            for name in FIELDS + ("dates",):
+                shape = (capacity,) if name == "dates" else (capacity, len(tickers))
+                target = np.lib.format.open_memmap(self._path(f"{name}.npy.tmp"), mode="w+", dtype=np.float64 if name != "dates" else np.int64, shape=shape)
+                if name == "dates":
+                    target[:length] = dates
+                else:
+                    target[:] = np.nan
+                    if self.length:
+                        target[rows, :len(self.tickers)] = self.column(name)
+                target.flush()
+                del target
+                os.replace(self._path(f"{name}.npy.tmp"), self._path(f"{name}.npy"))
+        else:
+            dates = np.concatenate([old_dates, np.array(new_days, dtype=np.int64)])
+            self._columns["dates"] = np.load(self._path("dates.npy"), mmap_mode="r+")
+            self._columns["dates"][self.length:length] = new_days
+
+        # Scatter every bar into its (row, column) cell, one vectorized write per field
+        columns = {name: np.load(self._path(f"{name}.npy"), mmap_mode="r+") for name in FIELDS}
+        index = {ticker: i for i, ticker in enumerate(tickers)}
+        row_list, col_list, value_list = [], [], []
+        for ticker, ticker_bars in bars.items():
+            days = np.fromiter(ticker_bars.keys(), dtype=np.int64, count=len(ticker_bars))
+            row_list.append(np.searchsorted(dates, days))
+            col_list.append(np.full(len(days), index[ticker]))
+            value_list.append(np.array(list(ticker_bars.values()), dtype=np.float64).reshape(-1, len(FIELDS)))
+        corrected = False
+        if row_list:
+            rows, cols, values = np.concatenate(row_list), np.concatenate(col_list), np.concatenate(value_list)
+            # Re-loading a file that only gained new days leaves the cached rows (and indicator state) valid
+            known = rows < self.length
+            if known.any() and not backfill:
+                cached = np.stack([columns[name][rows[known], cols[known]] for name in FIELDS], axis=1)
+                corrected = not np.array_equal(cached, values[known], equal_nan=True)
+            for i, name in enumerate(FIELDS):
+                columns[name][rows, cols] = values[:, i]
+                columns[name].flush()
+        del columns
+
+        reindexed = self.length > 0 and (backfill or bool(new_tickers))
+        epoch = self.epoch + 1 if reindexed or corrected else self.epoch
+        with open(self._path("meta.json.tmp"), "w") as f:
+            json.dump({"tickers": tickers, "length": length, "epoch": epoch}, f)
+        os.replace(self._path("meta.json.tmp"), self._path("meta.json"))
+        self._meta_mtime = None
+        self.refresh()
+        return {"tickers": len(tickers), "new_tickers": len(new_tickers), "rows": length, "new_rows": len(new_days), "epoch": epoch}
+
+    def stats(self) -> Dict[str, Any]:
+        self.refresh()
+        dates = self.column("dates") if self.length else []
+        return {
+            "root": self.root,
+            "tickers": len(self.tickers),
+            "rows": self.length,
+            "first_day": _day(dates[0]) if self.length else None,
+            "last_day": _day(dates[-1]) if self.length else None,
+            "epoch": self.epoch
+        }
+
+class _EMAState:
+    """Exponential moving average per ticker, seeded with the first close"""
+
+    def __init__(self, tickers: int, span: int):
+        self.alpha = 2 / (span + 1)
+        self.value = np.full(tickers, np.nan)
+
+    def step(self, x: np.ndarray):
+        valid = ~np.isnan(x)
+        seed = valid & np.isnan(self.value)
+        self.value[seed] = x[seed]
+        update = valid & ~seed
+        self.value[update] += self.alpha * (x[update] - self.value[update])
+
+class _RSIState:
+    """Wilder's RSI: average gain/loss seeded by a simple mean over the first period changes"""
+
+    def __init__(self, tickers: int, period: int):
+        self.period = period
+        self.previous = np.full(tickers, np.nan)
+        self.gain = np.zeros(tickers)
+        self.loss = np.zeros(tickers)
+        self.count = np.zeros(tickers)
+
+    def step(self, x: np.ndarray):
+        change = x - self.previous
+        valid = ~np.isnan(change)
+        weight = np.where(self.count < self.period, 1 / (self.count + 1), 1 / self.period)[valid]
+        self.gain[valid] += weight * (np.maximum(change[valid], 0) - self.gain[valid])
+        self.loss[valid] += weight * (np.maximum(-change[valid], 0) - self.loss[valid])
+        self.count[valid] += 1
+        self.previous = np.where(np.isnan(x), self.previous, x)
+
+    @property
+    def value(self) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(self.loss > 0, 100 - 100 / (1 + self.gain / self.loss), 100.0)
+        return np.where(self.count >= self.period, rsi, np.nan)
+
+class _MACDState:
+    """MACD line (fast EMA - slow EMA) and its signal EMA"""
+
+    def __init__(self, tickers: int, fast: int, slow: int, signal: int):
+        self.fast = _EMAState(tickers, fast)
+        self.slow = _EMAState(tickers, slow)
+        self.signal = _EMAState(tickers, signal)
+
+    def step(self, x: np.ndarray):
+        self.fast.step(x)
+        self.slow.step(x)
+        self.signal.step(np.where(np.isnan(x), np.nan, self.fast.value - self.slow.value))
+
+    @property
+    def value(self) -> np.ndarray:
+        return self.fast.value - self.slow.value
+
+class MarketIndicators:
+    """Indicators over the OHLCV cache for many tickers at once
+
+    Window indicators (SMA, Bollinger bands, volatility, correlation) read
+    only the last window of rows. Recursive ones keep state per parameter
+    set that is advanced over rows appended since the previous call, and
+    rebuilt from scratch when the cache epoch changes.
+    """
+
+    def __init__(self, cache: OHLCVCache):
+        self.cache = cache
+        self._states: Dict[tuple, Any] = {}
+        self._rows: Dict[tuple, int] = {}
+        self._epoch: Optional[int] = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.calls = 0
+        self.rows_advanced = 0
+
+    def _state(self, key: tuple, factory):
+        """Recursive state for key, advanced to the cache's last row"""
+        if self.cache.epoch != self._epoch:
+            self._states, self._rows, self._epoch = {}, {}, self.cache.epoch
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = factory(len(self.cache.tickers))
+            self._rows[key] = 0
+        start = self._rows[key]
+        if start < self.cache.length:
+            for row in self.cache.column("close")[start:]:
+                state.step(np.asarray(row, dtype=np.float64))
+            self.rows_advanced += self.cache.length - start
+            self._rows[key] = self.cache.length
+        return state
+
+    def compute(
+        self,
+        tickers: Optional[List[str]] = None,
+        window: int = 20,
+        ema_span: int = 20,
+        rsi_period: int = 14,
+        macd: Tuple[int, int, int] = (12, 26, 9),
+        bollinger_k: float = 2.0
+    ) -> Dict[str, Any]:
+        """Latest indicator values per ticker, plus the return correlation matrix across them"""
+        with self._lock:
+            return self._compute(tickers, window, ema_span, rsi_period, macd, bollinger_k)
+
+    def _compute(
+        self,
+        tickers: Optional[List[str]],
+        window: int,
+        ema_span: int,
+        rsi_period: int,
+        macd: Tuple[int, int, int],
+        bollinger_k: float
+    ) -> Dict[str, Any]:
+        """compute() for a caller already holding the lock"""
+        if not self.cache.refresh():
+            return {"success": False, "error": "No market data loaded", "tool": "market_indicators"}
+        self.calls += 1
+        tickers = [t for t in (tickers or self.cache.tickers) if t in self.cache.tickers][:MARKET_MAX_TICKERS]
+        if not tickers:
+            return {"success": False, "error": "No cached tickers requested", "tool": "market_indicators"}
+        cols = self.cache.ticker_columns(tickers)
+        window = max(2, min(window, self.cache.length))
+
+        close = _ffill(np.asarray(self.cache.column("close")[-(window + 1):, cols], dtype=np.float64))
+        tail = close[1:] if len(close) > window else close
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            last = close[-1]
+            sma = np.nanmean(tail, axis=0)
+            std = np.nanstd(tail, axis=0)
+            returns = np.diff(np.log(close), axis=0)
+            volatility = np.nanstd(returns, axis=0, ddof=1) * math.sqrt(TRADING_DAYS)
+        ema = self._state(("ema", ema_span), lambda n: _EMAState(n, ema_span)).value[cols]
+        rsi = self._state(("rsi", rsi_period), lambda n: _RSIState(n, rsi_period)).value[cols]
+        macd_state = self._state(("macd",) + tuple(macd), lambda n: _MACDState(n, *macd))
+        macd_line, macd_signal = macd_state.value[cols], macd_state.signal.value[cols]
+
+        result = {}
+        for i, ticker in enumerate(tickers):
+            upper, lower = sma[i] + bollinger_k * std[i], sma[i] - bollinger_k * std[i]
+            result[ticker] = {
+                "close": _number(last[i]),
+                f"sma_{window}": _number(sma[i]),
+                f"ema_{ema_span}": _number(ema[i]),
+                f"rsi_{rsi_period}": _number(rsi[i]),
+                "macd": _number(macd_line[i]),
+                "macd_signal": _number(macd_signal[i]),
+                "macd_histogram": _number(macd_line[i] - macd_signal[i]),
+                "bollinger_upper": _number(upper),
+                "bollinger_lower": _number(lower),
+                f"volatility_{window}": _number(volatility[i])
+            }
+
+        correlation = None
+        complete = returns[~np.isnan(returns).any(axis=1)]
+        if len(tickers) > 1 and len(complete) > 2:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                matrix = np.corrcoef(complete, rowvar=False)
+            correlation = {"tickers": tickers, "matrix": [[_number(v) for v in row] for row in matrix]}
+
+        as_of = _day(self.cache.column("dates")[-1])
+        return {
+            "success": True,
+            "tool": "market_indicators",
+            "as_of": as_of,
+            "bars": self.cache.length,
+            "window": window,
+            "tickers": result,
+            "correlation": correlation,
+            "result": self.summary(as_of, result, correlation, window, ema_span, rsi_period)
+        }
+
+    @staticmethod
+    def summary(
+        as_of: str,
+        values: Dict[str, Dict[str, Optional[float]]],
+        correlation: Optional[Dict[str, Any]],
+        window: int,
+        ema_span: int,
+        rsi_period: int
+    ) -> str:
+        """One readable line per ticker (and the strongest correlations) for prompts and answers"""
+        def fmt(value, suffix=""):
+            return "n/a" if value is None else f"{value:,.2f}{suffix}"
+
+        lines = [f"Market data as of {as_of}:"]
+        for ticker, v in values.items():
+            volatility = v[f"volatility_{window}"]
+            lines.append(
+                f"{ticker}: close {fmt(v['close'])}, SMA{window} {fmt(v[f'sma_{window}'])}, EMA{ema_span} {fmt(v[f'ema_{ema_span}'])}, "
+                f"RSI{rsi_period} {fmt(v[f'rsi_{rsi_period}'])}, MACD {fmt(v['macd'])} (signal {fmt(v['macd_signal'])}), "
+                f"Bollinger {fmt(v['bollinger_lower'])}-{fmt(v['bollinger_upper'])}, "
+                f"{window}-day volatility {fmt(volatility * 100 if volatility is not None else None, '%')} annualized."
+            )
+        if correlation:
+            names, matrix = correlation["tickers"], correlation["matrix"]
+            pairs = sorted(
+                ((abs(matrix[i][j]), names[i], names[j], matrix[i][j]) for i in range(len(names)) for j in range(i + 1, len(names)) if matrix[i][j] is not None),
+                reverse=True
+            )[:3]
+            if pairs:
+                lines.append(f"{window}-day return correlation: " + ", ".join(f"{a}/{b} {value:.2f}" for _, a, b, value in pairs) + ".")
+        return "\n".join(lines)
+
+    def run(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """MCP tool entry point: tickers (a list or comma-separated string) or text to find them in, plus indicator parameters"""
+        start = time.perf_counter()
+        tickers = _ticker_list(parameters.get("tickers"))
+        # The lookup and the computation see the same mapping of the cache
+        with self._lock:
+            if not tickers and parameters.get("text"):
+                self.cache.refresh()
+                tickers = self.cache.find_tickers(parameters["text"])
+                if not tickers:
+                    return {"success": False, "error": "No cached tickers mentioned", "tool": "market_indicators"}
+            result = self._compute(
+                tickers or None,
+                int(parameters.get("window", 20)),
+                int(parameters.get("ema_span", 20)),
+                int(parameters.get("rsi_period", 14)),
+                tuple(parameters.get("macd", (12, 26, 9))),
+                float(parameters.get("bollinger_k", 2.0))
+            )
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.cache.stats(), "calls": self.calls, "states": len(self._states), "rows_advanced": self.rows_advanced}
+
+# Global cache and indicator engine used by the market_indicators MCP tool
+market_cache = OHLCVCache()
+market_indicators = MarketIndicators(market_cache)
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "load":
+        merged = {}
+        for path in sys.argv[2:]:
+            ticker, bars = read_csv(path)
+            merged.setdefault(ticker, {}).update(bars)
+        print(market_cache.append(merged))
+    elif command == "stats":
+        print(market_cache.stats())
+    else:
+        print(f"Unknown command {command}; use load or stats")
+        sys.exit(2)
@@ -0,0 +1,64 @@
+import os
+import re
+import json
+import time
+from typing import Container, Dict, Any, FrozenSet, List, Optional
+
+# Local OHLCV cache built by python -m app.market_data (its ticker list is read here without NumPy)
+MARKET_DATA_DIR = os.getenv("MARKET_DATA_DIR", "./market_data")
+# How often the ticker index re-checks meta.json for new tickers
+MARKET_TICKERS_REFRESH = float(os.getenv("MARKET_TICKERS_REFRESH", "5"))
+
+# $AAPL in any case, or an upper-case symbol as written (AAPL, BRK.B)
+_TICKER_TOKEN = re.compile(r"(\$)?\b([A-Za-z][A-Za-z0-9.\-]{0,9})\b")
+
+def read_meta(root: str) -> Optional[Dict[str, Any]]:
+    """The cache's meta.json (tickers, rows in use, epoch), or None when no cache has been built"""
+    try:
+        with open(os.path.join(root, "meta.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def find_tickers(text: str, known: Container[str], any_dollar: bool = False) -> List[str]:
+    """Tickers in known mentioned in free text; with any_dollar, every $-prefixed symbol counts"""
+    found = []
+    for dollar, token in _TICKER_TOKEN.findall(text):
+        ticker = token.upper()
+        if dollar and any_dollar or (dollar or token == ticker) and ticker in known:
+            if ticker not in found:
+                found.append(ticker)
+    return found
+
+class TickerIndex:
+    """Tickers in the local OHLCV cache, kept in memory and re-read when meta.json changes"""
+
+    def __init__(self, root: str = MARKET_DATA_DIR, refresh_interval: float = MARKET_TICKERS_REFRESH):
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self.tickers: FrozenSet[str] = frozenset()
+        self._mtime: Optional[int] = None
+        self._checked_at: Optional[float] = None
+
+    def refresh(self) -> FrozenSet[str]:
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+            return self.tickers
+        self._checked_at = now
+        try:
+            mtime = os.stat(os.path.join(self.root, "meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            self.tickers, self._mtime = frozenset(), None
+            return self.tickers
+        if mtime != self._mtime:
+            meta = read_meta(self.root)
+            self.tickers = frozenset(meta["tickers"]) if meta else frozenset()
+            self._mtime = mtime
+        return self.tickers
+
+    def find(self, text: str) -> List[str]:
+        """Tickers a question names: cached symbols, plus any $-prefixed one (a remote MCP server may have it)"""
+        return find_tickers(text, self.refresh(), any_dollar=True)
+
+# Global index used to decide which questions are grounded in market data
+ticker_index = TickerIndex()
@@ -1,25 +1,101 @@
 
+import os
+import time
 import asyncio
 import json
 from typing import Dict, Any, Optional
-import httpx
+from .mcp_transport import build_session_pool
+from .metrics import span
+from .readiness import import_provider
+
+# Upper bound for optional MCP side-calls on a request's critical path
+MCP_STEP_TIMEOUT = float(os.getenv("MCP_STEP_TIMEOUT", "2.0"))
+
+# Remote MCP server (HTTP endpoint or stdio command); unset means in-process tools
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL")
+MCP_SERVER_COMMAND = os.getenv("MCP_SERVER_COMMAND")
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+MCP_TOOLS_CACHE_TTL = float(os.getenv("MCP_TOOLS_CACHE_TTL", "60"))
+MCP_DEFAULT_TIMEOUT = float(os.getenv("MCP_DEFAULT_TIMEOUT", "10"))
+MCP_DEFAULT_CONCURRENCY = int(os.getenv("MCP_DEFAULT_CONCURRENCY", "16"))
+# Per-tool overrides as JSON, e.g. {"text_generation": 5}
+MCP_TOOL_TIMEOUTS = json.loads(os.getenv("MCP_TOOL_TIMEOUTS", "{}"))
+MCP_TOOL_CONCURRENCY = json.loads(os.getenv("MCP_TOOL_CONCURRENCY", "{}"))
 
 class MCPClient:
     """Simplified MCP Client for AI tool integration"""
     
-    def __init__(self):
+    def __init__(self, remote: bool = True):
         self.tools = {
             "text_generation": self._text_generation_tool,
             "image_analysis": self._image_analysis_tool,
-            "content_optimization": self._content_optimization_tool
+            "content_optimization": self._content_optimization_tool,
+            "market_indicators": self._market_indicators_tool
         }
+        
+        # Pooled, multiplexed sessions to a real MCP server when one is configured
+        self.pool = build_session_pool(MCP_SERVER_URL, MCP_SERVER_COMMAND, MCP_POOL_SIZE) if remote else None
+        self._tools_cache: Optional[list] = None
+        self._tools_cached_at = 0.0
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+    
+    def _semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        """Per-tool concurrency cap"""
+        semaphore = self._semaphores.get(tool_name)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(MCP_TOOL_CONCURRENCY.get(tool_name, MCP_DEFAULT_CONCURRENCY))
+            self._semaphores[tool_name] = semaphore
+        return semaphore
     
     async def call_tool(self, tool_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """Call an MCP tool"""
-        if tool_name not in self.tools:
-            raise ValueError(f"Tool {tool_name} not found")
+        timeout = MCP_TOOL_TIMEOUTS.get(tool_name, MCP_DEFAULT_TIMEOUT)
         
-        return await self.tools[tool_name](parameters)
+        with span("call_tool", tool=tool_name):
+            if self.pool is None:
+                if tool_name not in self.tools:
+                    raise ValueError(f"Tool {tool_name} not found")
+                async with self._semaphore(tool_name):
+                    return await asyncio.wait_for(self.tools[tool_name](parameters), timeout)
+            
+            async with self._semaphore(tool_name):
+                result = await self.pool.request(
+                    "tools/call",
+                    {"name": tool_name, "arguments": parameters},
+                    timeout=timeout
+                )
+        return self._parse_tool_result(tool_name, result)
+    
+    def _parse_tool_result(self, tool_name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Map an MCP tools/call result onto the dict shape the services expect"""
+        text = "".join(
+            item.get("text", "") for item in result.get("content", []) if item.get("type") == "text"
+        )
+        try:
+            parsed = json.loads(text)
+            if isinstance(parsed, dict):
+                return parsed
+        except ValueError:
+            pass
+        return {
+            "success": not result.get("isError", False),
+            "result": text,
+            "tool": tool_name
+        }
+    
+    async def try_call_tool(
+        self,
+        tool_name: str,
+        parameters: Dict[str, Any],
+        timeout: float = MCP_STEP_TIMEOUT
+    ) -> Dict[str, Any]:
+        """Call an MCP tool as an optional step: time-boxed, errors become an empty result"""
+        try:
+            return await asyncio.wait_for(self.call_tool(tool_name, parameters), timeout)
+        except asyncio.TimeoutError:
+            return {"success": False, "result": "", "error": f"Tool {tool_name} timed out after {timeout}s"}
+        except Exception as e:
+            return {"success": False, "result": "", "error": str(e)}
     
     async def _text_generation_tool(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """Text generation tool via MCP"""
@@ -67,9 +143,40 @@ class MCPClient:
             "parameters": parameters
         }
     
+    async def _market_indicators_tool(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Market indicators over the local OHLCV cache via MCP (NumPy loads on first use)"""
+        market_data = await import_provider(f"{__package__}.market_data")
+        return await asyncio.to_thread(market_data.market_indicators.run, parameters)
+    
     async def get_available_tools(self) -> list:
-        """Get list of available MCP tools"""
-        return list(self.tools.keys())
+        """Get list of available MCP tools (remote listings are cached)"""
+        if self.pool is None:
+            return list(self.tools.keys())
+        
+        if self._tools_cache is None or time.monotonic() - self._tools_cached_at > MCP_TOOLS_CACHE_TTL:
+            result = await self.pool.request("tools/list", {}, timeout=MCP_DEFAULT_TIMEOUT)
+            self._tools_cache = [tool["name"] for tool in result.get("tools", [])]
+            self._tools_cached_at = time.monotonic()
+        return list(self._tools_cache)
+    
+    async def warm(self):
+        """Open a pooled session and cache the tool listing ahead of the first request"""
+        if self.pool is not None:
+            await self.get_available_tools()
+    
+    async def close(self):
+        """Close pooled MCP sessions"""
+        if self.pool is not None:
+            await self.pool.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Transport and session pool metrics"""
+        if self.pool is None:
+            return {"transport": "in-process"}
+        return {
+            "transport": "http" if MCP_SERVER_URL else "stdio",
+            **self.pool.stats()
+        }
     
     async def health_check(self) -> Dict[str, Any]:
         """Check MCP server health"""
@@ -83,7 +190,7 @@ class MCPServer:
     """Simplified MCP Server simulation"""
     
     def __init__(self):
-        self.client = MCPClient()
+        self.client = MCPClient(remote=False)
     
     async def process_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Process MCP request"""
@@ -0,0 +1,93 @@
+"""
+Local stand-in MCP server for tests and benchmarks.
+
+Serves the in-process MCPClient tools over stdio (newline-delimited JSON-RPC),
+handling requests concurrently so clients can multiplex over one process:
+
+    MCP_SERVER_COMMAND="python -m app.mcp_stdio_server --delay 0.05"
+"""
+import sys
+import json
+import asyncio
+import argparse
+from typing import Dict, Any
+from .mcp_client import MCPClient
+from .mcp_transport import MCP_PROTOCOL_VERSION
+
+class StdioMCPServer:
+    """Minimal MCP server: initialize, tools/list and tools/call"""
+
+    def __init__(self, delay: float = 0.0):
+        self.client = MCPClient(remote=False)
+        self.delay = delay
+        self._write_lock = asyncio.Lock()
+
+    async def _write(self, message: Dict[str, Any]):
+        async with self._write_lock:
+            sys.stdout.buffer.write(json.dumps(message).encode("utf-8") + b"\n")
+            sys.stdout.buffer.flush()
+
+    async def _handle(self, message: Dict[str, Any]):
+        """Answer one JSON-RPC request"""
+        method = message.get("method")
+        params = message.get("params") or {}
+        request_id = message.get("id")
+        if request_id is None:
+            return  # notification
+
+        try:
+            if method == "initialize":
+                result = {
+                    "protocolVersion": MCP_PROTOCOL_VERSION,
+                    "capabilities": {"tools": {}},
+                    "serverInfo": {"name": "ai-trader-stand-in", "version": "1.0.0"}
+                }
+            elif method == "tools/list":
+                result = {
+                    "tools": [
+                        {"name": name, "description": tool.__doc__ or "", "inputSchema": {"type": "object"}}
+                        for name, tool in self.client.tools.items()
+                    ]
+                }
+            elif method == "tools/call":
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                output = await self.client.call_tool(params.get("name"), params.get("arguments") or {})
+                result = {"content": [{"type": "text", "text": json.dumps(output)}], "isError": False}
+            else:
+                await self._write({
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32601, "message": f"Method not found: {method}"}
+                })
+                return
+        except Exception as e:
+            result = {"content": [{"type": "text", "text": str(e)}], "isError": True}
+
+        await self._write({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+    async def serve(self):
+        """Read requests from stdin until EOF"""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=16 * 1024 * 1024)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+        tasks = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            task = asyncio.create_task(self._handle(message))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in MCP server over stdio")
+    parser.add_argument("--delay", type=float, default=0.0, help="Simulated tools/call latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(StdioMCPServer(delay=args.delay).serve())
@@ -0,0 +1,232 @@
+import sys
+import json
+import shlex
+import asyncio
+import itertools
+from typing import Dict, Any, List, Optional
+from .readiness import import_provider
+
+MCP_PROTOCOL_VERSION = "2024-11-05"
+MCP_CLIENT_INFO = {"name": "ai-trader-task-api", "version": "1.0.0"}
+
+class MCPTransportError(Exception):
+    """Raised when an MCP server returns an error or the connection fails"""
+
+class StdioSession:
+    """One long-lived MCP server subprocess speaking newline-delimited JSON-RPC
+
+    Many requests can be in flight at once; responses are matched back to
+    their callers by JSON-RPC id.
+    """
+
+    def __init__(self, command: str):
+        self.command = command
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._write_lock = asyncio.Lock()
+        self.in_flight = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    async def connect(self):
+        """Start the server process and perform the MCP initialize handshake"""
+        args = shlex.split(self.command)
+        if args and args[0] == "python":
+            args[0] = sys.executable
+        self._process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=16 * 1024 * 1024
+        )
+        self._reader_task = asyncio.create_task(self._read_loop())
+        await self.request("initialize", {
+            "protocolVersion": MCP_PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": MCP_CLIENT_INFO
+        })
+        await self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    async def _send(self, message: Dict[str, Any]):
+        async with self._write_lock:
+            self._process.stdin.write(json.dumps(message).encode("utf-8") + b"\n")
+            await self._process.stdin.drain()
+
+    async def _read_loop(self):
+        """Dispatch responses from the server to waiting requests"""
+        try:
+            while True:
+                line = await self._process.stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                future = self._pending.pop(message.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        finally:
+            error = MCPTransportError("MCP server connection closed")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+
+    async def request(self, method: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send a JSON-RPC request and wait for its result"""
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.in_flight += 1
+        try:
+            await self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+            message = await asyncio.wait_for(future, timeout)
+        finally:
+            self.in_flight -= 1
+            self._pending.pop(request_id, None)
+
+        if "error" in message:
+            raise MCPTransportError(message["error"].get("message", "MCP request failed"))
+        return message.get("result", {})
+
+    async def close(self):
+        if self._process is not None and self._process.returncode is None:
+            self._process.stdin.close()
+            try:
+                await asyncio.wait_for(self._process.wait(), 2)
+            except asyncio.TimeoutError:
+                self._process.kill()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+        self._process = None
+
+class HttpSession:
+    """MCP over HTTP: JSON-RPC POSTs multiplexed over a keep-alive connection pool"""
+
+    def __init__(self, url: str, max_connections: int = 10):
+        self.url = url
+        self._client = None  # httpx.AsyncClient, created on connect
+        self._session_id: Optional[str] = None
+        self._ids = itertools.count(1)
+        self.max_connections = max_connections
+        self.in_flight = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._client is not None and not self._client.is_closed
+
+    async def connect(self):
+        httpx = await import_provider("httpx")
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        )
+        await self.request("initialize", {
+            "protocolVersion": MCP_PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": MCP_CLIENT_INFO
+        })
+        await self._post({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    async def _post(self, message: Dict[str, Any], timeout: Optional[float] = None) -> "httpx.Response":
+        headers = {"Accept": "application/json, text/event-stream"}
+        if self._session_id:
+            headers["Mcp-Session-Id"] = self._session_id
+        response = await self._client.post(self.url, json=message, headers=headers, timeout=timeout)
+        if "mcp-session-id" in response.headers:
+            self._session_id = response.headers["mcp-session-id"]
+        return response
+
+    async def request(self, method: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        import httpx  # already loaded by connect()
+        request_id = next(self._ids)
+        self.in_flight += 1
+        try:
+            response = await self._post(
+                {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params},
+                timeout=timeout
+            )
+        except httpx.HTTPError as e:
+            raise MCPTransportError(str(e))
+        finally:
+            self.in_flight -= 1
+
+        if response.status_code >= 400:
+            raise MCPTransportError(f"MCP server returned HTTP {response.status_code}")
+
+        # Streamable HTTP servers may answer with a one-shot event stream
+        if response.headers.get("content-type", "").startswith("text/event-stream"):
+            message = {}
+            for line in response.text.splitlines():
+                if line.startswith("data:"):
+                    candidate = json.loads(line[5:].strip())
+                    if candidate.get("id") == request_id:
+                        message = candidate
+        else:
+            message = response.json()
+
+        if "error" in message:
+            raise MCPTransportError(message["error"].get("message", "MCP request failed"))
+        return message.get("result", {})
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+class SessionPool:
+    """A few long-lived MCP sessions; each request goes to the least busy one"""
+
+    def __init__(self, factory, size: int = 2):
+        self.factory = factory
+        self.size = max(1, size)
+        self._sessions: List[Any] = []
+        self._connect_lock = asyncio.Lock()
+
+        # Metrics
+        self.requests = 0
+        self.reconnects = 0
+
+    async def _session(self):
+        async with self._connect_lock:
+            alive = [s for s in self._sessions if s.alive]
+            if len(alive) < len(self._sessions):
+                self.reconnects += len(self._sessions) - len(alive)
+            self._sessions = alive
+            if len(self._sessions) < self.size:
+                session = self.factory()
+                await session.connect()
+                self._sessions.append(session)
+            return min(self._sessions, key=lambda s: s.in_flight)
+
+    async def request(self, method: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        session = await self._session()
+        self.requests += 1
+        return await session.request(method, params, timeout=timeout)
+
+    async def close(self):
+        for session in self._sessions:
+            await session.close()
+        self._sessions = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "size": self.size,
+            "in_flight": sum(s.in_flight for s in self._sessions),
+            "requests": self.requests,
+            "reconnects": self.reconnects
+        }
+
+def build_session_pool(url: Optional[str], command: Optional[str], size: int) -> Optional[SessionPool]:
+    """Session pool for the configured MCP server, or None to use in-process tools"""
+    if url:
+        return SessionPool(lambda: HttpSession(url), size)
+    if command:
+        return SessionPool(lambda: StdioSession(command), size)
+    return None
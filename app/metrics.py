@@ -0,0 +1,188 @@
+import re
+import time
+import bisect
+import functools
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, from cache hits up to slow image generations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Stats dicts keyed by a name rather than a field: their keys become label values, not part of metric names
+LABEL_KEYS = {
+    "providers": "provider",
+    "peers": "peer",
+    "limiters": "task",
+    "checks": "check",
+    "upstream_calls": "namespace",
+    "collapsed_calls": "namespace",
+    "cancelled_calls": "namespace"
+}
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+def _peer_key(pairs: List[List[str]]) -> LabelKey:
+    return tuple((k, v) for k, v in pairs)
+
+def _worker_label(worker: Optional[str]) -> List[Tuple[str, str]]:
+    return [("worker", worker)] if worker else []
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> List[Any]:
+        """JSON-serialisable values, for aggregation across worker processes"""
+        return [[list(map(list, key)), value] for key, value in self._values.items()]
+
+    def render(self, worker: Optional[str] = None, peers: Iterable[Tuple[str, List[Any]]] = ()) -> List[str]:
+        """Exposition lines for this worker and each peer's snapshot, labelled by worker"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for owner, snapshot in [(worker, self.snapshot()), *peers]:
+            for pairs, value in snapshot:
+                lines.append(f"{self.name}{_format_labels(_peer_key(pairs), _worker_label(owner))} {value}")
+        return lines
+
+class Histogram:
+    """Fixed-bucket histogram with labels (one bisect per observation)"""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # label key -> [bucket counts..., sum, count]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def snapshot(self) -> List[Any]:
+        """JSON-serialisable series, for aggregation across worker processes"""
+        return [[list(map(list, key)), list(series)] for key, series in self._values.items()]
+
+    def render(self, worker: Optional[str] = None, peers: Iterable[Tuple[str, List[Any]]] = ()) -> List[str]:
+        """Exposition lines for this worker and each peer's snapshot, labelled by worker"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for owner, snapshot in [(worker, self.snapshot()), *peers]:
+            extra = _worker_label(owner)
+            for pairs, series in snapshot:
+                key = _peer_key(pairs)
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, extra + [('le', repr(bound))])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, extra + [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key, extra)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key, extra)} {series[-1]}")
+        return lines
+
+# Hot-path instruments
+task_duration = Histogram("ai_task_duration_seconds", "End-to-end /ai-task handling time by task")
+task_requests = Counter("ai_task_requests_total", "AI tasks handled by task and outcome")
+stage_duration = Histogram("ai_task_stage_seconds", "Time spent in each service stage")
+stage_errors = Counter("ai_task_stage_errors_total", "Exceptions raised by service stages")
+fallbacks = Counter("ai_task_fallback_total", "Fallback responses served instead of a provider result")
+provider_calls = Counter("ai_provider_calls_total", "Upstream provider calls made by the provider routers, by outcome")
+
+INSTRUMENTS = (task_requests, task_duration, stage_duration, stage_errors, fallbacks, provider_calls)
+
+def snapshot_instruments() -> Dict[str, List[Any]]:
+    """This process's instrument values, keyed by metric name"""
+    return {instrument.name: instrument.snapshot() for instrument in INSTRUMENTS}
+
+@contextmanager
+def span(stage: str, **labels):
+    """Time a block of code as a service stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        stage_errors.inc(stage=stage, **labels)
+        raise
+    finally:
+        stage_duration.observe(time.perf_counter() - start, stage=stage, **labels)
+
+def timed(stage: str):
+    """Decorator timing an async function as a service stage"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(stage):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _flatten_gauges(prefix: str, values: Dict[str, Any], labels: LabelKey = ()) -> List[Tuple[str, LabelKey, float]]:
+    """Numeric leaves of a stats dict as (name, labels, value) gauge samples"""
+    samples = []
+    for key, value in values.items():
+        name = re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{key}")
+        if isinstance(value, bool):
+            samples.append((name, labels, int(value)))
+        elif isinstance(value, (int, float)):
+            samples.append((name, labels, value))
+        elif isinstance(value, dict) and key in LABEL_KEYS:
+            for item, inner in value.items():
+                item_labels = labels + ((LABEL_KEYS[key], str(item)),)
+                if isinstance(inner, dict):
+                    samples.extend(_flatten_gauges(name, inner, item_labels))
+                else:
+                    samples.extend(_flatten_gauges(prefix, {key: inner}, item_labels))
+        elif isinstance(value, dict):
+            samples.extend(_flatten_gauges(name, value, labels))
+    return samples
+
+def render_metrics(
+    gauges: Dict[str, Dict[str, Any]],
+    peers: Iterable[Dict[str, Any]] = (),
+    worker: Optional[str] = None
+) -> str:
+    """Prometheus text exposition of all instruments plus component stats gauges
+
+    In multi-worker mode, peers are the snapshots published by the other
+    workers. Every series, ours and theirs, carries a worker label (the
+    pid) rather than being summed, so a counter never goes backwards when
+    a worker exits; aggregate with sum without (worker) in queries.
+    """
+    peers = list(peers)
+    lines: List[str] = []
+    for instrument in INSTRUMENTS:
+        lines.extend(instrument.render(
+            worker, [(str(peer["pid"]), peer["instruments"].get(instrument.name, [])) for peer in peers]
+        ))
+    # Samples of one metric are grouped together, as the exposition format requires
+    grouped: Dict[str, List[str]] = {}
+    for owner, stats in [(worker, gauges), *((str(peer["pid"]), peer["stats"]) for peer in peers)]:
+        labels = tuple(_worker_label(owner))
+        for section, values in stats.items():
+            for name, sample_labels, value in _flatten_gauges(f"ai_trader_{section}", values, labels):
+                grouped.setdefault(name, []).append(f"{name}{_format_labels(sample_labels)} {value}")
+    for samples in grouped.values():
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
@@ -1,13 +1,19 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List
 from datetime import datetime
 
 class AITaskRequest(BaseModel):
     """Request model for the AI task endpoint"""
-    task: str = Field(..., description="Task type: qa, fetch_latest, generate_image, generate_content")
+    task: str = Field(..., description="Task type: qa, fetch_latest, history, generate_image, fetch_image, cancel_image, generate_content")
     question: Optional[str] = Field(None, description="Question for Q&A task")
     prompt: Optional[str] = Field(None, description="Prompt for image/content generation")
     platform: Optional[str] = Field(None, description="Platform for content generation (facebook, linkedin, twitter)")
+    platforms: Optional[List[str]] = Field(None, description="Several platforms to generate content for in one call")
+    job_id: Optional[str] = Field(None, description="Image job ID for fetch_image/cancel_image tasks")
+    limit: int = Field(20, ge=1, le=200, description="Page size for history task")
+    cursor: Optional[str] = Field(None, description="Pagination cursor from a previous history page")
+    query: Optional[str] = Field(None, description="Full-text search over questions and answers for history task")
+    bypass_cache: bool = Field(False, description="Skip the answer cache lookup for Q&A task")
 
 class AITaskResponse(BaseModel):
     """Response model for the AI task endpoint"""
@@ -16,6 +22,17 @@ class AITaskResponse(BaseModel):
     data: Optional[Dict[str, Any]]
     message: str
 
+class BatchTaskRequest(BaseModel):
+    """Request model for the batch AI task endpoint"""
+    items: List[AITaskRequest] = Field(..., min_length=1, max_length=1000, description="Tasks to run concurrently")
+    stream: bool = Field(False, description="Stream results as NDJSON lines as items complete")
+
+class BatchTaskResponse(BaseModel):
+    """Response model for the batch AI task endpoint"""
+    success: bool
+    results: List[AITaskResponse]
+    message: str
+
 class TokenRequest(BaseModel):
     """Request model for JWT token generation"""
     username: str
@@ -28,10 +45,20 @@ class QAEntry(BaseModel):
     answer: str
     timestamp: Optional[datetime] = None
 
+class ImageJob(BaseModel):
+    """Model for image generation jobs"""
+    job_id: str
+    prompt: str
+    status: str
+    progress: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
 class ImageResponse(BaseModel):
     """Model for image generation response"""
     image_url: Optional[str] = None
     image_base64: Optional[str] = None
+    artifact_id: Optional[str] = None
     prompt: str
 
 class ContentResponse(BaseModel):
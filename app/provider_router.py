@@ -0,0 +1,249 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Dict, Any, List, Optional
+from .metrics import provider_calls
+
+# Circuit breaker and rolling-stats configuration shared by all routers
+ROUTER_FAILURE_THRESHOLD = int(os.getenv("ROUTER_FAILURE_THRESHOLD", "5"))
+ROUTER_RESET_TIMEOUT = float(os.getenv("ROUTER_RESET_TIMEOUT", "30"))
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "100"))
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "10"))
+# Latency (seconds) assumed for a provider until ROUTER_MIN_SAMPLES successful calls are measured
+ROUTER_PRIOR_LATENCY = float(os.getenv("ROUTER_PRIOR_LATENCY", "1.0"))
+
+class ProviderError(Exception):
+    """Raised when a provider returns an unsuccessful result"""
+
+class ProviderUnavailableError(Exception):
+    """Raised when every provider's circuit breaker is open"""
+
+class CircuitBreaker:
+    """Opens after consecutive failures; lets one probe through after a cool-down"""
+
+    def __init__(self, failure_threshold: int = ROUTER_FAILURE_THRESHOLD, reset_timeout: float = ROUTER_RESET_TIMEOUT):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def available(self) -> bool:
+        """Whether a call could be admitted now (does not claim the probe)"""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+        return not self._probing
+
+    def acquire(self) -> bool:
+        """Admit a call; an open breaker past its cool-down admits a single probe"""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release(self):
+        """Give back a probe slot without an outcome (the call was cancelled)"""
+        self._probing = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+class Provider:
+    """One upstream behind a router, with its breaker and rolling latency/outcome window"""
+
+    def __init__(self, name: str, fn: Callable[..., Awaitable[Any]], breaker: CircuitBreaker, prior_latency: float = ROUTER_PRIOR_LATENCY):
+        self.name = name
+        self.fn = fn
+        self.breaker = breaker
+        self.prior_latency = prior_latency
+        self.latencies = deque(maxlen=ROUTER_WINDOW)  # successful calls only
+        self.outcomes = deque(maxlen=ROUTER_WINDOW)   # True for success
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self.latencies) < ROUTER_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def success_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 1.0
+
+    def typical_latency(self) -> float:
+        """Rolling p50; until enough samples exist, the observed latencies averaged with the prior"""
+        p50 = self.percentile(50)
+        if p50 is not None:
+            return p50
+        prior_weight = ROUTER_MIN_SAMPLES - len(self.latencies)
+        return (self.prior_latency * prior_weight + sum(self.latencies)) / (prior_weight + len(self.latencies))
+
+    def expected_cost(self) -> float:
+        """Typical latency inflated by the failure rate, which counts every call from the first"""
+        return self.typical_latency() / max(self.success_rate(), 0.1)
+
+class ProviderRouter:
+    """Calls interchangeable providers with circuit breakers, latency-aware ordering and optional hedging
+
+    Providers are tried fastest-first by rolling p50 (penalised by failure
+    rate); providers with open breakers are skipped. With hedging on, the
+    next provider is started once the current one has run past its p95 (or
+    hedge_delay until enough samples exist) and the first success wins.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        hedge: bool = False,
+        hedge_delay: float = 5.0,
+        is_success: Optional[Callable[[Any], bool]] = None,
+        failure_threshold: int = ROUTER_FAILURE_THRESHOLD,
+        reset_timeout: float = ROUTER_RESET_TIMEOUT,
+        prior_latency: float = ROUTER_PRIOR_LATENCY
+    ):
+        self.name = name
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.is_success = is_success
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.prior_latency = prior_latency
+        self.providers: List[Provider] = []
+
+        # Metrics
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.rejected = 0
+
+    def add(self, name: str, fn: Callable[..., Awaitable[Any]]):
+        """Register a provider; registration order is the preference before stats exist"""
+        breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        self.providers.append(Provider(name, fn, breaker, self.prior_latency))
+
+    def _ordered(self) -> List[Provider]:
+        candidates = [p for p in self.providers if p.breaker.available()]
+        return sorted(candidates, key=lambda p: p.expected_cost())
+
+    async def _attempt(self, provider: Provider, args, kwargs) -> Any:
+        """Call one provider, feeding its breaker and rolling stats"""
+        start = time.monotonic()
+        try:
+            result = await provider.fn(*args, **kwargs)
+            if self.is_success is not None and not self.is_success(result):
+                error = result.get("error") if isinstance(result, dict) else None
+                raise ProviderError(f"{provider.name}: {error or 'unsuccessful result'}")
+        except asyncio.CancelledError:
+            provider.breaker.release()
+            provider_calls.inc(router=self.name, provider=provider.name, outcome="cancelled")
+            raise
+        except Exception:
+            provider.breaker.record_failure()
+            provider.outcomes.append(False)
+            provider_calls.inc(router=self.name, provider=provider.name, outcome="failure")
+            raise
+        provider.breaker.record_success()
+        provider.outcomes.append(True)
+        provider.latencies.append(time.monotonic() - start)
+        provider_calls.inc(router=self.name, provider=provider.name, outcome="success")
+        return result
+
+    async def call(self, *args, **kwargs) -> Any:
+        """Return the first successful provider result; raise the last error if all fail"""
+        self.calls += 1
+        candidates = self._ordered()
+        if not candidates:
+            self.rejected += 1
+            raise ProviderUnavailableError(f"No {self.name} provider available (circuit open)")
+        if self.hedge and len(candidates) > 1:
+            return await self._call_hedged(candidates, args, kwargs)
+
+        last_error: Optional[Exception] = None
+        for provider in candidates:
+            if not provider.breaker.acquire():
+                continue
+            try:
+                return await self._attempt(provider, args, kwargs)
+            except Exception as e:
+                last_error = e
+        raise last_error or ProviderUnavailableError(f"No {self.name} provider available (circuit open)")
+
+    async def _call_hedged(self, candidates: List[Provider], args, kwargs) -> Any:
+        remaining = list(candidates)
+        pending: Dict[asyncio.Future, Provider] = {}
+        launched: List[Provider] = []
+        last_error: Optional[Exception] = None
+
+        def launch() -> bool:
+            while remaining:
+                provider = remaining.pop(0)
+                if provider.breaker.acquire():
+                    pending[asyncio.ensure_future(self._attempt(provider, args, kwargs))] = provider
+                    launched.append(provider)
+                    return True
+            return False
+
+        launch()
+        try:
+            while pending:
+                delay = None
+                if remaining:
+                    delay = launched[-1].percentile(95) or self.hedge_delay
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slow call: hedge with the next provider and take whichever finishes first
+                    if launch():
+                        self.hedges += 1
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        if provider is not launched[0]:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+                if not pending:
+                    launch()  # failed fast: move on without waiting out the hedge delay
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        raise last_error or ProviderUnavailableError(f"No {self.name} provider available (circuit open)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state and rolling latency per provider, plus hedging counters"""
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "hedge": self.hedge,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "rejected": self.rejected,
+            "providers": {
+                p.name: {
+                    "state": p.breaker.state,
+                    "consecutive_failures": p.breaker.failures,
+                    "success_rate": round(p.success_rate(), 3),
+                    "p50_ms": ms(p.percentile(50)),
+                    "p95_ms": ms(p.percentile(95))
+                }
+                for p in self.providers
+            }
+        }
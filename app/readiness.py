@@ -0,0 +1,91 @@
+import os
+import logging
+import time
+import asyncio
+import importlib
+from typing import Awaitable, Callable, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Optional warm-up run in the background after startup: import provider SDKs,
+# build pooled clients and open MCP sessions before the first request needs them
+STARTUP_PREWARM = os.getenv("STARTUP_PREWARM", "").lower() in ("1", "true", "yes")
+# A failed required warm-up step is retried with exponential backoff until it passes
+READINESS_RETRY_DELAY = float(os.getenv("READINESS_RETRY_DELAY", "1"))
+READINESS_RETRY_MAX_DELAY = float(os.getenv("READINESS_RETRY_MAX_DELAY", "30"))
+
+# Provider modules whose import has completed (sys.modules also holds half-imported ones)
+_providers: Dict[str, Any] = {}
+
+async def import_provider(module: str):
+    """Import a provider SDK off the event loop (a no-op once it has been loaded)"""
+    loaded = _providers.get(module)
+    if loaded is None:
+        # Concurrent first callers block on the import lock until the module is complete
+        loaded = _providers[module] = await asyncio.to_thread(importlib.import_module, module)
+    return loaded
+
+class Readiness:
+    """Tracks named startup checks; the app is ready once every registered check has passed"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.ready_at: Optional[float] = None
+        self.checks: Dict[str, Dict[str, Any]] = {}
+
+    def expect(self, *names: str):
+        """Register checks that must pass before the app reports ready"""
+        for name in names:
+            self.checks.setdefault(name, {"status": "pending"})
+
+    def mark(self, name: str, error: Optional[str] = None, **details):
+        """Record a check as passed (or failed, with the error)"""
+        elapsed = round((time.monotonic() - self.started_at) * 1000, 1)
+        if error is None:
+            self.checks[name] = {"status": "ok", "elapsed_ms": elapsed, **details}
+        else:
+            self.checks[name] = {"status": "failed", "elapsed_ms": elapsed, "error": error, **details}
+        if self.ready and self.ready_at is None:
+            self.ready_at = time.monotonic()
+
+    async def run(
+        self,
+        name: str,
+        step: Callable[[], Awaitable[Any]],
+        required: bool = True,
+        retry_delay: float = READINESS_RETRY_DELAY,
+        max_delay: float = READINESS_RETRY_MAX_DELAY
+    ):
+        """Run one warm-up step; optional steps that fail still count as passed, required ones are retried"""
+        self.expect(name)
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                await step()
+            except Exception as e:
+                logger.warning("Warm-up step %s failed (attempt %d): %s", name, attempts, e)
+                if not required:
+                    self.mark(name, skipped=str(e))
+                    return
+                # Stay not-ready while retrying, so a transient failure does not fail /ready for good
+                self.mark(name, error=str(e), attempts=attempts)
+                await asyncio.sleep(min(retry_delay * 2 ** (attempts - 1), max_delay))
+                continue
+            self.mark(name, attempts=attempts)
+            return
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.checks) and all(check["status"] == "ok" for check in self.checks.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "prewarm": STARTUP_PREWARM,
+            "ready_after_ms": round((self.ready_at - self.started_at) * 1000, 1) if self.ready_at else None,
+            "checks": self.checks
+        }
+
+# Global readiness state reported by /ready
+readiness = Readiness()
@@ -0,0 +1,160 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Callable, Dict, Any, Optional, Set, Tuple
+from ..database import Database, normalize_question
+from ..metrics import timed
+
+# Answer cache configuration
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_DB_MAX_AGE_HOURS = float(os.getenv("ANSWER_CACHE_DB_MAX_AGE_HOURS", "168"))
+# 1.0 serves only exact (normalized) matches; a lower threshold such as 0.85 opts in to near-duplicate matching
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "1.0"))
+
+def _trigrams(text: str) -> Set[str]:
+    """Character trigrams of a normalized question"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class AnswerCache:
+    """Two-tier answer cache: in-memory LRU with TTL over a qa_entries index"""
+
+    def __init__(
+        self,
+        is_fallback: Callable[[str, str], bool],
+        max_size: int = ANSWER_CACHE_SIZE,
+        ttl: float = ANSWER_CACHE_TTL,
+        similarity: float = ANSWER_CACHE_SIMILARITY,
+        db_max_age_hours: float = ANSWER_CACHE_DB_MAX_AGE_HOURS
+    ):
+        self.is_fallback = is_fallback
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        self.db_max_age = timedelta(hours=db_max_age_hours) if db_max_age_hours > 0 else None
+
+        # normalized question -> (answer, expires_at, trigrams)
+        self._entries: "OrderedDict[str, Tuple[str, float, Set[str]]]" = OrderedDict()
+        # trigram -> normalized questions containing it
+        self._grams: Dict[str, Set[str]] = {}
+
+        # Metrics
+        self.hits_memory = 0
+        self.hits_similar = 0
+        self.hits_database = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bypassed = 0
+
+    @property
+    def fuzzy(self) -> bool:
+        """Whether near-duplicate questions are matched by trigram similarity"""
+        return 0 < self.similarity < 1
+
+    def _remove(self, key: str):
+        """Drop an entry and its trigram postings"""
+        _, _, grams = self._entries.pop(key)
+        for gram in grams:
+            keys = self._grams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._grams[gram]
+
+    def _put(self, key: str, answer: str):
+        """Insert or refresh an entry, evicting the least recently used"""
+        if key in self._entries:
+            self._remove(key)
+        grams = _trigrams(key) if self.fuzzy else set()
+        self._entries[key] = (answer, time.monotonic() + self.ttl, grams)
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        """Exact-match lookup honoring the TTL"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        answer, expires_at, _ = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return answer
+
+    def _get_similar(self, key: str) -> Optional[str]:
+        """Closest cached question by trigram Jaccard similarity above the threshold"""
+        if not self.fuzzy or not self._entries:
+            return None
+        grams = _trigrams(key)
+        overlap: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._grams.get(gram, ()):
+                overlap[candidate] = overlap.get(candidate, 0) + 1
+
+        best_key, best_score = None, 0.0
+        for candidate, shared in overlap.items():
+            score = shared / (len(grams) + len(self._entries[candidate][2]) - shared)
+            if score > best_score:
+                best_key, best_score = candidate, score
+
+        if best_key is None or best_score < self.similarity:
+            return None
+        return self._get_memory(best_key)
+
+    @timed("answer_cache_lookup")
+    async def lookup(self, question: str, db: Database) -> Optional[Tuple[str, str]]:
+        """Return (answer, source) for a cached question, or None on a miss"""
+        key = normalize_question(question)
+
+        answer = self._get_memory(key)
+        if answer is not None:
+            self.hits_memory += 1
+            return answer, "memory"
+
+        answer = self._get_similar(key)
+        if answer is not None:
+            self.hits_similar += 1
+            return answer, "similar"
+
+        for answer in await db.find_answers(key, max_age=self.db_max_age):
+            if not self.is_fallback(question, answer):
+                self._put(key, answer)
+                self.hits_database += 1
+                return answer, "database"
+
+        self.misses += 1
+        return None
+
+    def store(self, question: str, answer: str):
+        """Cache a freshly generated answer (fallback answers are never cached)"""
+        if self.is_fallback(question, answer):
+            return
+        self._put(normalize_question(question), answer)
+
+    async def warm(self, db: Database, limit: int = 0):
+        """Preload recent answers so near-duplicates hit from the first request"""
+        # Same age limit as the database tier, so warming never revives answers lookup would skip
+        for entry in reversed(await db.get_all_qa(limit or self.max_size, max_age=self.db_max_age)):
+            self.store(entry["question"], entry["answer"])
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and eviction counters"""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits_memory": self.hits_memory,
+            "hits_similar": self.hits_similar,
+            "hits_database": self.hits_database,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "bypassed": self.bypassed
+        }
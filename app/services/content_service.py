@@ -1,15 +1,21 @@
 import os
-import openai
-from typing import Dict, Any
+import logging
+import json
+import asyncio
+from typing import AsyncIterator, Dict, Any, List
+from ..llm_client import llm_client
+from ..llm_scheduler import SchedulerTimeout
 from ..mcp_client import mcp_client
+from ..singleflight import single_flight
+from ..metrics import fallbacks, timed
+
+logger = logging.getLogger(__name__)
 
 class ContentService:
     """Platform-specific content generation service"""
     
     def __init__(self):
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        if self.openai_api_key:
-            openai.api_key = self.openai_api_key
         
         # Platform-specific content guidelines
         self.platform_guidelines = {
@@ -42,20 +48,26 @@ class ContentService:
                 "call_to_action": "encourage likes and comments"
             }
         }
+        
+        # Render the per-platform system prompts once rather than per request
+        self._system_prompts = {
+            platform: self._build_system_prompt(platform)
+            for platform in self.platform_guidelines
+        }
     
     async def generate_content(self, prompt: str, platform: str) -> Dict[str, Any]:
         """Generate platform-specific content"""
         try:
             platform = platform.lower()
             
-            # Use MCP for content optimization
-            mcp_result = await mcp_client.call_tool("content_optimization", {
-                "content": prompt,
-                "platform": platform
-            })
-            
-            # Generate content using AI
-            content = await self._generate_ai_content(prompt, platform)
+            # Run MCP content optimization (time-boxed) alongside AI generation
+            mcp_result, content = await asyncio.gather(
+                mcp_client.try_call_tool("content_optimization", {
+                    "content": prompt,
+                    "platform": platform
+                }),
+                self._generate_ai_content(prompt, platform)
+            )
             
             return {
                 "content": content,
@@ -67,6 +79,7 @@ class ContentService:
             
         except Exception as e:
             # Fallback content generation
+            fallbacks.inc(task="generate_content", reason="error")
             fallback_content = self._generate_fallback_content(prompt, platform)
             
             return {
@@ -76,41 +89,165 @@ class ContentService:
                 "note": f"Fallback used due to: {str(e)}"
             }
     
+    async def stream_content(self, prompt: str, platform: str) -> AsyncIterator[Dict[str, Any]]:
+        """Stream generated content tokens as they arrive, then yield the final result"""
+        platform = platform.lower()
+        
+        # MCP optimization runs in the background while tokens stream
+        mcp_task = asyncio.ensure_future(mcp_client.try_call_tool("content_optimization", {
+            "content": prompt,
+            "platform": platform
+        }))
+        
+        note = None
+        parts = []
+        if self.openai_api_key:
+            try:
+                async for token in llm_client.stream_chat(
+                    messages=self._content_messages(prompt, platform),
+                    max_tokens=300 if platform != "twitter" else 100,
+                    temperature=0.8
+                ):
+                    parts.append(token)
+                    yield {"event": "token", "text": token}
+            except Exception as e:
+                logger.warning("OpenAI API error: %s", e)
+                note = f"Stream interrupted: {str(e)}"
+        
+        content = "".join(parts).strip()
+        if not content:
+            fallbacks.inc(task="generate_content", reason="no_api_key" if not self.openai_api_key else "provider_error")
+            content = self._generate_fallback_content(prompt, platform)
+            yield {"event": "token", "text": content}
+        
+        mcp_result = await mcp_task
+        result = {
+            "content": content,
+            "platform": platform,
+            "prompt": prompt,
+            "guidelines_used": self.platform_guidelines.get(platform, {}),
+            "mcp_optimization": mcp_result.get("result", "")
+        }
+        if note:
+            result["note"] = note
+        yield {"event": "done", "data": result}
+    
+    async def generate_multi_content(self, prompt: str, platforms: List[str]) -> Dict[str, Any]:
+        """Generate content for several platforms from one structured model call"""
+        platforms = list(dict.fromkeys(p.lower() for p in platforms))
+        
+        # MCP optimizations (time-boxed) run while the content is generated
+        mcp_task = asyncio.gather(*(
+            mcp_client.try_call_tool("content_optimization", {"content": prompt, "platform": platform})
+            for platform in platforms
+        ))
+        
+        contents: Dict[str, str] = {}
+        mode = "fallback"
+        if self.openai_api_key:
+            try:
+                contents = await self._generate_multi_ai_content(prompt, platforms)
+                mode = "single_call"
+            except Exception as e:
+                logger.warning("Multi-platform generation error: %s", e)
+            
+            # Platforms missing from the structured reply get their own calls
+            missing = [p for p in platforms if not contents.get(p)]
+            if missing:
+                generated = await asyncio.gather(*(self._generate_ai_content(prompt, p) for p in missing))
+                contents.update(zip(missing, generated))
+                mode = "parallel" if len(missing) == len(platforms) else "single_call+parallel"
+        
+        mcp_results = await mcp_task
+        return {
+            "prompt": prompt,
+            "mode": mode,
+            "platforms": {
+                platform: {
+                    "content": contents.get(platform) or self._generate_fallback_content(prompt, platform),
+                    "guidelines_used": self.platform_guidelines.get(platform, {}),
+                    "mcp_optimization": mcp_result.get("result", "")
+                }
+                for platform, mcp_result in zip(platforms, mcp_results)
+            }
+        }
+    
+    @timed("generate_multi_content")
+    async def _generate_multi_ai_content(self, prompt: str, platforms: List[str]) -> Dict[str, str]:
+        """One model call returning a JSON object of content keyed by platform"""
+        sections = "\n\n".join(
+            f"### {platform}\n{self._system_prompts.get(platform) or self._build_system_prompt(platform)}"
+            for platform in platforms
+        )
+        system_prompt = f"""You write social media content for several platforms at once.
+        Follow each platform's guidelines below.
+        
+        {sections}
+        
+        Reply with only a JSON object whose keys are exactly {json.dumps(platforms)} and whose values are the post text for that platform."""
+        
+        reply = await llm_client.chat(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"Create content about: {prompt}"}
+            ],
+            max_tokens=sum(300 if p != "twitter" else 100 for p in platforms),
+            temperature=0.8
+        )
+        
+        # Tolerate a fenced code block around the JSON
+        reply = reply.strip()
+        if reply.startswith("```"):
+            reply = reply.strip("`")
+            reply = reply[reply.find("{"):]
+        parsed = json.loads(reply[:reply.rfind("}") + 1])
+        return {p: str(parsed[p]).strip() for p in platforms if parsed.get(p)}
+    
+    def _build_system_prompt(self, platform: str) -> str:
+        """System prompt for generating content on a platform"""
+        guidelines = self.platform_guidelines.get(platform, self.platform_guidelines["facebook"])
+        
+        return f"""You are a social media content creator specializing in {platform} content.
+        
+        Platform Guidelines:
+        - Tone: {guidelines.get('tone', 'engaging')}
+        - Length: {guidelines.get('length', 'medium')}
+        - Features: {guidelines.get('features', 'engaging content')}
+        - Hashtags: {guidelines.get('hashtags', 'relevant hashtags')}
+        - Call to Action: {guidelines.get('call_to_action', 'encourage engagement')}
+        
+        Create content that follows these guidelines and is optimized for {platform}."""
+    
+    def _content_messages(self, prompt: str, platform: str) -> list:
+        """Chat messages for generating content on a platform"""
+        system_prompt = self._system_prompts.get(platform) or self._build_system_prompt(platform)
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Create {platform} content about: {prompt}"}
+        ]
+    
+    @timed("generate_content")
     async def _generate_ai_content(self, prompt: str, platform: str) -> str:
         """Generate AI content using OpenAI or fallback"""
         if not self.openai_api_key:
+            fallbacks.inc(task="generate_content", reason="no_api_key")
             return self._generate_fallback_content(prompt, platform)
         
         try:
-            guidelines = self.platform_guidelines.get(platform, self.platform_guidelines["facebook"])
-            
-            system_prompt = f"""You are a social media content creator specializing in {platform} content.
-            
-            Platform Guidelines:
-            - Tone: {guidelines.get('tone', 'engaging')}
-            - Length: {guidelines.get('length', 'medium')}
-            - Features: {guidelines.get('features', 'engaging content')}
-            - Hashtags: {guidelines.get('hashtags', 'relevant hashtags')}
-            - Call to Action: {guidelines.get('call_to_action', 'encourage engagement')}
-            
-            Create content that follows these guidelines and is optimized for {platform}."""
-            
-            client = openai.OpenAI(api_key=self.openai_api_key)
-            
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Create {platform} content about: {prompt}"}
-                ],
-                max_tokens=300 if platform != "twitter" else 100,
-                temperature=0.8
+            # Concurrent identical prompts for a platform share one upstream call
+            return await single_flight.do(
+                ("generate_content", platform, " ".join(prompt.lower().split())),
+                lambda: llm_client.chat(
+                    messages=self._content_messages(prompt, platform),
+                    max_tokens=300 if platform != "twitter" else 100,
+                    temperature=0.8
+                )
             )
             
-            return response.choices[0].message.content.strip()
-            
         except Exception as e:
-            print(f"OpenAI API error: {e}")
+            logger.warning("OpenAI API error: %s", e)
+            fallbacks.inc(task="generate_content", reason="rate_limited" if isinstance(e, SchedulerTimeout) else "provider_error")
             return self._generate_fallback_content(prompt, platform)
     
     def _generate_fallback_content(self, prompt: str, platform: str) -> str:
@@ -1,9 +1,33 @@
 import os
-import base64
-import requests
-import replicate
-from typing import Dict, Any
+import logging
+import asyncio
+from typing import Awaitable, Callable, Dict, Any, Optional
+from ..artifacts import artifact_store
 from ..mcp_client import mcp_client
+from ..singleflight import single_flight
+from ..metrics import fallbacks, timed
+from ..provider_router import ProviderRouter
+from ..readiness import import_provider
+
+logger = logging.getLogger(__name__)
+
+# Provider models and generation parameters (part of each artifact's content address)
+REPLICATE_MODEL = "stability-ai/stable-diffusion:27b93a2413e7f36cd83da926f3656280b2931564ff050bf9575f1fdf9bcd7478"
+REPLICATE_PARAMS = {
+    "width": 512,
+    "height": 512,
+    "num_outputs": 1,
+    "guidance_scale": 7.5,
+    "num_inference_steps": 50
+}
+HUGGINGFACE_MODEL = "runwayml/stable-diffusion-v1-5"
+HUGGINGFACE_PARAMS: Dict[str, Any] = {}
+# Inference endpoint base (overridable to point at a local stand-in for benchmarks)
+HUGGINGFACE_API_URL = os.getenv("HUGGINGFACE_API_URL", "https://api-inference.huggingface.co/models")
+
+# Hedging: start the next provider once the current one runs past its p95
+IMAGE_HEDGE = os.getenv("IMAGE_HEDGE", "").lower() in ("1", "true", "yes")
+IMAGE_HEDGE_DELAY = float(os.getenv("IMAGE_HEDGE_DELAY", "15"))
 
 class ImageService:
     """Image generation service using AI models"""
@@ -14,21 +38,66 @@ class ImageService:
         
         if self.replicate_api_key:
             os.environ["REPLICATE_API_TOKEN"] = self.replicate_api_key
+        
+        # Route between the configured providers (Replicate preferred until latency stats exist)
+        self.router = ProviderRouter(
+            "image",
+            hedge=IMAGE_HEDGE,
+            hedge_delay=IMAGE_HEDGE_DELAY,
+            is_success=lambda result: result.get("success")
+        )
+        if self.replicate_api_key:
+            self.router.add("replicate", self._generate_with_replicate)
+        if self.huggingface_api_key:
+            self.router.add("huggingface", self._generate_with_huggingface)
+    
+    async def warm(self):
+        """Import the SDKs for the configured providers ahead of the first request"""
+        if self.replicate_api_key:
+            await import_provider("replicate")
+        if self.replicate_api_key or self.huggingface_api_key:
+            await import_provider("requests")
     
-    async def generate_image(self, prompt: str) -> Dict[str, Any]:
-        """Generate image from text prompt"""
+    async def generate_image(
+        self,
+        prompt: str,
+        progress: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """Generate image from text prompt, optionally reporting progress (0-100)"""
+        # Concurrent identical prompts share one generation; its progress reaches every caller
+        result = await single_flight.do_with_progress(
+            ("generate_image", " ".join(prompt.split())),
+            lambda report: self._generate_image(prompt, report),
+            progress
+        )
+        return dict(result)
+    
+    async def _generate_image(
+        self,
+        prompt: str,
+        progress: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """Generate image from text prompt, routing across the configured providers"""
         try:
-            # Try Replicate first (if API key available)
-            if self.replicate_api_key:
-                result = await self._generate_with_replicate(prompt)
-                if result["success"]:
-                    return result
+            # Repeat prompts are served from the artifact store with no model call
+            for model, params in ((REPLICATE_MODEL, REPLICATE_PARAMS), (HUGGINGFACE_MODEL, HUGGINGFACE_PARAMS)):
+                artifact = artifact_store.lookup(artifact_store.key(prompt, model, params))
+                if artifact:
+                    return {
+                        "success": True,
+                        **artifact,
+                        "prompt": prompt,
+                        "service": "artifact_store"
+                    }
             
-            # Try Hugging Face as fallback
-            if self.huggingface_api_key:
-                result = await self._generate_with_huggingface(prompt)
-                if result["success"]:
-                    return result
+            # Route to the available providers (circuit breakers skip failing ones)
+            if self.router.providers:
+                if progress:
+                    await progress(25)
+                try:
+                    return await self.router.call(prompt)
+                except Exception as e:
+                    logger.warning("Image providers failed: %s", e)
             
             # Use MCP for image-related processing
             mcp_result = await mcp_client.call_tool("image_analysis", {
@@ -36,7 +105,8 @@ class ImageService:
                 "task": "generation"
             })
             
-            # Return placeholder if no API keys available
+            # Return placeholder if no provider is configured or all of them failed
+            fallbacks.inc(task="generate_image", reason="placeholder")
             return {
                 "success": True,
                 "image_url": "https://via.placeholder.com/512x512.png?text=Image+Generated",
@@ -52,59 +122,70 @@ class ImageService:
                 "prompt": prompt
             }
     
+    @timed("generate_with_replicate")
     async def _generate_with_replicate(self, prompt: str) -> Dict[str, Any]:
         """Generate image using Replicate API"""
         try:
-            # Using Stable Diffusion model on Replicate
-            output = replicate.run(
-                "stability-ai/stable-diffusion:27b93a2413e7f36cd83da926f3656280b2931564ff050bf9575f1fdf9bcd7478",
-                input={
-                    "prompt": prompt,
-                    "width": 512,
-                    "height": 512,
-                    "num_outputs": 1,
-                    "guidance_scale": 7.5,
-                    "num_inference_steps": 50
-                }
+            # Using Stable Diffusion model on Replicate (blocking client, run off the event loop)
+            replicate = await import_provider("replicate")
+            requests = await import_provider("requests")
+            output = await asyncio.to_thread(
+                replicate.run,
+                REPLICATE_MODEL,
+                input={"prompt": prompt, **REPLICATE_PARAMS}
             )
             
             if output and len(output) > 0:
                 image_url = output[0]
-                return {
+                result = {
                     "success": True,
                     "image_url": image_url,
                     "prompt": prompt,
                     "service": "replicate"
                 }
+                
+                # Keep a durable copy; Replicate output URLs expire
+                try:
+                    download = await asyncio.to_thread(requests.get, image_url, timeout=60)
+                    if download.status_code == 200:
+                        key = artifact_store.key(prompt, REPLICATE_MODEL, REPLICATE_PARAMS)
+                        result.update(await artifact_store.put(key, download.content))
+                except Exception as e:
+                    logger.warning("Replicate download error: %s", e)
+                
+                return result
             else:
                 return {"success": False, "error": "No output from Replicate"}
                 
         except Exception as e:
-            print(f"Replicate error: {e}")
+            logger.warning("Replicate error: %s", e)
             return {"success": False, "error": str(e)}
     
+    @timed("generate_with_huggingface")
     async def _generate_with_huggingface(self, prompt: str) -> Dict[str, Any]:
         """Generate image using Hugging Face API"""
         try:
             # Using Stable Diffusion on Hugging Face
-            API_URL = "https://api-inference.huggingface.co/models/runwayml/stable-diffusion-v1-5"
+            API_URL = f"{HUGGINGFACE_API_URL}/{HUGGINGFACE_MODEL}"
             headers = {"Authorization": f"Bearer {self.huggingface_api_key}"}
             
-            response = requests.post(
+            requests = await import_provider("requests")
+            response = await asyncio.to_thread(
+                requests.post,
                 API_URL,
                 headers=headers,
-                json={"inputs": prompt},
+                json={"inputs": prompt, **HUGGINGFACE_PARAMS},
                 timeout=60
             )
             
             if response.status_code == 200:
-                # Convert image to base64
-                image_bytes = response.content
-                image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+                # Write the image to the artifact store instead of inlining it
+                key = artifact_store.key(prompt, HUGGINGFACE_MODEL, HUGGINGFACE_PARAMS)
+                artifact = await artifact_store.put(key, response.content)
                 
                 return {
                     "success": True,
-                    "image_base64": f"data:image/png;base64,{image_base64}",
+                    **artifact,
                     "prompt": prompt,
                     "service": "huggingface"
                 }
@@ -115,5 +196,5 @@ class ImageService:
                 }
                 
         except Exception as e:
-            print(f"Hugging Face error: {e}")
+            logger.warning("Hugging Face error: %s", e)
             return {"success": False, "error": str(e)}
\ No newline at end of file
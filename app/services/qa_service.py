@@ -1,44 +1,67 @@
 import os
-import openai
-from typing import Dict, Any
-from ..database import Database
+import logging
+import asyncio
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+from ..database import Database, normalize_question
+from ..llm_client import llm_client
+from ..llm_scheduler import SchedulerTimeout
 from ..mcp_client import mcp_client
+from ..market_tickers import ticker_index
+from ..singleflight import single_flight
+from ..metrics import fallbacks, timed
+from .answer_cache import AnswerCache
+
+logger = logging.getLogger(__name__)
 
 class QAService:
     """Question & Answer service with AI agent"""
     
     def __init__(self):
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        if self.openai_api_key:
-            openai.api_key = self.openai_api_key
+        self.answer_cache = AnswerCache(is_fallback=self._is_fallback_answer)
     
-    async def process_question(self, question: str, db: Database) -> Dict[str, Any]:
-        """Process question with AI agent and save to database"""
+    async def process_question(
+        self,
+        question: str,
+        db: Database,
+        bypass_cache: bool = False,
+        save: bool = True
+    ) -> Dict[str, Any]:
+        """Process question with AI agent and save to database (unless save=False)"""
         try:
-            # Generate answer using AI
-            answer = await self._generate_answer(question)
+            # Serve repeated questions from the answer cache (unless grounded in market data)
+            market, cached = await self._market_and_cached(question, db, bypass_cache)
             
-            # Save Q&A to database
-            qa_id = await db.save_qa(question, answer)
+            if cached:
+                answer, cache_source = cached
+            else:
+                # Generate answer using AI
+                answer = await self._generate_answer(question, market)
+                if market is None:
+                    self.answer_cache.store(question, answer)
+                cache_source = None
             
-            # Use MCP for additional processing
-            mcp_result = await mcp_client.call_tool("text_generation", {
-                "prompt": f"Enhance this Q&A: Q: {question} A: {answer}",
-                "max_length": 200
-            })
+            # Save Q&A to database and run the (time-boxed) MCP enhancement concurrently
+            qa_id, mcp_result = await self._save_and_enhance(question, answer, db, save)
             
-            return {
+            result = {
                 "id": qa_id,
                 "question": question,
                 "answer": answer,
                 "mcp_enhancement": mcp_result.get("result", ""),
                 "timestamp": "now"
             }
+            if cache_source:
+                result["cached"] = cache_source
+            if market:
+                result["market_data"] = {"as_of": market["as_of"], "tickers": market["tickers"]}
+            return result
             
         except Exception as e:
             # Fallback answer if AI service fails
+            fallbacks.inc(task="qa", reason="error")
             fallback_answer = self._get_fallback_answer(question)
-            qa_id = await db.save_qa(question, fallback_answer)
+            qa_id = await db.save_qa(question, fallback_answer) if save else None
             
             return {
                 "id": qa_id,
@@ -48,30 +71,141 @@ class QAService:
                 "timestamp": "now"
             }
     
-    async def _generate_answer(self, question: str) -> str:
+    async def stream_answer(self, question: str, db: Database, bypass_cache: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Stream answer tokens as they arrive, then save and yield the final result"""
+        market, cached = await self._market_and_cached(question, db, bypass_cache)
+        
+        note = None
+        if cached:
+            answer, cache_source = cached
+            yield {"event": "token", "text": answer}
+        else:
+            cache_source = None
+            parts = []
+            if self.openai_api_key:
+                try:
+                    async for token in llm_client.stream_chat(
+                        messages=self._answer_messages(question, market),
+                        max_tokens=500,
+                        temperature=0.7
+                    ):
+                        parts.append(token)
+                        yield {"event": "token", "text": token}
+                except Exception as e:
+                    logger.warning("OpenAI API error: %s", e)
+                    note = f"Stream interrupted: {str(e)}"
+            
+            answer = "".join(parts).strip()
+            if not answer:
+                fallbacks.inc(task="qa", reason="no_api_key" if not self.openai_api_key else "provider_error")
+                answer = self._market_answer(market) if market else self._get_fallback_answer(question)
+                yield {"event": "token", "text": answer}
+            elif note is None and market is None:
+                self.answer_cache.store(question, answer)
+        
+        # Save Q&A to database once the stream has closed; a truncated answer is never stored,
+        # or the answer cache's database tier would later serve it as a complete one
+        qa_id, mcp_result = await self._save_and_enhance(question, answer, db, save=note is None)
+        
+        result = {
+            "id": qa_id,
+            "question": question,
+            "answer": answer,
+            "mcp_enhancement": mcp_result.get("result", ""),
+            "timestamp": "now"
+        }
+        if cache_source:
+            result["cached"] = cache_source
+        if market:
+            result["market_data"] = {"as_of": market["as_of"], "tickers": market["tickers"]}
+        if note:
+            result["note"] = note
+        yield {"event": "done", "data": result}
+    
+    async def _save_and_enhance(self, question: str, answer: str, db: Database, save: bool = True):
+        """Save the Q&A and fetch the MCP enhancement concurrently; returns (id, mcp result)"""
+        enhance = mcp_client.try_call_tool("text_generation", {
+            "prompt": f"Enhance this Q&A: Q: {question} A: {answer}",
+            "max_length": 200
+        })
+        if not save:
+            return None, await enhance
+        qa_id, mcp_result = await asyncio.gather(db.save_qa(question, answer), enhance)
+        return qa_id, mcp_result
+    
+    async def _market_and_cached(
+        self,
+        question: str,
+        db: Database,
+        bypass_cache: bool
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, str]]]:
+        """Market indicators for the tickers a question names and the answer cache lookup, run concurrently
+
+        Answers grounded in market data depend on the latest bars, so a
+        cached answer is only used when no indicators came back.
+        """
+        tickers = ticker_index.find(question)
+        if bypass_cache:
+            self.answer_cache.bypassed += 1
+            lookup = None
+        else:
+            lookup = self.answer_cache.lookup(question, db)
+        if not tickers:
+            return None, (await lookup if lookup is not None else None)
+        if lookup is None:
+            return await self._market_context(tickers), None
+        market, cached = await asyncio.gather(self._market_context(tickers), lookup)
+        return market, (None if market else cached)
+    
+    async def _market_context(self, tickers: List[str]) -> Optional[Dict[str, Any]]:
+        """Indicators for tickers from the market_indicators tool, or None if it has no data for them"""
+        result = await mcp_client.try_call_tool("market_indicators", {"tickers": tickers})
+        return result if result.get("success") else None
+    
+    def _answer_messages(self, question: str, market: Optional[Dict[str, Any]] = None) -> list:
+        """Chat messages for answering a question"""
+        messages = [
+            {"role": "system", "content": "You are a helpful AI assistant that provides accurate and informative answers."}
+        ]
+        if market:
+            messages.append({
+                "role": "system",
+                "content": "Use these figures computed from the local market data for any numbers you quote; do not invent prices or indicator values.\n" + market["result"]
+            })
+        messages.append({"role": "user", "content": question})
+        return messages
+    
+    def _market_answer(self, market: Dict[str, Any]) -> str:
+        """Answer built from the computed indicators when the AI service is unavailable"""
+        return market["result"]
+    
+    @timed("generate_answer")
+    async def _generate_answer(self, question: str, market: Optional[Dict[str, Any]] = None) -> str:
         """Generate AI answer using OpenAI or fallback"""
         if not self.openai_api_key:
-            return self._get_fallback_answer(question)
+            fallbacks.inc(task="qa", reason="no_api_key")
+            return self._market_answer(market) if market else self._get_fallback_answer(question)
         
         try:
-            # Use OpenAI API (you can replace with other AI services)
-            client = openai.OpenAI(api_key=self.openai_api_key)
-            
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful AI assistant that provides accurate and informative answers."},
-                    {"role": "user", "content": question}
-                ],
-                max_tokens=500,
-                temperature=0.7
+            # Use the shared async OpenAI client (you can replace with other AI services);
+            # concurrent identical questions share one upstream call
+            return await single_flight.do(
+                ("qa", normalize_question(question), market["as_of"] if market else None),
+                lambda: llm_client.chat(
+                    messages=self._answer_messages(question, market),
+                    max_tokens=500,
+                    temperature=0.7
+                )
             )
             
-            return response.choices[0].message.content.strip()
-            
         except Exception as e:
-            print(f"OpenAI API error: {e}")
-            return self._get_fallback_answer(question)
+            logger.warning("OpenAI API error: %s", e)
+            fallbacks.inc(task="qa", reason="rate_limited" if isinstance(e, SchedulerTimeout) else "provider_error")
+            return self._market_answer(market) if market else self._get_fallback_answer(question)
+    
+    def _is_fallback_answer(self, question: str, answer: str) -> bool:
+        """Whether an answer is the canned fallback for this question"""
+        return answer == self._get_fallback_answer(question)
     
     def _get_fallback_answer(self, question: str) -> str:
         """Generate fallback answer when AI service is unavailable"""
@@ -106,4 +240,19 @@ class QAService:
             return {
                 "found": False,
                 "message": "No Q&A entries found in database"
-            }
\ No newline at end of file
+            }
+    
+    async def get_history(
+        self,
+        db: Database,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        query: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get a page of Q&A history, newest first"""
+        page = await db.get_history(limit=limit, cursor=cursor, query=query)
+        return {
+            "count": len(page["items"]),
+            "items": page["items"],
+            "next_cursor": page["next_cursor"]
+        }
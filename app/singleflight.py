@@ -0,0 +1,94 @@
+import logging
+import asyncio
+from typing import Awaitable, Callable, Dict, Any, Hashable, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+Progress = Callable[[int], Awaitable[None]]
+
+class _Flight:
+    """One call in flight: its task, how many callers await it, and their progress callbacks"""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Future] = None
+        self.waiters = 0
+        self.listeners: List[Progress] = []
+
+    async def report(self, value: int):
+        """Pass progress on to every caller still waiting"""
+        for listener in list(self.listeners):
+            try:
+                await listener(value)
+            except Exception as e:
+                logger.warning("Progress callback error: %s", e)
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one upstream call"""
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[Hashable, ...], _Flight] = {}
+
+        # Metrics per namespace (the first element of each key)
+        self.leaders: Dict[str, int] = {}
+        self.collapsed: Dict[str, int] = {}
+        self.cancelled: Dict[str, int] = {}
+
+    async def do(self, key: Tuple[Hashable, ...], fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn for key, or await the identical call already in flight"""
+        return await self._join(key, lambda flight: fn(), None)
+
+    async def do_with_progress(
+        self,
+        key: Tuple[Hashable, ...],
+        fn: Callable[[Progress], Awaitable[T]],
+        progress: Optional[Progress] = None
+    ) -> T:
+        """Like do, for calls that report progress: fn(report) reaches every waiting caller's progress"""
+        return await self._join(key, lambda flight: fn(flight.report), progress)
+
+    async def _join(self, key: Tuple[Hashable, ...], start: Callable[[_Flight], Awaitable[T]], progress: Optional[Progress]) -> T:
+        namespace = str(key[0])
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self.collapsed[namespace] = self.collapsed.get(namespace, 0) + 1
+        else:
+            self.leaders[namespace] = self.leaders.get(namespace, 0) + 1
+            flight = _Flight()
+            # A separate task so one caller disconnecting does not cancel the others
+            flight.task = asyncio.ensure_future(start(flight))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        if progress is not None:
+            flight.listeners.append(progress)
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            # The upstream call is only abandoned once every caller has gone
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+                self._forget(key, flight)
+                self.cancelled[namespace] = self.cancelled.get(namespace, 0) + 1
+            raise
+        finally:
+            flight.waiters -= 1
+            if progress is not None:
+                flight.listeners.remove(progress)
+
+    def _forget(self, key: Tuple[Hashable, ...], flight: _Flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Upstream calls made, duplicate calls collapsed and calls abandoned by all callers, per namespace"""
+        return {
+            "in_flight": len(self._inflight),
+            "upstream_calls": dict(self.leaders),
+            "collapsed_calls": dict(self.collapsed),
+            "cancelled_calls": dict(self.cancelled)
+        }
+
+# Global single-flight group shared by the services
+single_flight = SingleFlight()
@@ -0,0 +1,173 @@
+"""
+Market indicator benchmark for the market_indicators MCP tool.
+
+Writes random-walk daily bars for many tickers as CSV files (with a few
+missing days), loads them into a throwaway OHLCV cache and times: the
+first indicator pass over every ticker, a repeat call, and appending one
+new day followed by the incremental update. The results are checked
+against a plain per-ticker Python implementation:
+
+    python -m benchmarks.bench_indicators --tickers 500 --bars 2520
+"""
+import os
+import csv
+import json
+import math
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional
+
+def write_csvs(directory: str, tickers: int, bars: int, seed: int) -> List[str]:
+    """One CSV per ticker; about 1% of days are missing"""
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    paths = []
+    for i in range(tickers):
+        path = os.path.join(directory, f"T{i:04d}.csv")
+        price = rng.uniform(10, 500)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["date", "open", "high", "low", "close", "volume"])
+            for day in range(bars):
+                opened = price
+                price *= math.exp(rng.gauss(0.0003, 0.02))
+                if rng.random() < 0.01:
+                    continue
+                writer.writerow([
+                    (start + timedelta(days=day)).isoformat(), round(opened, 4),
+                    round(max(opened, price) * 1.01, 4), round(min(opened, price) * 0.99, 4),
+                    round(price, 4), rng.randint(10_000, 5_000_000)
+                ])
+        paths.append(path)
+    return paths
+
+def reference(closes: List[Optional[float]], window: int, ema_span: int, rsi_period: int) -> Dict[str, float]:
+    """Indicators for one ticker, one bar at a time"""
+    valid = [c for c in closes if c is not None]
+
+    alpha = 2 / (ema_span + 1)
+    ema = valid[0]
+    for c in valid[1:]:
+        ema += alpha * (c - ema)
+
+    changes = [b - a for a, b in zip(valid, valid[1:])]
+    gain = sum(max(c, 0) for c in changes[:rsi_period]) / rsi_period
+    loss = sum(max(-c, 0) for c in changes[:rsi_period]) / rsi_period
+    for c in changes[rsi_period:]:
+        gain = (gain * (rsi_period - 1) + max(c, 0)) / rsi_period
+        loss = (loss * (rsi_period - 1) + max(-c, 0)) / rsi_period
+    rsi = 100 - 100 / (1 + gain / loss) if loss else 100.0
+
+    fast = slow = valid[0]
+    signal = 0.0
+    for c in valid[1:]:
+        fast += 2 / 13 * (c - fast)
+        slow += 2 / 27 * (c - slow)
+        signal += 2 / 10 * ((fast - slow) - signal)
+
+    tail = []
+    for c in closes[-(window + 1):]:
+        tail.append(c if c is not None else (tail[-1] if tail else None))
+    prices = [c for c in tail[1:] if c is not None]
+    sma = sum(prices) / len(prices)
+    std = math.sqrt(sum((p - sma) ** 2 for p in prices) / len(prices))
+    returns = [math.log(b / a) for a, b in zip(tail, tail[1:]) if a is not None and b is not None]
+    mean = sum(returns) / len(returns)
+    volatility = math.sqrt(sum((r - mean) ** 2 for r in returns) / (len(returns) - 1)) * math.sqrt(252)
+
+    return {
+        "close": tail[-1],
+        f"sma_{window}": sma,
+        f"ema_{ema_span}": ema,
+        f"rsi_{rsi_period}": rsi,
+        "macd": fast - slow,
+        "macd_signal": signal,
+        "bollinger_upper": sma + 2 * std,
+        f"volatility_{window}": volatility
+    }
+
+def check(indicators, sample: List[str], window: int) -> float:
+    """Largest difference (relative above 1) between the engine and the reference over the sampled tickers"""
+    import numpy as np
+    cache = indicators.cache
+    close = cache.column("close")
+    result = indicators.compute(sample, window=window)["tickers"]
+    worst = 0.0
+    for ticker in sample:
+        column = close[:, cache.ticker_columns([ticker])[0]]
+        closes = [None if np.isnan(c) else float(c) for c in column]
+        for key, expected in reference(closes, window, 20, 14).items():
+            actual = result[ticker][key]
+            worst = max(worst, abs(actual - expected) / max(1.0, abs(expected)))
+    return worst
+
+def main():
+    parser = argparse.ArgumentParser(description="Time vectorized market indicators over a local OHLCV cache")
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=2520, help="Daily bars per ticker")
+    parser.add_argument("--window", type=int, default=20)
+    parser.add_argument("--sample", type=int, default=5, help="Tickers checked against the reference")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    from app.market_data import OHLCVCache, MarketIndicators, read_csv
+
+    results: Dict[str, Any] = {"tickers": args.tickers, "bars": args.bars}
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = write_csvs(workdir, args.tickers, args.bars, args.seed)
+        cache = OHLCVCache(os.path.join(workdir, "cache"))
+
+        start = time.perf_counter()
+        cache.append(dict(read_csv(path) for path in paths))
+        results["load_s"] = round(time.perf_counter() - start, 2)
+
+        indicators = MarketIndicators(cache)
+        start = time.perf_counter()
+        indicators.compute(window=args.window)
+        results["first_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        start = time.perf_counter()
+        indicators.compute(window=args.window)
+        results["repeat_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        # Append one new day for every ticker, as a daily update would
+        rng = random.Random(args.seed + 1)
+        next_day = int(cache.column("dates")[-1]) + 1
+        close = cache.column("close")[-1]
+        update = {
+            ticker: {next_day: (c, c * 1.01, c * 0.99, c * math.exp(rng.gauss(0, 0.02)), 1_000_000.0)}
+            for ticker, c in zip(cache.tickers, close.tolist())
+        }
+        start = time.perf_counter()
+        append = cache.append(update)
+        results["append_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        start = time.perf_counter()
+        indicators.compute(window=args.window)
+        results["incremental_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        results["epoch_unchanged"] = append["epoch"] == 0
+
+        fresh = MarketIndicators(cache)
+        start = time.perf_counter()
+        fresh.compute(window=args.window)
+        results["full_recompute_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        sample = random.Random(args.seed).sample(cache.tickers, min(args.sample, len(cache.tickers)))
+        results["max_relative_error"] = check(indicators, sample, args.window)
+
+    print(
+        f"{args.tickers} tickers x {args.bars} bars: load {results['load_s']}s, first pass {results['first_ms']}ms, "
+        f"repeat {results['repeat_ms']}ms, append 1 day {results['append_ms']}ms + incremental {results['incremental_ms']}ms "
+        f"(full recompute {results['full_recompute_ms']}ms), max relative error vs reference {results['max_relative_error']:.2e}"
+    )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    # Tool output is rounded to 4 decimals
+    if results["max_relative_error"] > 1e-4 or not results["epoch_unchanged"]:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Upstream rate-limit benchmark for the LLM client scheduler.
+
+Starts benchmarks.fake_providers with OpenAI-style RPM/TPM limits, then
+sends a burst of chat calls (half interactive, half batch priority)
+through LLMClient twice: once with only Retry-After handling, and once
+with client-side RPM/TPM budgets just under the upstream limits. Reports
+upstream 429s, failed calls, throughput and latency per priority:
+
+    python -m benchmarks.bench_llm_scheduler --rpm 1200 --requests 1500 --concurrency 64
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, Any, List
+import httpx
+from .load_test import configure_environment, free_port, percentile
+
+def start_limited_providers(args, port: int) -> subprocess.Popen:
+    """Launch the fake providers with fresh rate-limit buckets"""
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_providers",
+        "--port", str(port),
+        "--latency", str(args.latency),
+        "--jitter", str(args.latency / 4),
+        "--tokens", str(args.tokens),
+        "--rpm", str(args.rpm),
+        "--tpm", str(args.tpm)
+    ])
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Fake providers did not start")
+
+async def run_mode(args, rpm: float, tpm: float) -> Dict[str, Any]:
+    from app.llm_client import LLMClient
+    from app.llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, request_priority
+
+    client = LLMClient(rpm=rpm, tpm=tpm)
+    latencies: Dict[str, List[float]] = {"interactive": [], "batch": []}
+    failures: Dict[str, int] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+
+    async def call(i: int):
+        kind = "interactive" if i % 2 else "batch"
+        request_priority.set(PRIORITY_INTERACTIVE if kind == "interactive" else PRIORITY_BATCH)
+        start = time.perf_counter()
+        try:
+            await client.chat(
+                messages=[{"role": "user", "content": f"Summarize the outlook for asset {random.randint(1, 500)}"}],
+                max_tokens=args.max_tokens
+            )
+            latencies[kind].append(time.perf_counter() - start)
+        except Exception as e:
+            failures[type(e).__name__] = failures.get(type(e).__name__, 0) + 1
+
+    async def worker():
+        while not queue.empty():
+            await asyncio.create_task(call(queue.get_nowait()))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    stats = client.stats()
+    await client.close()
+
+    succeeded = sum(len(values) for values in latencies.values())
+    return {
+        "rpm_budget": rpm,
+        "tpm_budget": tpm,
+        "elapsed_s": round(elapsed, 2),
+        "succeeded": succeeded,
+        "failed": failures,
+        "throughput_rps": round(succeeded / elapsed, 1),
+        "upstream_requests": stats["requests"],
+        "retries": stats["retries"],
+        "latency_ms": {
+            kind: {
+                "p50": round(percentile(values, 50) * 1000, 1),
+                "p95": round(percentile(values, 95) * 1000, 1)
+            }
+            for kind, values in latencies.items()
+        },
+        "scheduler": stats["scheduler"]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare LLM calls with and without client-side rate scheduling")
+    parser.add_argument("--rpm", type=float, default=1200, help="Upstream requests per minute")
+    parser.add_argument("--tpm", type=float, default=0, help="Upstream tokens per minute (0 = unlimited)")
+    parser.add_argument("--margin", type=float, default=0.05, help="Client budget this fraction below the upstream limits")
+    parser.add_argument("--requests", type=int, default=1500)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-tokens", type=int, default=100)
+    parser.add_argument("--tokens", type=int, default=40, help="Words per fake completion")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake completion latency in seconds")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        port = free_port()
+        configure_environment(port, workdir)
+        budgets = [
+            ("retry_after_only", 0, 0),
+            ("scheduled", args.rpm * (1 - args.margin), args.tpm * (1 - args.margin))
+        ]
+        for mode, rpm, tpm in budgets:
+            providers = start_limited_providers(args, port)
+            try:
+                result = asyncio.run(run_mode(args, rpm, tpm))
+                result["upstream_429s"] = httpx.get(f"http://127.0.0.1:{port}/health").json()["requests"]["rate_limited"]
+            finally:
+                providers.terminate()
+                providers.wait()
+            result["mode"] = mode
+            results.append(result)
+            print(
+                f"{mode:>16}: {result['succeeded']}/{args.requests} ok in {result['elapsed_s']}s "
+                f"({result['throughput_rps']} req/s), 429s={result['upstream_429s']}, failed={result['failed']}, "
+                f"p95 interactive={result['latency_ms']['interactive']['p95']}ms batch={result['latency_ms']['batch']['p95']}ms"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Cold-start benchmark for the API process.
+
+Imports app.main in fresh interpreters (``python -X importtime``) and runs
+the startup hook against a throwaway database, then reports the median
+import and time-to-ready along with the slowest modules. Exits with status
+1 when the median import time exceeds the budget, or when a provider SDK
+that should load lazily is imported eagerly:
+
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 1200
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+from typing import Dict, Any, List, Tuple
+
+# Provider SDKs (and NumPy, used by the market indicators tool) that must only be imported on first use (or by pre-warm)
+LAZY_MODULES = ("openai", "replicate", "requests", "httpx", "numpy")
+
+PROBE = """
+import sys, json, time, asyncio
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def boot():
+    await app.main.app.router.startup()
+    ready = time.perf_counter()
+    await app.main.app.router.shutdown()
+    return ready
+
+ready = asyncio.run(boot())
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "ready_ms": (ready - start) * 1000,
+    "ready": app.main.readiness.ready,
+    "eager": [m for m in %r if m in sys.modules]
+}))
+""" % (LAZY_MODULES,)
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for each line of -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = [field.strip() for field in line[len("import time:"):].split("|")]
+        if not fields[0].isdigit():
+            continue  # header line
+        modules.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return modules
+
+def run_once(workdir: str, run: int) -> Dict[str, Any]:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/startup-{run}.db", ARTIFACT_DIR=f"{workdir}/artifacts", STARTUP_PREWARM="")
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        capture_output=True,
+        text=True,
+        env=env,
+        timeout=120
+    )
+    if process.returncode != 0:
+        sys.stderr.write(process.stderr)
+        raise SystemExit(f"Startup probe failed with status {process.returncode}")
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result["modules"] = parse_importtime(process.stderr)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API import and startup time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--budget-ms", type=float, default=1200, help="Maximum median import time of app.main")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        runs = [run_once(workdir, run) for run in range(args.runs)]
+
+    import_ms = statistics.median(r["import_ms"] for r in runs)
+    ready_ms = statistics.median(r["ready_ms"] for r in runs)
+    eager = sorted({m for r in runs for m in r["eager"]})
+
+    # Slowest modules by self time, averaged over the runs
+    totals: Dict[str, int] = {}
+    for r in runs:
+        for name, self_us, _ in r["modules"]:
+            totals[name] = totals.get(name, 0) + self_us
+    slowest = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    print(f"import app.main: {import_ms:.0f} ms (median of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    print(f"startup hook done: {ready_ms:.0f} ms, ready={all(r['ready'] for r in runs)}")
+    print("slowest modules (self time):")
+    for name, total_us in slowest:
+        print(f"  {total_us / len(runs) / 1000:8.1f} ms  {name}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "import_ms": round(import_ms, 1),
+                "ready_ms": round(ready_ms, 1),
+                "eager_providers": eager,
+                "slowest": [{"module": name, "self_ms": round(us / len(runs) / 1000, 2)} for name, us in slowest]
+            }, f, indent=2)
+
+    failures = []
+    if import_ms > args.budget_ms:
+        failures.append(f"import time {import_ms:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+    if eager:
+        failures.append(f"provider SDKs imported eagerly: {', '.join(eager)}")
+    for line in failures:
+        print(f"REGRESSION {line}")
+    if failures:
+        sys.exit(1)
+    print("Startup within budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Throughput scaling from 1 to N uvicorn worker processes.
+
+Starts benchmarks.fake_providers, then for each worker count runs
+``uvicorn app.main:app`` with WEB_CONCURRENCY set (multi-worker mode: one
+designated database writer, shared state between workers) against a fresh
+database, and drives /ai-task over HTTP with the load test's task mix:
+
+    python -m benchmarks.bench_workers --workers 1,2,4 --concurrency 64 --requests 2000
+
+Reports throughput per worker count and the scaling efficiency relative
+to a single worker (1.0 = linear).
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, Any, List
+import httpx
+from .load_test import DEFAULT_MIX, configure_environment, free_port, parse_mix, run_level, start_fake_providers
+
+def start_server(workers: int, port: int, workdir: str) -> subprocess.Popen:
+    """Launch uvicorn with the given worker count and wait until every worker is ready"""
+    os.makedirs(workdir, exist_ok=True)
+    env = dict(
+        os.environ,
+        WEB_CONCURRENCY=str(workers),
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        ARTIFACT_DIR=os.path.join(workdir, "artifacts"),
+        SHARED_STATE_INTERVAL="0.2",
+        OPS_ENDPOINTS_PUBLIC="1"
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            stats = httpx.get(f"http://127.0.0.1:{port}/stats", timeout=2).json()
+            # Peers appear once every worker has published its first snapshot
+            if workers == 1 or len(stats["cluster"]["shared_state"]["peers"]) >= workers - 1:
+                return process
+        except (httpx.HTTPError, KeyError, ValueError):
+            pass
+        time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"uvicorn with {workers} workers did not become ready")
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+async def run_workers(port: int, args) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120, limits=limits) as client:
+        mix = parse_mix(args.mix)
+        await run_level(client, 8, 50, mix, args.repeat_ratio)  # warm-up
+        return await run_level(client, args.concurrency, args.requests, mix, args.repeat_ratio)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /ai-task throughput scaling across uvicorn workers")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent client connections")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per worker count")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted task mix, e.g. qa=50,fetch_latest=50")
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="Fraction of prompts drawn from a small repeated set")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake text completion latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--image-latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    providers_port = free_port()
+    providers = start_fake_providers(args, providers_port)
+    results: List[Dict[str, Any]] = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            configure_environment(providers_port, workdir)
+            for workers in (int(w) for w in args.workers.split(",")):
+                port = free_port()
+                server = start_server(workers, port, os.path.join(workdir, f"w{workers}"))
+                try:
+                    result = asyncio.run(run_workers(port, args))
+                finally:
+                    stop_server(server)
+                result["workers"] = workers
+                results.append(result)
+                base = results[0]["throughput_rps"] * workers / results[0]["workers"]
+                result["scaling_efficiency"] = round(result["throughput_rps"] / base, 2)
+                print(
+                    f"workers={workers:<3d} {result['throughput_rps']:8.1f} req/s   "
+                    f"p50 {result['p50_ms']:8.1f} ms   p95 {result['p95_ms']:8.1f} ms   p99 {result['p99_ms']:8.1f} ms   "
+                    f"efficiency {result['scaling_efficiency']:.2f}   errors {result['errors']}"
+                )
+    finally:
+        providers.terminate()
+        providers.wait()
+
+    print(f"({os.cpu_count()} CPUs available; scaling is bounded by the core count)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Local stand-ins for the OpenAI, Replicate and Hugging Face APIs.
+
+Each endpoint sleeps for a configurable latency (plus uniform jitter) and
+fails a configurable fraction of requests, so the API can be load-tested
+without network access or API credits:
+
+    python -m benchmarks.fake_providers --port 9100 --latency 0.2 --jitter 0.05 --error-rate 0.01
+
+With --rpm/--tpm the chat endpoint enforces OpenAI-style rate limits and
+answers 429 with Retry-After once a limit is used up.
+
+Point the app at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1
+    REPLICATE_API_BASE_URL=http://127.0.0.1:9100
+    HUGGINGFACE_API_URL=http://127.0.0.1:9100/hf/models
+"""
+import json
+import math
+import time
+import uuid
+import base64
+import random
+import asyncio
+import argparse
+from typing import Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+# 1x1 transparent PNG served as every generated image
+PNG_BYTES = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+REPLICATE_VERSION_SCHEMA = {
+    "components": {"schemas": {"Output": {"type": "array", "items": {"type": "string", "format": "uri"}}}}
+}
+
+class ProviderProfile:
+    """Latency and failure behaviour for one fake provider"""
+
+    def __init__(self, latency: float, jitter: float, error_rate: float, error_status: int = 500):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    async def delay(self):
+        wait = self.latency + random.uniform(-self.jitter, self.jitter)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def should_fail(self) -> bool:
+        return random.random() < self.error_rate
+
+class RateLimit:
+    """Requests and tokens per minute, as refilling buckets holding one minute's allowance"""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = rpm
+        self.tokens = tpm
+        self.updated = time.monotonic()
+
+    def check(self, tokens: int) -> float:
+        """Charge one request of tokens; returns 0 when allowed, else seconds to wait"""
+        now = time.monotonic()
+        elapsed, self.updated = now - self.updated, now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+        waits = []
+        if self.rpm and self.requests < 1:
+            waits.append((1 - self.requests) * 60 / self.rpm)
+        if self.tpm and self.tokens < tokens:
+            waits.append((tokens - self.tokens) * 60 / self.tpm)
+        if waits:
+            return max(waits)
+        self.requests -= 1
+        self.tokens -= tokens
+        return 0.0
+
+def create_app(text: ProviderProfile, image: ProviderProfile, tokens: int = 60, limit: Optional[RateLimit] = None) -> FastAPI:
+    """FastAPI app serving the fake provider endpoints"""
+    app = FastAPI(title="Fake AI providers")
+    app.state.requests = {"openai": 0, "replicate": 0, "huggingface": 0, "rate_limited": 0}
+    words = ("market", "price", "trend", "volume", "signal", "risk", "asset", "return")
+
+    def error(profile: ProviderProfile) -> JSONResponse:
+        return JSONResponse(
+            status_code=profile.error_status,
+            content={"error": {"message": "Injected failure", "type": "server_error"}}
+        )
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "requests": app.state.requests}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.requests["openai"] += 1
+        body = await request.json()
+        if limit is not None:
+            # Like OpenAI, count the prompt and max_tokens against the token limit
+            prompt = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+            wait = limit.check(prompt + body.get("max_tokens", 16))
+            if wait:
+                app.state.requests["rate_limited"] += 1
+                return JSONResponse(
+                    status_code=429,
+                    content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    headers={"retry-after": str(math.ceil(wait)), "retry-after-ms": str(int(wait * 1000))}
+                )
+        await text.delay()
+        if text.should_fail():
+            return error(text)
+
+        model = body.get("model", "gpt-3.5-turbo")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        reply = " ".join(random.choice(words) for _ in range(tokens))
+
+        if body.get("stream"):
+            async def chunks():
+                for word in reply.split(" "):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 20, "completion_tokens": tokens, "total_tokens": 20 + tokens}
+        }
+
+    @app.post("/v1/predictions")
+    async def create_prediction(request: Request):
+        app.state.requests["replicate"] += 1
+        body = await request.json()
+        await image.delay()
+        if image.should_fail():
+            return error(image)
+
+        prediction_id = uuid.uuid4().hex
+        base = str(request.base_url).rstrip("/")
+        return JSONResponse(status_code=201, content={
+            "id": prediction_id,
+            "version": body.get("version"),
+            "status": "succeeded",
+            "input": body.get("input"),
+            "output": [f"{base}/files/{prediction_id}.png"],
+            "logs": "",
+            "error": None,
+            "metrics": {"predict_time": image.latency},
+            "created_at": None,
+            "started_at": None,
+            "completed_at": None,
+            "urls": {"get": f"{base}/v1/predictions/{prediction_id}"}
+        })
+
+    @app.get("/v1/models/{owner}/{name}/versions/{version_id}")
+    async def get_version(owner: str, name: str, version_id: str):
+        return {
+            "id": version_id,
+            "created_at": "2023-01-01T00:00:00Z",
+            "cog_version": "0.8.0",
+            "openapi_schema": REPLICATE_VERSION_SCHEMA
+        }
+
+    @app.get("/files/{name}")
+    async def get_file(name: str):
+        return Response(content=PNG_BYTES, media_type="image/png")
+
+    @app.post("/hf/models/{model:path}")
+    async def huggingface_inference(model: str):
+        app.state.requests["huggingface"] += 1
+        await image.delay()
+        if image.should_fail():
+            return error(image)
+        return Response(content=PNG_BYTES, media_type="image/png")
+
+    return app
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake OpenAI/Replicate/Hugging Face providers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.2, help="Text completion latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Uniform +/- jitter in seconds")
+    parser.add_argument("--image-latency", type=float, default=1.0, help="Image generation latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status for injected failures")
+    parser.add_argument("--tokens", type=int, default=60, help="Words per completion")
+    parser.add_argument("--rpm", type=float, default=0, help="Chat requests per minute before 429s (0 = unlimited)")
+    parser.add_argument("--tpm", type=float, default=0, help="Chat tokens per minute before 429s (0 = unlimited)")
+    args = parser.parse_args()
+
+    app = create_app(
+        ProviderProfile(args.latency, args.jitter, args.error_rate, args.error_status),
+        ProviderProfile(args.image_latency, args.jitter, args.error_rate, args.error_status),
+        tokens=args.tokens,
+        limit=RateLimit(args.rpm, args.tpm) if args.rpm or args.tpm else None
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,251 @@
+"""
+Load test for /ai-task against local fake providers.
+
+Starts benchmarks.fake_providers in a subprocess, points the app at it,
+boots the FastAPI app in-process and drives /ai-task with a weighted mix
+of tasks at each concurrency level. Reports throughput, p50/p95/p99 latency
+and event-loop lag, optionally comparing against a saved baseline:
+
+    python -m benchmarks.load_test --concurrency 1,8,32 --requests 300 --json results.json
+    python -m benchmarks.load_test --baseline results.json --tolerance 0.2
+
+The run exits with status 1 when any level regresses past the tolerance.
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, Any, List
+import httpx
+
+DEFAULT_MIX = "qa=50,fetch_latest=20,generate_content=20,generate_image=10"
+
+TOPICS = ("bitcoin", "ethereum", "inflation", "interest rates", "tech stocks", "gold", "the dollar", "oil")
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    mix = {}
+    for part in spec.split(","):
+        task, _, weight = part.partition("=")
+        mix[task.strip()] = int(weight or 1)
+    return mix
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def build_request(task: str, i: int, repeat_ratio: float) -> Dict[str, Any]:
+    """Request body for one task; repeat_ratio controls how often prompts recur (cache hits)"""
+    topic = random.choice(TOPICS)
+    suffix = "" if random.random() < repeat_ratio else f" (#{i})"
+    if task == "qa":
+        return {"task": "qa", "question": f"What is the outlook for {topic}?{suffix}"}
+    if task == "generate_content":
+        return {"task": "generate_content", "prompt": f"Market update on {topic}{suffix}", "platform": random.choice(("twitter", "linkedin", "facebook"))}
+    if task == "generate_image":
+        return {"task": "generate_image", "prompt": f"Chart of {topic}{suffix}"}
+    return {"task": task}
+
+class LoopLagMonitor:
+    """Samples how late a periodic sleep wakes up on the running event loop"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, requests: int, mix: Dict[str, int], repeat_ratio: float) -> Dict[str, Any]:
+    """Send `requests` tasks with `concurrency` workers and summarise the results"""
+    tasks = random.choices(list(mix), weights=list(mix.values()), k=requests)
+    latencies: Dict[str, List[float]] = {task: [] for task in mix}
+    errors = 0
+    counter = iter(range(requests))
+    monitor = LoopLagMonitor()
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            task = tasks[i]
+            start = time.perf_counter()
+            try:
+                response = await client.post("/ai-task", json=build_request(task, i, repeat_ratio))
+                ok = response.status_code == 200 and response.json().get("success")
+            except Exception:
+                ok = False
+            latencies[task].append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await monitor.stop()
+
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(everything, 50) * 1000, 2),
+        "p95_ms": round(percentile(everything, 95) * 1000, 2),
+        "p99_ms": round(percentile(everything, 99) * 1000, 2),
+        "loop_lag_p99_ms": round(percentile(monitor.samples, 99) * 1000, 2),
+        "loop_lag_max_ms": round(max(monitor.samples, default=0.0) * 1000, 2),
+        "tasks": {
+            task: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2)
+            }
+            for task, values in latencies.items() if values
+        }
+    }
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_fake_providers(args, port: int) -> subprocess.Popen:
+    """Launch the fake providers and wait until they accept requests"""
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_providers",
+        "--port", str(port),
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--image-latency", str(args.image_latency),
+        "--error-rate", str(args.error_rate)
+    ])
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Fake providers did not start")
+
+def configure_environment(port: int, workdir: str):
+    """Point every provider and the storage paths at benchmark-local targets (before importing the app)"""
+    base = f"http://127.0.0.1:{port}"
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{base}/v1",
+        "REPLICATE_API_KEY": "bench",
+        "REPLICATE_API_BASE_URL": base,
+        "REPLICATE_POLL_INTERVAL": "0.01",
+        "HUGGINGFACE_API_KEY": "bench",
+        "HUGGINGFACE_API_URL": f"{base}/hf/models",
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "ARTIFACT_DIR": os.path.join(workdir, "artifacts")
+    })
+
+async def run_benchmark(args) -> List[Dict[str, Any]]:
+    from app.main import app
+
+    await app.router.startup()
+    results = []
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            mix = parse_mix(args.mix)
+            await run_level(client, 4, 20, mix, args.repeat_ratio)  # warm-up
+            for concurrency in (int(c) for c in args.concurrency.split(",")):
+                result = await run_level(client, concurrency, args.requests, mix, args.repeat_ratio)
+                results.append(result)
+                print(
+                    f"c={concurrency:<4d} {result['throughput_rps']:8.1f} req/s   "
+                    f"p50 {result['p50_ms']:8.1f} ms   p95 {result['p95_ms']:8.1f} ms   p99 {result['p99_ms']:8.1f} ms   "
+                    f"loop lag p99 {result['loop_lag_p99_ms']:6.1f} ms (max {result['loop_lag_max_ms']:.1f})   "
+                    f"errors {result['errors']}"
+                )
+    finally:
+        await app.router.shutdown()
+    return results
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """Regressions against a baseline run, matched by concurrency level"""
+    previous = {entry["concurrency"]: entry for entry in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get(result["concurrency"])
+        if not base:
+            continue
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"c={result['concurrency']}: throughput {result['throughput_rps']} < baseline {base['throughput_rps']}")
+        for key in ("p95_ms", "p99_ms", "loop_lag_p99_ms"):
+            # Small absolute values are dominated by noise
+            if result[key] > max(base[key] * (1 + tolerance), base[key] + 5):
+                regressions.append(f"c={result['concurrency']}: {key} {result[key]} > baseline {base[key]}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /ai-task against fake providers")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted task mix, e.g. qa=50,fetch_latest=50")
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="Fraction of prompts drawn from a small repeated set")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake text completion latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--image-latency", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --json output")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    port = free_port()
+    providers = start_fake_providers(args, port)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            configure_environment(port, workdir)
+            results = asyncio.run(run_benchmark(args))
+    finally:
+        providers.terminate()
+        providers.wait()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,47 @@ let authToken = null;
 // Initialize the application
 document.addEventListener('DOMContentLoaded', function() {
     selectTask('qa');
+    subscribeLatest();
 });
 
+// Live feed of the latest Q&A entry, pushed by the server over Server-Sent Events
+function subscribeLatest() {
+    const liveElement = document.getElementById('live-latest');
+    const source = new EventSource('/latest/stream');
+
+    // Entries are user-submitted text, so they are set as text content, never parsed as HTML
+    const field = (label, value) => {
+        const line = document.createElement('p');
+        const strong = document.createElement('strong');
+        strong.textContent = `${label}:`;
+        line.append(strong, ` ${value}`);
+        return line;
+    };
+
+    const render = (qa) => {
+        liveElement.replaceChildren(
+            field('Question', qa.question),
+            field('Answer', qa.answer),
+            field('ID', qa.id),
+            field('Timestamp', qa.timestamp)
+        );
+    };
+
+    source.addEventListener('latest', (e) => {
+        const data = JSON.parse(e.data);
+        if (data.found) {
+            render(data.qa);
+        } else {
+            const placeholder = document.createElement('p');
+            placeholder.className = 'placeholder';
+            placeholder.textContent = data.message;
+            liveElement.replaceChildren(placeholder);
+        }
+    });
+    source.addEventListener('qa', (e) => render(JSON.parse(e.data)));
+    // EventSource reconnects by itself and receives the current snapshot again
+}
+
 // Authentication function
 async function authenticateUser() {
     const username = document.getElementById('username').value;
@@ -131,6 +170,12 @@ async function executeTask() {
             headers['Authorization'] = `Bearer ${authToken}`;
         }
         
+        // Stream tokens for text tasks so the answer renders as it is generated
+        if (currentTask === 'qa' || currentTask === 'generate_content') {
+            await streamTask(requestBody, headers);
+            return;
+        }
+        
         // Make API request
         const response = await fetch('/ai-task', {
             method: 'POST',
@@ -143,6 +188,24 @@ async function executeTask() {
         // Hide loading indicator
         loadingElement.style.display = 'none';
         
+        // Image generation runs as a background job: poll until it finishes
+        if (data.success && currentTask === 'generate_image') {
+            loadingElement.style.display = 'block';
+            const job = await pollImageJob(data.data.job_id, headers);
+            loadingElement.style.display = 'none';
+            if (job.status === 'completed') {
+                displayResults({ task: 'generate_image', success: true, data: job.result });
+            } else {
+                resultsElement.innerHTML = `
+                    <div class="result-item">
+                        <h5>❌ Image ${job.status}</h5>
+                        <p>${job.error || 'The image job did not complete'}</p>
+                    </div>
+                `;
+            }
+            return;
+        }
+        
         // Display results
         if (data.success) {
             displayResults(data);
@@ -166,6 +229,99 @@ async function executeTask() {
     }
 }
 
+// Poll an image job until it completes, fails or is cancelled
+async function pollImageJob(jobId, headers) {
+    const resultsElement = document.getElementById('results-content');
+    
+    while (true) {
+        const response = await fetch('/ai-task', {
+            method: 'POST',
+            headers: headers,
+            body: JSON.stringify({ task: 'fetch_image', job_id: jobId })
+        });
+        const data = await response.json();
+        if (!data.success) {
+            throw new Error(data.message);
+        }
+        
+        const job = data.data;
+        if (['completed', 'failed', 'cancelled'].includes(job.status)) {
+            return job;
+        }
+        resultsElement.innerHTML = `<p class="placeholder">Rendering image... ${job.progress}%</p>`;
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
+// Execute a text task against the streaming endpoint, rendering tokens incrementally
+async function streamTask(requestBody, headers) {
+    const loadingElement = document.getElementById('loading');
+    const resultsElement = document.getElementById('results-content');
+    
+    const response = await fetch('/ai-task/stream', {
+        method: 'POST',
+        headers: headers,
+        body: JSON.stringify(requestBody)
+    });
+    
+    if (!response.ok) {
+        const data = await response.json();
+        throw new Error(data.detail || `HTTP ${response.status}`);
+    }
+    
+    loadingElement.style.display = 'none';
+    resultsElement.innerHTML = `
+        <div class="result-item">
+            <h5>${requestBody.task === 'qa' ? '💡 Answer' : '✍️ Generating Content'}</h5>
+            <div id="stream-output" style="line-height: 1.6; white-space: pre-wrap;"></div>
+        </div>
+    `;
+    const outputElement = document.getElementById('stream-output');
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Server-Sent Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let eventType = 'message';
+            let eventData = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) {
+                    eventType = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    eventData += line.slice(6);
+                }
+            });
+            
+            const payload = JSON.parse(eventData);
+            if (eventType === 'token') {
+                outputElement.textContent += payload.text;
+            } else if (eventType === 'done') {
+                displayResults(payload);
+            } else if (eventType === 'error') {
+                resultsElement.innerHTML = `
+                    <div class="result-item">
+                        <h5>❌ Error</h5>
+                        <p>${payload.message}</p>
+                    </div>
+                `;
+            }
+        }
+    }
+}
+
 // Display results based on task type
 function displayResults(data) {
     const resultsElement = document.getElementById('results-content');
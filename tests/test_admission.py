@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from app.admission import AdaptiveLimiter, AdmissionController, AdmissionRejected
+
+def test_only_latency_bound_tasks_are_limited():
+    controller = AdmissionController(enabled=True)
+
+    assert set(controller.limiters) == {"qa", "history", "generate_content"}
+
+    async def run():
+        async with controller.admit("generate_image"):
+            return "admitted"
+
+    assert asyncio.run(run()) == "admitted"
+
+def test_requests_over_the_limit_queue_then_get_rejected():
+    limiter = AdaptiveLimiter("qa", initial_limit=1, min_limit=1, max_queue=1, queue_timeout=0.05)
+
+    async def run():
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as full:
+            await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await waiter
+        return full.value, timed_out.value
+
+    full, timed_out = asyncio.run(run())
+
+    assert full.status_code == 429 and full.retry_after >= 1
+    assert timed_out.status_code == 503
+    assert limiter.in_flight == 1
+    assert (limiter.rejected_queue_full, limiter.rejected_timeout) == (1, 1)
+
+def test_queued_request_gets_the_released_slot():
+    limiter = AdaptiveLimiter("qa", initial_limit=1, min_limit=1)
+
+    async def run():
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release(0.01)
+        await waiter
+
+    asyncio.run(run())
+
+    assert limiter.in_flight == 1
+    assert limiter.admitted == 2
+
+def test_limit_shrinks_when_latency_inflates_and_grows_when_saturated():
+    limiter = AdaptiveLimiter("qa", initial_limit=4, min_limit=1, max_limit=8)
+    for _ in range(4):
+        limiter.in_flight += 1
+        limiter.release(0.1)
+    assert limiter.limit == 4  # not saturated and latency steady
+
+    limiter.in_flight = 5
+    limiter.release(0.1)  # was fully used
+    assert limiter.limit == 4.25
+
+    limiter.in_flight += 1
+    limiter.release(2.0)  # short-term latency far above the long-term average
+    assert limiter.limit < 4.25
@@ -0,0 +1,16 @@
+import asyncio
+from app import main
+from app.llm_scheduler import PRIORITY_INTERACTIVE, request_priority
+from app.models import AITaskRequest
+
+def test_ai_task_runs_at_interactive_priority(monkeypatch):
+    seen = []
+
+    async def run_task(request, db, save=True):
+        seen.append(request_priority.get())
+
+    monkeypatch.setattr(main, "run_task", run_task)
+
+    asyncio.run(main.ai_task_handler(AITaskRequest(task="qa", question="Is gold a hedge?"), current_user="admin", db=None))
+
+    assert seen == [PRIORITY_INTERACTIVE]
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from app.database import Database, create_tables, new_ulid, normalize_question
+from app.services import answer_cache
+from app.services.answer_cache import AnswerCache
+
+def _is_fallback(question, answer):
+    return answer.startswith("fallback")
+
+def _cache(**kwargs):
+    kwargs.setdefault("db_max_age_hours", 24)
+    return AnswerCache(is_fallback=_is_fallback, **kwargs)
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "cache.db")
+    asyncio.run(create_tables(path))
+    return Database(path)
+
+def _save(db, question, answer, age=timedelta(0)):
+    row = (new_ulid(), question, answer, datetime.now() - age, normalize_question(question))
+    asyncio.run(db.write_rows([row]))
+
+def _lookup(cache, question, db):
+    return asyncio.run(cache.lookup(question, db))
+
+def test_least_recently_used_entry_is_evicted(db):
+    cache = _cache(max_size=2)
+    cache.store("first question", "first answer")
+    cache.store("second question", "second answer")
+    _lookup(cache, "first question", db)  # now the most recently used
+
+    cache.store("third question", "third answer")
+
+    assert _lookup(cache, "second question", db) is None
+    assert _lookup(cache, "first question", db) == ("first answer", "memory")
+    assert cache.evictions == 1
+
+def test_entries_expire_after_the_ttl(db, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    cache = _cache(ttl=60)
+    cache.store("What is a stop loss?", "An order that limits losses")
+
+    now[0] += 59
+    assert _lookup(cache, "what is a stop loss", db) == ("An order that limits losses", "memory")
+    now[0] += 2
+    assert _lookup(cache, "what is a stop loss", db) is None
+    assert cache.expirations == 1
+
+def test_near_duplicates_only_match_when_fuzzy_matching_is_enabled(db):
+    exact = _cache()
+    fuzzy = _cache(similarity=0.7)
+    for cache in (exact, fuzzy):
+        cache.store("What is a good trading strategy for beginners?", "Start small")
+
+    assert _lookup(exact, "What is a good trading strategy for beginner?", db) is None
+    assert _lookup(fuzzy, "What is a good trading strategy for beginner?", db) == ("Start small", "similar")
+    assert _lookup(fuzzy, "How are dividends taxed?", db) is None
+
+def test_database_tier_skips_fallback_and_stale_answers(db):
+    _save(db, "Should I buy gold?", "Gold hedges inflation")
+    _save(db, "Should I buy gold?", "fallback: the AI service is unavailable")
+    _save(db, "Is cash king?", "It was last week", age=timedelta(hours=48))
+    cache = _cache()
+
+    assert _lookup(cache, "should i buy gold", db) == ("Gold hedges inflation", "database")
+    assert _lookup(cache, "Is cash king?", db) is None
+
+def test_warm_skips_answers_older_than_the_database_tier_allows(db):
+    _save(db, "Recent question", "recent answer")
+    _save(db, "Old question", "old answer", age=timedelta(hours=48))
+    _save(db, "Failed question", "fallback answer")
+    cache = _cache()
+
+    asyncio.run(cache.warm(db))
+
+    assert cache.stats()["size"] == 1
+    assert _lookup(cache, "Recent question", db) == ("recent answer", "memory")
@@ -0,0 +1,49 @@
+import asyncio
+import json
+from app import main
+from app.database import Database, create_tables
+from app.llm_scheduler import PRIORITY_BATCH, request_priority
+from app.models import AITaskRequest, AITaskResponse, BatchTaskRequest
+
+def _batch(tmp_path, monkeypatch, questions, stream=False):
+    path = str(tmp_path / "batch.db")
+    calls = []
+
+    async def run_task(request, db, save=True):
+        calls.append((request.question, save, request_priority.get()))
+        await asyncio.sleep(0)
+        data = {"id": None, "question": request.question, "answer": f"answer to {request.question}"}
+        return AITaskResponse(task="qa", success=True, data=data, message="ok")
+
+    monkeypatch.setattr(main, "run_task", run_task)
+    batch = BatchTaskRequest(items=[AITaskRequest(task="qa", question=q) for q in questions], stream=stream)
+
+    async def run():
+        await create_tables(path)
+        db = Database(path)
+        response = await main.ai_task_batch_handler(batch, current_user="admin", db=db)
+        if stream:
+            response = [json.loads(line) async for line in response.body_iterator]
+        return response, await db.get_all_qa(limit=10)
+
+    response, saved = asyncio.run(run())
+    return response, saved, calls
+
+def test_identical_items_run_once_and_results_keep_request_order(tmp_path, monkeypatch):
+    response, saved, calls = _batch(tmp_path, monkeypatch, ["Q1", "Q2", "Q1"])
+
+    assert sorted(calls) == [("Q1", False, PRIORITY_BATCH), ("Q2", False, PRIORITY_BATCH)]
+    assert [r.data["question"] for r in response.results] == ["Q1", "Q2", "Q1"]
+    assert response.message == "Processed 3 tasks (2 unique)"
+    # One row per unique item, written together after the batch ran
+    assert sorted(entry["question"] for entry in saved) == ["Q1", "Q2"]
+    assert response.results[0].data["id"] == response.results[2].data["id"] is not None
+
+def test_streamed_batch_ends_with_the_saved_ids(tmp_path, monkeypatch):
+    lines, saved, _ = _batch(tmp_path, monkeypatch, ["Q1", "Q1", "Q2"], stream=True)
+
+    results, done = lines[:-1], lines[-1]
+    assert sorted(line["index"] for line in results) == [0, 1, 2]
+    assert done["done"] is True and done["count"] == 3
+    assert done["qa_ids"]["0"] == done["qa_ids"]["1"]
+    assert len(saved) == 2
@@ -0,0 +1,62 @@
+import asyncio
+import sqlite3
+from app import cluster as cluster_module
+from app.cluster import Cluster
+from app.database import Database, create_tables
+
+def _workers(tmp_path, monkeypatch):
+    """Two workers' coordinators sharing one database, as in separate processes"""
+    path = str(tmp_path / "cluster.db")
+    monkeypatch.setattr(cluster_module, "WRITER_SOCKET", str(tmp_path / "writer.sock"))
+    return path, Cluster(Database(path), enabled=True, db_path=path), Cluster(Database(path), enabled=True, db_path=path)
+
+def _questions(path):
+    with sqlite3.connect(path) as conn:
+        return [row[0] for row in conn.execute("SELECT question FROM qa_entries ORDER BY id")]
+
+def test_one_worker_is_elected_writer_and_receives_forwarded_writes(tmp_path, monkeypatch):
+    path, first, second = _workers(tmp_path, monkeypatch)
+
+    async def run():
+        await create_tables(path)
+        try:
+            elected = [await first.elect(), await second.elect()]
+            await first.serve()
+            await second.database.save_qa("From the follower", "forwarded")
+            return elected, first.server.requests
+        finally:
+            await second.close()
+            await first.close()
+
+    assert asyncio.run(run()) == ([True, False], 1)
+    assert (first.shared.role, second.shared.role) == ("writer", "follower")
+    assert _questions(path) == ["From the follower"]
+
+def test_follower_takes_over_when_the_writer_stops(tmp_path, monkeypatch):
+    path, first, second = _workers(tmp_path, monkeypatch)
+
+    async def run():
+        await create_tables(path)
+        await first.elect()
+        await first.serve()
+        await second.elect()
+        db = second.database
+        await db.create_job("orphaned", "a chart", owner=first.shared.instance)
+        await db.create_job("own", "a logo", owner=second.shared.instance)
+
+        await first.close()  # the writer process exits and its lock is released
+        await asyncio.sleep(0.05)
+        try:
+            await db.save_qa("After the takeover", "written locally")
+            return await db.get_job("orphaned"), await db.get_job("own")
+        finally:
+            await second.close()
+
+    orphaned, own = asyncio.run(run())
+
+    assert second.promotions == 1
+    assert second.shared.role == "writer"
+    assert second.database.remote is None
+    assert _questions(path) == ["After the takeover"]
+    assert orphaned["status"] == "failed"
+    assert own["status"] == "queued"
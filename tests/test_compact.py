@@ -0,0 +1,45 @@
+import asyncio
+from datetime import timedelta
+from app import compact
+from app.database import Database, create_tables
+
+def test_migration_round_trip(tmp_path):
+    path = str(tmp_path / "compact.db")
+    entries = [(f"question {i}", f"The answer to question {i % 3} is to diversify.") for i in range(9)]
+
+    async def run():
+        await create_tables(path)
+        plain = Database(path)
+        await plain.save_qa_many(entries)
+        before = await plain.get_all_qa(limit=20)
+
+        result = await compact.migrate(path)
+
+        db = Database(path)
+        after = await db.get_all_qa(limit=20)
+        recent = await db.get_all_qa(limit=20, max_age=timedelta(hours=1))
+        found = await db.find_answers("question 4", max_age=timedelta(hours=1))
+        await db.save_qa("question 9", entries[0][1])
+        return result, before, after, recent, found, await compact.stats(path), await db.get_latest_qa()
+
+    result, before, after, recent, found, stats, latest = asyncio.run(run())
+
+    assert result["converted_rows"] == 9
+    assert result["distinct_answers"] == 3
+    assert [(e["question"], e["answer"]) for e in after] == [(e["question"], e["answer"]) for e in before]
+    assert len(recent) == 9
+    assert found == [entries[4][1]]
+    assert stats["format"] == "compact"
+    assert stats["plain_answer_bytes"] == 0
+    assert stats["distinct_answers"] == 3  # the new save reused a stored answer
+    assert (latest["question"], latest["answer"]) == ("question 9", entries[0][1])
+
+def test_migrating_an_empty_database_switches_it_to_compact(tmp_path):
+    path = str(tmp_path / "empty.db")
+
+    async def run():
+        await create_tables(path)
+        await compact.migrate(path)
+        return await compact.stats(path)
+
+    assert asyncio.run(run())["format"] == "compact"
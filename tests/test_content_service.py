@@ -0,0 +1,50 @@
+import asyncio
+from app.services import content_service
+from app.services.content_service import ContentService
+
+class _FakeLLM:
+    """Answers the multi-platform call with a canned reply and single-platform calls with a post"""
+
+    def __init__(self, multi_reply):
+        self.multi_reply = multi_reply
+        self.calls = []
+
+    async def chat(self, messages, **kwargs):
+        request = messages[-1]["content"]
+        self.calls.append(request)
+        if "several platforms" in messages[0]["content"]:
+            return self.multi_reply
+        return f"single post for {request.split()[1]}"
+
+def _generate(monkeypatch, multi_reply, platforms):
+    llm = _FakeLLM(multi_reply)
+    monkeypatch.setattr(content_service, "llm_client", llm)
+    service = ContentService()
+    service.openai_api_key = "test-key"
+    result = asyncio.run(service.generate_multi_content("index funds", platforms))
+    return result, llm.calls
+
+def test_every_platform_comes_from_one_model_call(monkeypatch):
+    reply = '```json\n{"twitter": "Short post", "linkedin": "Long post"}\n```'
+
+    result, calls = _generate(monkeypatch, reply, ["Twitter", "linkedin", "twitter"])
+
+    assert len(calls) == 1
+    assert result["mode"] == "single_call"
+    assert list(result["platforms"]) == ["twitter", "linkedin"]
+    assert result["platforms"]["twitter"]["content"] == "Short post"
+    assert result["platforms"]["linkedin"]["content"] == "Long post"
+
+def test_platforms_missing_from_the_reply_get_their_own_call(monkeypatch):
+    result, calls = _generate(monkeypatch, '{"twitter": "Short post"}', ["twitter", "linkedin"])
+
+    assert len(calls) == 2
+    assert result["mode"] == "single_call+parallel"
+    assert result["platforms"]["linkedin"]["content"] == "single post for linkedin"
+
+def test_unparseable_reply_falls_back_to_parallel_calls(monkeypatch):
+    result, calls = _generate(monkeypatch, "Sorry, I can't do JSON", ["twitter", "facebook"])
+
+    assert len(calls) == 3
+    assert result["mode"] == "parallel"
+    assert result["platforms"]["facebook"]["content"] == "single post for facebook"
@@ -0,0 +1,91 @@
+import asyncio
+import sqlite3
+import pytest
+from app.database import MIGRATIONS, ConnectionPool, Database, create_tables
+
+def _columns(path: str, table: str):
+    with sqlite3.connect(path) as conn:
+        return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def _version(path: str) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def test_fresh_database_gets_every_migration(tmp_path):
+    path = str(tmp_path / "fresh.db")
+    asyncio.run(create_tables(path))
+
+    assert _version(path) == len(MIGRATIONS)
+    assert {"question_norm", "uid", "answer_id"} <= _columns(path, "qa_entries")
+    assert "owner" in _columns(path, "image_jobs")
+    assert _columns(path, "revoked_tokens") == {"token_hash", "expires_at"}
+
+def test_legacy_database_is_upgraded_in_place(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    # The schema the first create_tables() wrote, without a user_version
+    with sqlite3.connect(path) as conn:
+        conn.execute("""
+            CREATE TABLE qa_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("INSERT INTO qa_entries (question, answer) VALUES ('What is  AI?', 'Artificial intelligence')")
+
+    asyncio.run(create_tables(path))
+
+    assert _version(path) == len(MIGRATIONS)
+    with sqlite3.connect(path) as conn:
+        row = conn.execute("SELECT question, answer, question_norm FROM qa_entries").fetchone()
+    assert row == ("What is  AI?", "Artificial intelligence", "what is ai")
+
+def test_migrations_are_idempotent(tmp_path):
+    path = str(tmp_path / "again.db")
+    asyncio.run(create_tables(path))
+    asyncio.run(create_tables(path))
+
+    assert _version(path) == len(MIGRATIONS)
+
+def test_saved_entries_read_back_through_the_pool(tmp_path):
+    path = str(tmp_path / "pool.db")
+
+    async def run():
+        await create_tables(path)
+        pool = ConnectionPool(path, readers=2)
+        await pool.open()
+        try:
+            db = Database(path, pool=pool)
+            await db.save_qa("What is AI?", "Artificial intelligence")
+            await db.save_qa("What is ML?", "Machine learning")
+            return await db.get_latest_qa()
+        finally:
+            await pool.close()
+
+    latest = asyncio.run(run())
+    assert latest["question"] == "What is ML?"
+    assert latest["answer"] == "Machine learning"
+
+def test_failed_writer_block_is_rolled_back(tmp_path):
+    path = str(tmp_path / "rollback.db")
+
+    async def run():
+        await create_tables(path)
+        pool = ConnectionPool(path, readers=1)
+        await pool.open()
+        try:
+            with pytest.raises(RuntimeError):
+                async with pool.writer() as db:
+                    await db.execute("INSERT INTO qa_entries (question, answer) VALUES ('partial', 'write')")
+                    raise RuntimeError("caller failed before committing")
+            # The shared writer must not carry the half-done transaction into the next caller's commit
+            async with pool.writer() as db:
+                await db.execute("INSERT INTO qa_entries (question, answer) VALUES ('next', 'write')")
+                await db.commit()
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+    with sqlite3.connect(path) as conn:
+        assert [row[0] for row in conn.execute("SELECT question FROM qa_entries")] == ["next"]
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from app.database import Database, create_tables, decode_cursor, encode_cursor
+
+def _history_db(tmp_path, entries):
+    path = str(tmp_path / "history.db")
+
+    async def setup():
+        await create_tables(path)
+        db = Database(path)
+        # One transaction: every row shares a timestamp, so pages are split on the id alone
+        await db.save_qa_many(entries[:5])
+        for question, answer in entries[5:]:
+            await db.save_qa(question, answer)
+        return db
+
+    return asyncio.run(setup())
+
+def _pages(db, limit, query=None):
+    pages, cursor = [], None
+    while True:
+        page = asyncio.run(db.get_history(limit=limit, cursor=cursor, query=query))
+        pages.append([item["question"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+def test_cursor_round_trip():
+    for timestamp in ("2024-05-01 12:00:00.000001", 1714564800000):
+        assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_pages_cover_every_entry_once_newest_first(tmp_path):
+    entries = [(f"question {i}", f"answer {i}") for i in range(12)]
+    db = _history_db(tmp_path, entries)
+
+    pages = _pages(db, limit=5)
+
+    assert [len(page) for page in pages] == [5, 5, 2]
+    assert [question for page in pages for question in page] == [f"question {i}" for i in reversed(range(12))]
+
+def test_exact_last_page_has_no_cursor(tmp_path):
+    db = _history_db(tmp_path, [(f"question {i}", "answer") for i in range(4)])
+
+    page = asyncio.run(db.get_history(limit=4))
+
+    assert len(page["items"]) == 4
+    assert page["next_cursor"] is None
+
+def test_search_is_paginated_too(tmp_path):
+    entries = [(f"Tell me about {'bitcoin' if i % 2 else 'stocks'} {i}", f"answer {i}") for i in range(10)]
+    db = _history_db(tmp_path, entries)
+
+    pages = _pages(db, limit=2, query="bitcoin")
+
+    assert [question for page in pages for question in page] == [f"Tell me about bitcoin {i}" for i in (9, 7, 5, 3, 1)]
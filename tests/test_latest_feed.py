@@ -0,0 +1,41 @@
+import asyncio
+from app.latest_feed import LatestFeed
+
+def _entry(uid, question="Is gold a hedge?"):
+    return {"uid": uid, "question": question, "answer": "Sometimes"}
+
+def test_snapshot_follows_the_newest_entry():
+    feed = LatestFeed()
+    empty_etag = feed.etag
+    assert feed.result()["found"] is False
+
+    feed.publish([_entry("01B")])
+    etag = feed.etag
+    feed.publish([_entry("01A")])  # late delivery of an older entry
+
+    assert feed.result() == {"found": True, "qa": _entry("01B")}
+    assert feed.etag == etag != empty_etag
+    assert feed.published == 2
+
+def test_subscribers_receive_each_entry_once():
+    feed = LatestFeed()
+
+    async def run():
+        with feed.subscribe() as queue:
+            feed.publish([_entry("01A"), _entry("01B")])
+            feed.publish([_entry("01A")])  # echoed back from another worker
+            return [queue.get_nowait()["uid"] for _ in range(queue.qsize())]
+
+    assert asyncio.run(run()) == ["01A", "01B"]
+    assert feed.stats()["subscribers"] == 0
+
+def test_slow_subscriber_loses_its_oldest_entries():
+    feed = LatestFeed(max_queue=2)
+
+    async def run():
+        with feed.subscribe() as queue:
+            feed.publish([_entry(f"01{c}") for c in "ABC"])
+            return [queue.get_nowait()["uid"] for _ in range(queue.qsize())]
+
+    assert asyncio.run(run()) == ["01B", "01C"]
+    assert feed.dropped == 1
@@ -0,0 +1,95 @@
+import time
+import asyncio
+import pytest
+from app import llm_scheduler
+from app.llm_client import LLMClient
+from app.llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMScheduler, SchedulerTimeout, TokenBucket
+
+class UpstreamError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = None
+
+@pytest.fixture(autouse=True)
+def single_worker(monkeypatch):
+    """Run as one worker whatever WEB_CONCURRENCY/MULTI_WORKER the test process was started with"""
+    monkeypatch.setattr(llm_scheduler.cluster, "enabled", False)
+    monkeypatch.setattr(llm_scheduler.cluster.shared, "_peers", [])
+    monkeypatch.setattr("app.cluster.WEB_CONCURRENCY", 1)
+
+def test_bucket_refills_at_its_per_minute_rate():
+    bucket = TokenBucket(600)  # 10 per second
+    now = time.monotonic()
+    bucket.take(600, now)
+
+    assert bucket.wait_time(1, now) == pytest.approx(0.1)
+    assert bucket.wait_time(1, now + 0.1) == pytest.approx(0.0)
+
+def test_resized_bucket_keeps_no_more_than_its_new_capacity():
+    bucket = TokenBucket(600)
+    bucket.resize(200, time.monotonic())
+
+    assert bucket.capacity == 200
+    assert bucket.level == 200
+
+def test_waiters_are_granted_by_priority():
+    async def run():
+        scheduler = LLMScheduler("test", rpm=6000)
+        scheduler.pause(0.05)
+        order = []
+
+        async def call(name, priority):
+            await scheduler.acquire(1, priority=priority)
+            order.append(name)
+
+        await asyncio.gather(call("batch", PRIORITY_BATCH), call("interactive", PRIORITY_INTERACTIVE))
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "batch"]
+
+def test_waiter_gives_up_at_its_deadline():
+    async def run():
+        scheduler = LLMScheduler("test", rpm=60, max_wait=0.05)
+        scheduler.pause(10)
+        with pytest.raises(SchedulerTimeout):
+            await scheduler.acquire(1)
+        return scheduler.stats()
+
+    assert asyncio.run(run())["timed_out"] == 1
+
+def test_rate_limited_call_gets_its_reservation_back():
+    async def run():
+        scheduler = LLMScheduler("test", rpm=60, tpm=1000)
+        await scheduler.acquire(400)
+        scheduler.rejected(400, UpstreamError(429))
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.tokens.level == pytest.approx(1000, abs=1)
+    assert scheduler.throttled == 1
+
+def test_non_retryable_rejection_is_refunded():
+    client = LLMClient(api_key="test", rpm=60, tpm=1000)
+
+    async def run():
+        await client.scheduler.acquire(400)
+        client._failed(400, UpstreamError(400))
+
+    asyncio.run(run())
+    assert client.scheduler.tokens.level == pytest.approx(1000, abs=1)
+    assert client.failures == 1
+
+def test_budget_is_split_between_live_workers(monkeypatch):
+    cluster = llm_scheduler.cluster
+    monkeypatch.setattr(cluster, "enabled", True)
+    scheduler = LLMScheduler("test", rpm=600, tpm=60000)
+    # Until it has seen its peers, a worker only gets one sync interval's allowance
+    assert scheduler.requests.level == pytest.approx(600 * llm_scheduler.SHARED_STATE_INTERVAL / 60)
+
+    monkeypatch.setattr(cluster.shared, "_peers", [{"pid": 101}, {"pid": 102}])
+    stats = scheduler.stats()
+
+    assert stats["workers"] == 3
+    assert stats["rpm"] == pytest.approx(200)
+    assert stats["tpm"] == pytest.approx(20000)
@@ -0,0 +1,63 @@
+import math
+import pytest
+from benchmarks.bench_indicators import reference, write_csvs
+from app.market_data import MarketIndicators, OHLCVCache, read_csv
+from app.market_tickers import find_tickers
+
+@pytest.fixture
+def cache(tmp_path):
+    paths = write_csvs(str(tmp_path), tickers=4, bars=120, seed=3)
+    cache = OHLCVCache(str(tmp_path / "cache"))
+    cache.append(dict(read_csv(path) for path in paths))
+    return cache
+
+def _closes(cache, ticker):
+    column = cache.column("close")[:, cache.ticker_columns([ticker])[0]]
+    return [None if math.isnan(c) else float(c) for c in column]
+
+def test_indicators_match_a_per_ticker_reference(cache):
+    result = MarketIndicators(cache).compute(window=20)
+
+    assert result["success"]
+    for ticker in cache.tickers:
+        for key, expected in reference(_closes(cache, ticker), 20, 20, 14).items():
+            assert result["tickers"][ticker][key] == pytest.approx(expected, rel=1e-4, abs=1e-4), (ticker, key)
+
+def test_appended_day_updates_incrementally(cache):
+    indicators = MarketIndicators(cache)
+    indicators.compute()
+    next_day = int(cache.column("dates")[-1]) + 1
+    last = cache.column("close")[-1].tolist()
+
+    appended = cache.append({t: {next_day: (c, c * 1.01, c * 0.99, c * 1.02, 1e6)} for t, c in zip(cache.tickers, last)})
+    incremental = indicators.compute()
+
+    assert appended["epoch"] == 0  # plain appends keep the recursive state
+    assert incremental["tickers"] == MarketIndicators(cache).compute()["tickers"]
+
+def test_tickers_parameter_accepts_a_list_or_a_string(cache):
+    indicators = MarketIndicators(cache)
+
+    assert list(indicators.run({"tickers": ["T0001"]})["tickers"]) == ["T0001"]
+    assert list(indicators.run({"tickers": "t0002"})["tickers"]) == ["T0002"]
+    assert list(indicators.run({"tickers": " T0000, t0003 "})["tickers"]) == ["T0000", "T0003"]
+
+def test_tickers_are_found_in_text(cache):
+    indicators = MarketIndicators(cache)
+
+    assert list(indicators.run({"text": "Is T0001 overbought?"})["tickers"]) == ["T0001"]
+    assert indicators.run({"text": "How are markets today?"})["success"] is False
+
+def test_empty_cache_reports_no_data(tmp_path):
+    result = MarketIndicators(OHLCVCache(str(tmp_path / "empty"))).run({"tickers": "AAPL"})
+
+    assert result["success"] is False
+    assert result["error"] == "No market data loaded"
+
+def test_only_known_symbols_or_dollar_tickers_count():
+    known = {"AAPL", "MSFT"}
+
+    assert find_tickers("I use the API in the US", known) == []
+    assert find_tickers("Compare AAPL with $msft", known) == ["AAPL", "MSFT"]
+    assert find_tickers("what about aapl", known) == []
+    assert find_tickers("What about $TSLA?", known, any_dollar=True) == ["TSLA"]
@@ -0,0 +1,47 @@
+import asyncio
+from app.mcp_client import mcp_client
+from app.services.qa_service import QAService
+
+def test_slow_tool_call_is_time_boxed(monkeypatch):
+    async def slow_tool(tool_name, parameters):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(mcp_client, "call_tool", slow_tool)
+
+    result = asyncio.run(mcp_client.try_call_tool("text_generation", {}, timeout=0.01))
+
+    assert result["success"] is False
+    assert result["result"] == ""
+    assert "timed out" in result["error"]
+
+def test_failing_tool_call_becomes_an_empty_result(monkeypatch):
+    async def broken_tool(tool_name, parameters):
+        raise ConnectionError("MCP server went away")
+
+    monkeypatch.setattr(mcp_client, "call_tool", broken_tool)
+
+    result = asyncio.run(mcp_client.try_call_tool("text_generation", {}))
+
+    assert result == {"success": False, "result": "", "error": "MCP server went away"}
+
+def test_qa_is_saved_while_the_enhancement_runs(monkeypatch):
+    async def run():
+        enhancing = asyncio.Event()
+
+        async def tool(tool_name, parameters):
+            enhancing.set()
+            return {"success": True, "result": "enhanced"}
+
+        class SlowDatabase:
+            async def save_qa(self, question, answer):
+                # Only completes if the MCP call was started alongside the save
+                await asyncio.wait_for(enhancing.wait(), 1)
+                return 7
+
+        monkeypatch.setattr(mcp_client, "call_tool", tool)
+        return await QAService()._save_and_enhance("Q", "A", SlowDatabase())
+
+    qa_id, mcp_result = asyncio.run(run())
+
+    assert qa_id == 7
+    assert mcp_result["result"] == "enhanced"
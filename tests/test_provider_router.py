@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from app.provider_router import CircuitBreaker, ProviderRouter, ProviderUnavailableError
+
+def _provider(calls, name, fail=False, delay=0.0):
+    async def fn():
+        calls.append(name)
+        await asyncio.sleep(delay)
+        if fail:
+            raise ConnectionError(f"{name} is down")
+        return name
+    return fn
+
+def test_failing_provider_drops_behind_a_healthy_one_straight_away():
+    calls = []
+    router = ProviderRouter("test", failure_threshold=100)
+    router.add("primary", _provider(calls, "primary", fail=True))
+    router.add("backup", _provider(calls, "backup"))
+
+    assert asyncio.run(router.call()) == "backup"
+    assert asyncio.run(router.call()) == "backup"
+
+    assert calls == ["primary", "backup", "backup"]
+
+def test_registration_order_wins_before_stats_exist():
+    calls = []
+    router = ProviderRouter("test")
+    router.add("primary", _provider(calls, "primary"))
+    router.add("backup", _provider(calls, "backup"))
+
+    assert asyncio.run(router.call()) == "primary"
+
+def test_breaker_opens_after_consecutive_failures_and_admits_one_probe():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    assert breaker.acquire()  # cool-down over: the probe
+    assert breaker.state == "half_open"
+    assert not breaker.acquire()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_open_breakers_reject_calls():
+    calls = []
+    router = ProviderRouter("test", failure_threshold=1, reset_timeout=60)
+    router.add("primary", _provider(calls, "primary", fail=True))
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(router.call())
+    with pytest.raises(ProviderUnavailableError):
+        asyncio.run(router.call())
+    assert router.rejected == 1
+
+def test_hedged_call_takes_the_first_success():
+    calls = []
+    router = ProviderRouter("test", hedge=True, hedge_delay=0.01)
+    router.add("slow", _provider(calls, "slow", delay=1))
+    router.add("fast", _provider(calls, "fast"))
+
+    assert asyncio.run(router.call()) == "fast"
+    assert (router.hedges, router.hedge_wins) == (1, 1)
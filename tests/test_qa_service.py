@@ -0,0 +1,29 @@
+import asyncio
+from app.database import Database, create_tables
+from app.services import qa_service
+from app.services.qa_service import QAService
+
+class _BrokenStream:
+    async def stream_chat(self, **kwargs):
+        yield "Buy low, "
+        raise ConnectionError("connection reset")
+
+def test_interrupted_stream_is_not_saved(tmp_path, monkeypatch):
+    monkeypatch.setattr(qa_service, "llm_client", _BrokenStream())
+    service = QAService()
+    service.openai_api_key = "test-key"
+    path = str(tmp_path / "qa.db")
+
+    async def run():
+        await create_tables(path)
+        db = Database(path)
+        events = [event async for event in service.stream_answer("How do I trade?", db)]
+        return events, await db.get_all_qa()
+
+    events, saved = asyncio.run(run())
+
+    done = events[-1]["data"]
+    assert done["answer"] == "Buy low,"
+    assert done["note"].startswith("Stream interrupted")
+    assert done["id"] is None
+    assert saved == []
@@ -0,0 +1,39 @@
+import asyncio
+from app.readiness import Readiness
+
+def _flaky(failures):
+    calls = []
+
+    async def step():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise ConnectionError("upstream not reachable yet")
+
+    return step, calls
+
+def test_failed_required_step_is_retried_until_it_passes():
+    readiness = Readiness()
+    step, calls = _flaky(failures=2)
+
+    async def run():
+        task = asyncio.create_task(readiness.run("llm_client", step, retry_delay=0.01))
+        await asyncio.sleep(0.005)
+        assert not readiness.ready
+        assert readiness.checks["llm_client"]["status"] == "failed"
+        await task
+
+    asyncio.run(run())
+
+    assert len(calls) == 3
+    assert readiness.ready
+    assert readiness.checks["llm_client"]["attempts"] == 3
+
+def test_failed_optional_step_is_not_retried():
+    readiness = Readiness()
+    step, calls = _flaky(failures=1)
+
+    asyncio.run(readiness.run("mcp", step, required=False))
+
+    assert len(calls) == 1
+    assert readiness.ready
+    assert "skipped" in readiness.checks["mcp"]
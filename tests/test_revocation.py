@@ -0,0 +1,68 @@
+import time
+import asyncio
+from datetime import timedelta
+import pytest
+from jose import JWTError
+from app import auth
+from app.auth import create_access_token, load_revoked_tokens, revoke_token, revoked_tokens, token_cache, verify_token
+from app.database import Database, create_tables
+
+@pytest.fixture(autouse=True)
+def clean_revocations():
+    revoked_tokens.clear()
+    yield
+    revoked_tokens.clear()
+
+def test_revoked_token_is_rejected_even_when_cached():
+    token = create_access_token({"sub": "admin"})
+    assert verify_token(token)["sub"] == "admin"  # now in the token cache
+
+    revoke_token(token)
+
+    with pytest.raises(JWTError):
+        verify_token(token)
+
+def test_revocation_is_kept_until_the_token_expires():
+    token = create_access_token({"sub": "admin"}, expires_delta=timedelta(minutes=5))
+
+    _, expires_at = revoke_token(token)
+
+    assert abs(expires_at - (time.time() + 300)) < 5
+
+def test_only_valid_tokens_can_be_revoked():
+    token = create_access_token({"sub": "admin"})
+    revoke_token(token)
+
+    with pytest.raises(JWTError):
+        revoke_token("not-a-token")
+    with pytest.raises(JWTError):
+        revoke_token(token)  # already revoked
+    assert len(revoked_tokens) == 1
+
+def test_loading_stored_revocations_drops_expired_ones():
+    now = time.time()
+    load_revoked_tokens([("live", now + 60), ("expired", now - 60)])
+
+    assert set(revoked_tokens) == {"live"}
+
+def test_revocation_survives_a_restart(tmp_path):
+    path = str(tmp_path / "auth.db")
+    token = create_access_token({"sub": "admin"})
+
+    async def revoke_and_store():
+        await create_tables(path)
+        db = Database(path)
+        token_hash, expires_at = revoke_token(token)
+        await db.save_revoked_token(token_hash, expires_at)
+        await db.save_revoked_token("long-gone", time.time() - 1)
+
+    asyncio.run(revoke_and_store())
+    # A new process starts with empty in-memory state and reloads what the database holds
+    revoked_tokens.clear()
+    token_cache.discard(auth._token_hash(token))
+    stored = asyncio.run(Database(path).get_revoked_tokens())
+    load_revoked_tokens(stored)
+
+    assert [token_hash for token_hash, _ in stored] == [auth._token_hash(token)]
+    with pytest.raises(JWTError):
+        verify_token(token)
@@ -0,0 +1,83 @@
+import asyncio
+from app.singleflight import SingleFlight
+
+def test_identical_concurrent_calls_share_one_upstream_call():
+    group = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def run():
+        return await asyncio.gather(*(group.do(("qa", "what is ai"), fetch) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["answer"] * 5
+    assert len(calls) == 1
+    assert group.stats()["collapsed_calls"] == {"qa": 4}
+    assert group.stats()["in_flight"] == 0
+
+def test_later_calls_start_a_new_flight():
+    group = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        return [await group.do(("qa", "same"), fetch), await group.do(("qa", "same"), fetch)]
+
+    assert asyncio.run(run()) == [1, 2]
+
+def test_upstream_call_is_cancelled_only_with_its_last_caller():
+    group = SingleFlight()
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def run():
+        first = asyncio.create_task(group.do(("image", "cat"), slow))
+        second = asyncio.create_task(group.do(("image", "cat"), slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        still_running = not cancelled
+        second.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+        await asyncio.sleep(0)
+        return still_running
+
+    assert asyncio.run(run())
+    assert cancelled == [1]
+    assert group.stats()["cancelled_calls"] == {"image": 1}
+
+def test_progress_reaches_every_waiting_caller():
+    group = SingleFlight()
+    seen = {"a": [], "b": []}
+
+    async def render(report):
+        await asyncio.sleep(0)
+        await report(50)
+        await report(100)
+        return "done"
+
+    def listener(name):
+        async def progress(value):
+            seen[name].append(value)
+        return progress
+
+    async def run():
+        return await asyncio.gather(
+            group.do_with_progress(("image", "dog"), render, listener("a")),
+            group.do_with_progress(("image", "dog"), render, listener("b"))
+        )
+
+    assert asyncio.run(run()) == ["done", "done"]
+    assert seen == {"a": [50, 100], "b": [50, 100]}
@@ -0,0 +1,69 @@
+import asyncio
+import sqlite3
+from app.database import ConnectionPool, Database, WriteBehindWriter, create_tables
+
+def _questions(path):
+    with sqlite3.connect(path) as conn:
+        return [row[0] for row in conn.execute("SELECT question FROM qa_entries ORDER BY id")]
+
+def _run(path, body, **writer_options):
+    async def run():
+        await create_tables(path)
+        pool = ConnectionPool(path, readers=1)
+        await pool.open()
+        writer = WriteBehindWriter(pool, **writer_options)
+        db = Database(path, pool=pool, write_behind=writer)
+        writer.start(db.insert_rows)
+        try:
+            return await body(db), writer
+        finally:
+            await writer.stop()
+            await pool.close()
+
+    return asyncio.run(run())
+
+def test_saves_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "batches.db")
+
+    async def body(db):
+        return [await db.save_qa(f"question {i}", f"answer {i}") for i in range(7)]
+
+    ids, writer = _run(path, body, batch_size=3, flush_interval=0.01)
+
+    assert _questions(path) == [f"question {i}" for i in range(7)]
+    assert all(isinstance(qa_id, str) for qa_id in ids)  # ULIDs, returned once queued
+    assert (writer.written, writer.batches, writer.dropped) == (7, 3, 0)
+
+def test_latest_entry_includes_a_pending_save(tmp_path):
+    path = str(tmp_path / "pending.db")
+
+    async def body(db):
+        await db.save_qa("What is ML?", "Machine learning")
+        return await db.get_latest_qa()
+
+    latest, _ = _run(path, body, flush_interval=0.2)
+
+    assert latest["question"] == "What is ML?"
+
+def test_failing_batch_is_retried_then_written_row_by_row(tmp_path):
+    path = str(tmp_path / "retry.db")
+    attempts = []
+
+    async def body(db):
+        insert_rows = db.insert_rows
+
+        async def flaky_insert(conn, rows, return_ids=True):
+            attempts.append(len(rows))
+            if any(row[1] == "bad" for row in rows):
+                raise sqlite3.IntegrityError("rejected row")
+            return await insert_rows(conn, rows, return_ids)
+
+        db.write_behind._insert_rows = flaky_insert
+        for question in ("good 1", "bad", "good 2"):
+            await db.save_qa(question, "answer")
+
+    _, writer = _run(path, body, batch_size=10, flush_interval=0.01, retries=1, retry_delay=0)
+
+    assert _questions(path) == ["good 1", "good 2"]
+    assert attempts == [3, 3, 1, 1, 1]
+    assert (writer.errors, writer.dropped, writer.written) == (2, 1, 2)